@@ -0,0 +1,202 @@
+# Headless entry point: python -m robot_mission_13 run ...
+# Only the model, agents and strategies are imported, no plotting or dataframe code.
+
+import argparse
+import csv
+import os
+import sys
+from time import time
+
+# The modules of the package import each other by their flat names
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from model import WasteModel  # noqa: E402
+from agents import Class_Strat  # noqa: E402
+
+
+def positive_int(text):
+    value = int(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"{text} is not a positive integer")
+    return value
+
+
+def build_config(args):
+    green_strategy, yellow_strategy, red_strategy = args.strategies or [args.strategy] * 3
+    return {
+        "width": args.width,
+        "height": args.height,
+        "num_green_agents": args.agents[0],
+        "num_yellow_agents": args.agents[1],
+        "num_red_agents": args.agents[2],
+        "num_green_waste": args.wastes[0],
+        "num_yellow_waste": args.wastes[1],
+        "num_red_waste": args.wastes[2],
+        "proportion_z3": 1 / 3,
+        "proportion_z2": 1 / 3,
+        "seed": args.seed,
+        "Strategy_Green": green_strategy,
+        "Strategy_Yellow": yellow_strategy,
+        "Strategy_Red": red_strategy,
+        "trace_path": getattr(args, "trace", None),
+        "macro_actions": args.macro_actions,
+        "fetch_drop_offs": args.fetch_drop_offs,
+        "update_mode": getattr(args, "update_mode", "synchronous"),
+        "grid_backend": args.grid_backend,
+        "stall_window": args.stall_window,
+    }
+
+
+def run(args):
+    start_time = time()
+    if args.strips:
+        # Imported here, only this option starts worker processes
+        from strips import StripEngine
+
+        model = StripEngine(build_config(args))
+        model_vars = model.model_vars
+    else:
+        model = WasteModel(**build_config(args))
+        model_vars = model.datacollector.model_vars
+    steps = 0
+    wastes = model_vars["Wastes"]
+    while steps < args.steps:
+        model.step()
+        steps += 1
+        if args.until_clear and wastes[-1] == 0:
+            break
+        if model.stall_reason is not None:
+            print(f"Stopped at step {steps}, {model.stall_reason}")
+            break
+    model.close()
+
+    if args.csv:
+        # Same columns as datacollector.get_model_vars_dataframe, without pandas
+        columns = list(model_vars)
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(zip(*(model_vars[c] for c in columns)))
+
+    print(f"Steps: {steps}, Wastes: {wastes[-1]}, Time: {time() - start_time:.2f}s")
+
+
+def export(args):
+    # Imported here, only this command starts worker processes
+    from dataset import export_dataset
+
+    start_time = time()
+    config = build_config(args)
+    manifest = export_dataset(
+        args.out, config, args.episodes, base_seed=args.seed, max_steps=args.steps, chunk_bytes=args.chunk_mb << 20,
+        episodes_per_task=args.episodes_per_task, workers=args.workers,
+    )
+    cleared = sum(episode["cleared"] for episode in manifest["episodes"])
+    print(
+        f"Transitions: {manifest['transitions']}, Shards: {len(manifest['shards'])}, "
+        f"Cleared: {cleared}/{args.episodes}, Time: {time() - start_time:.2f}s"
+    )
+
+
+def sweep(args):
+    # Imported here, only these commands read specs and start worker processes
+    from sweep import load_spec, parse_shard, run_shard, run_local, merge_results
+
+    start_time = time()
+    spec = load_spec(args.spec)
+    if args.command == "sweep":
+        telemetry = None
+        if args.telemetry_port is not None:
+            from telemetry import TelemetryServer
+
+            telemetry = TelemetryServer(port=args.telemetry_port).start()
+            print(f"Metrics on http://127.0.0.1:{telemetry.port}/metrics")
+        try:
+            if args.nodes is not None:
+                ran, skipped = run_local(spec, args.out, args.nodes)
+            else:
+                ran, skipped = run_shard(spec, args.out, *parse_shard(args.shard))
+        finally:
+            if telemetry is not None:
+                telemetry.close()
+        print(f"Jobs run: {ran}, Already done: {skipped}, Time: {time() - start_time:.2f}s")
+    if args.command == "merge" or args.nodes is not None:
+        path, missing = merge_results(spec, args.out)
+        if missing:
+            print(f"{missing} jobs of the spec have no result yet")
+        print(f"Results saved to {path}")
+
+
+def add_model_arguments(parser):
+    parser.add_argument("--width", type=int, default=21)
+    parser.add_argument("--height", type=int, default=20)
+    parser.add_argument("--agents", type=int, nargs=3, default=[3, 3, 3], metavar=("GREEN", "YELLOW", "RED"))
+    parser.add_argument("--wastes", type=int, nargs=3, default=[20, 10, 10], metavar=("GREEN", "YELLOW", "RED"))
+    parser.add_argument("--strategy", choices=list(Class_Strat), default="Fusion And Research")
+    parser.add_argument("--strategies", choices=list(Class_Strat), nargs=3, metavar=("GREEN", "YELLOW", "RED"),
+                        help="one strategy per color, overrides --strategy")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--macro-actions", action="store_true")
+    parser.add_argument("--fetch-drop-offs", action="store_true",
+                        help="explorers fetch the wastes dropped by the color below, see drop_offs.py")
+    parser.add_argument("--grid-backend", choices=["multigrid", "cell_space"], default="multigrid")
+    parser.add_argument("--stall-window", type=int, default=None,
+                        help="stop after this many steps without a successful COLLECT, FUSION or DROP")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m robot_mission_13")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="simulate one configuration")
+    add_model_arguments(run_parser)
+    run_parser.add_argument("--steps", type=int, default=1000, help="maximum number of steps")
+    run_parser.add_argument("--until-clear", action="store_true", help="stop as soon as no waste is left")
+    run_parser.add_argument("--trace", default=None, help="record a binary event trace, see event_trace.py")
+    run_parser.add_argument("--csv", default=None, help="write the waste counts per step")
+    run_parser.add_argument("--update-mode", choices=["sequential", "synchronous"], default="sequential")
+    run_parser.add_argument("--strips", action="store_true",
+                            help="one process per zone, requires --update-mode synchronous, see strips.py")
+
+    dataset_parser = commands.add_parser(
+        "dataset",
+        help="export robot transitions of seeded episodes, always in synchronous mode "
+             "(every robot observes the same grid before planning), see dataset.py",
+    )
+    add_model_arguments(dataset_parser)
+    dataset_parser.add_argument("--out", required=True, help="directory of the shards and manifest.json")
+    dataset_parser.add_argument("--episodes", type=int, default=100)
+    dataset_parser.add_argument("--steps", type=int, default=1000, help="maximum number of steps per episode")
+    dataset_parser.add_argument("--chunk-mb", type=positive_int, default=32,
+                                help="uncompressed size of a shard, buffered by each worker")
+    dataset_parser.add_argument("--episodes-per-task", type=int, default=16)
+    dataset_parser.add_argument("--workers", type=int, default=None, help="processes, all cores by default")
+
+    sweep_parser = commands.add_parser("sweep", help="run a shard of the jobs of a sweep spec, see sweep.py")
+    sweep_parser.add_argument("spec", help="JSON sweep spec")
+    sweep_parser.add_argument("--out", required=True, help="directory shared by the nodes")
+    sweep_parser.add_argument("--shard", default="1/1", help="i/n: run the jobs i, i + n, ... (from 1)")
+    sweep_parser.add_argument("--nodes", type=int, default=None,
+                              help="run all the shards here, one process per node, then merge")
+    sweep_parser.add_argument("--telemetry-port", type=int, default=None,
+                              help="serve live metrics on this local port (0 for a free one), see telemetry.py")
+
+    merge_parser = commands.add_parser("merge", help="gather the job results of a sweep into results_*.csv")
+    merge_parser.add_argument("spec", help="JSON sweep spec")
+    merge_parser.add_argument("--out", required=True, help="directory of the sweep")
+
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.strips and args.update_mode != "synchronous":
+        run_parser.error("--strips requires --update-mode synchronous")
+    if args.command == "run" and args.strips and args.grid_backend != "multigrid":
+        run_parser.error("--strips requires --grid-backend multigrid")
+    if args.command == "run":
+        run(args)
+    elif args.command == "dataset":
+        export(args)
+    elif args.command in ("sweep", "merge"):
+        sweep(args)
+
+
+if __name__ == "__main__":
+    main()
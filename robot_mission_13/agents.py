@@ -1,6 +1,6 @@
 from mesa import Agent
 from objects import Colors
-from strategy import StrategyRandom, FusionAndResearch, Action, FusionAndResearchWithCommunication
+from strategy import StrategyRandom, FusionAndResearch, Action, FusionAndResearchWithCommunication, FusionAndResearchWithFields, FusionAndResearchWithContractNet
 from communication.agent.CommunicatingAgent import CommunicatingAgent
 
 
@@ -8,13 +8,15 @@ Class_Strat = {
     "Random": StrategyRandom,
     "Fusion And Research": FusionAndResearch,
     "Fusion And Research With Communication": FusionAndResearchWithCommunication,
+    "Fusion And Research With Distance Fields": FusionAndResearchWithFields,
+    "Fusion And Research With Contract Net": FusionAndResearchWithContractNet,
 }
 class Robot(CommunicatingAgent):
     def __init__(self, model, unique_id, color=None, max_radioactivity=None):
         super().__init__(model, unique_id)
         self.percepts = {}
 
-        self.knowledge = {"Neighbors": [], "carrying": [], "LastActionNotWorked": None, "DroppedLast": None, "LastAction": [Action.DO_NOTHING], "height": None, "width": None, "x": None, "y": None, "checked_rows": [], "Disposal": None}
+        self.knowledge = {"Neighbors": [], "carrying": [], "LastActionNotWorked": None, "DroppedLast": None, "LastAction": [Action.DO_NOTHING], "height": None, "width": None, "x": None, "y": None, "Disposal": None}
         self.unique_id = unique_id
         self.action = None
         self.color = color
@@ -22,23 +24,37 @@ class Robot(CommunicatingAgent):
         self.model = model
         self.color = None
         self.strategy = StrategyRandom(model, self)
+        self.macro_ticks = 0
 
     def percept(self):
-        self.knowledge["Neighbors"] = list(
-            self.model.grid.get_neighbors(
-                self.pos, moore=True, include_center=True, radius=1
-            )
-        )
+        self.knowledge["Neighbors"] = self.model.get_neighbors(self.pos)
+        self.forget_dropped()
+        return self.knowledge
+
+    def forget_dropped(self):
         if self.knowledge["DroppedLast"] is not None:
             if self.knowledge["DroppedLast"][1] == 0:
                 self.knowledge["DroppedLast"] = None
             else:
                 self.knowledge["DroppedLast"][1] -= 1
-        return self.knowledge
 
-    def step_agent(self):
+    def plan(self):
+        """Perceive and choose the next action without modifying the grid."""
+        self.strategy.update_coverage()
+        # Committed macro action: deliberate would return the same action again
+        if self.macro_ticks > 0 and not self.model.has_waste_or_disposal(self.pos):
+            self.macro_ticks -= 1
+            self.model.skipped_deliberations += 1
+            self.forget_dropped()
+            return self.action
         self.knowledge = self.percept()
         self.action = self.strategy.deliberate()
+        if self.model.macro_actions:
+            self.macro_ticks = self.strategy.macro_length(self.action)
+        return self.action
+
+    def step_agent(self):
+        self.plan()
         self.percepts = self.model.do(self, self.action)
 
     def step(self):
@@ -0,0 +1,153 @@
+# aggregation.py folds replicate time series into running per-step statistics
+
+import numpy as np
+
+WASTE_COLUMNS = ["Wastes", "Red Wastes", "Yellow Wastes", "Green Wastes"]
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+class ReplicateAggregator:
+    """Streaming per-step mean, variance, min, max and quantiles over replicates.
+
+    Each finished run is folded in with Welford's update, so memory only depends
+    on the number of steps, never on the number of replicates. Two aggregators
+    built in different processes can be combined with merge.
+
+    Runs stopped early are handled in two ways: with a horizon, a shorter run is
+    extended with its last value (the model no longer changes once stopped);
+    without one, each step only aggregates the runs that reached it. A run without
+    any row is skipped.
+
+    Quantiles (numpy's method="inverted_cdf") come from an exact per-step
+    histogram, kept for integer-valued columns such as waste counts.
+
+    attr:
+        columns: The aggregated columns
+        horizon: The number of steps runs are padded or truncated to (None to keep their length)
+        n: Number of runs that reached each step
+    """
+
+    def __init__(self, columns=WASTE_COLUMNS, horizon=None):
+        self.columns = list(columns)
+        self.horizon = horizon
+        self.n = np.zeros(0, dtype=np.int64)
+        self.mean = {column: np.zeros(0) for column in self.columns}
+        self.m2 = {column: np.zeros(0) for column in self.columns}
+        self.min = {column: np.zeros(0) for column in self.columns}
+        self.max = {column: np.zeros(0) for column in self.columns}
+        self.histogram = {column: np.zeros((0, 0), dtype=np.int64) for column in self.columns}
+
+    def __len__(self):
+        return len(self.n)
+
+    def _grow(self, length):
+        extra = length - len(self.n)
+        if extra <= 0:
+            return
+        self.n = np.concatenate([self.n, np.zeros(extra, dtype=np.int64)])
+        for column in self.columns:
+            self.mean[column] = np.concatenate([self.mean[column], np.zeros(extra)])
+            self.m2[column] = np.concatenate([self.m2[column], np.zeros(extra)])
+            self.min[column] = np.concatenate([self.min[column], np.full(extra, np.inf)])
+            self.max[column] = np.concatenate([self.max[column], np.full(extra, -np.inf)])
+            histogram = self.histogram[column]
+            if histogram is not None:
+                self.histogram[column] = np.pad(histogram, ((0, extra), (0, 0)))
+
+    def _add_to_histogram(self, column, values):
+        histogram = self.histogram[column]
+        if histogram is None:
+            return
+        if np.any(values != np.round(values)) or np.any(values < 0):
+            # Not an integer series, quantiles are not available for this column
+            self.histogram[column] = None
+            return
+        values = values.astype(np.int64)
+        width = int(values.max()) + 1 if len(values) else 0
+        if width > histogram.shape[1]:
+            histogram = np.pad(histogram, ((0, 0), (0, width - histogram.shape[1])))
+        np.add.at(histogram, (np.arange(len(values)), values), 1)
+        self.histogram[column] = histogram
+
+    def add(self, run):
+        """Fold one finished run, a DataFrame or a dict of column -> sequence."""
+        series = {column: np.asarray(run[column], dtype=float) for column in self.columns}
+        length = len(series[self.columns[0]])
+        if length == 0:
+            # Not even the initial counts, nothing to extend to the horizon
+            return
+        if self.horizon is not None:
+            for column, values in series.items():
+                values = values[: self.horizon]
+                if len(values) < self.horizon:
+                    values = np.concatenate([values, np.full(self.horizon - len(values), values[-1])])
+                series[column] = values
+            length = self.horizon
+
+        self._grow(length)
+        self.n[:length] += 1
+        count = self.n[:length]
+        for column, values in series.items():
+            mean = self.mean[column][:length]
+            delta = values - mean
+            mean += delta / count
+            self.m2[column][:length] += delta * (values - mean)
+            np.minimum(self.min[column][:length], values, out=self.min[column][:length])
+            np.maximum(self.max[column][:length], values, out=self.max[column][:length])
+            self._add_to_histogram(column, values)
+
+    def merge(self, other):
+        """Combine the statistics of another aggregator (Chan et al. parallel update)."""
+        self._grow(len(other))
+        length = len(other)
+        n_a = self.n[:length].astype(float)
+        n_b = other.n.astype(float)
+        total = n_a + n_b
+        safe_total = np.where(total > 0, total, 1)
+        for column in self.columns:
+            delta = other.mean[column] - self.mean[column][:length]
+            self.mean[column][:length] += delta * n_b / safe_total
+            self.m2[column][:length] += other.m2[column] + delta**2 * n_a * n_b / safe_total
+            np.minimum(self.min[column][:length], other.min[column], out=self.min[column][:length])
+            np.maximum(self.max[column][:length], other.max[column], out=self.max[column][:length])
+
+            mine, theirs = self.histogram[column], other.histogram[column]
+            if mine is None or theirs is None:
+                self.histogram[column] = None
+                continue
+            width = max(mine.shape[1], theirs.shape[1])
+            mine = np.pad(mine, ((0, 0), (0, width - mine.shape[1])))
+            mine[:length] += np.pad(theirs, ((0, 0), (0, width - theirs.shape[1])))
+            self.histogram[column] = mine
+        self.n[:length] += other.n
+        return self
+
+    def std(self, column):
+        # Sample standard deviation (ddof=1), NaN below two runs like pandas
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(np.where(self.n > 1, self.m2[column] / (self.n - 1), np.nan))
+
+    def quantile(self, column, q):
+        histogram = self.histogram[column]
+        if histogram is None:
+            return np.full(len(self.n), np.nan)
+        cumulative = np.cumsum(histogram, axis=1)
+        # Smallest value whose cumulative count reaches q * n
+        values = (cumulative < np.maximum(q * self.n, 1)[:, np.newaxis]).sum(axis=1).astype(float)
+        values[self.n == 0] = np.nan
+        return values
+
+    def to_frame(self):
+        """One row per step with {column}_mean, _std, _min, _max and _qXX columns."""
+        import pandas as pd
+
+        data = {}
+        for column in self.columns:
+            data[f"{column}_mean"] = self.mean[column]
+            data[f"{column}_std"] = self.std(column)
+            data[f"{column}_min"] = self.min[column]
+            data[f"{column}_max"] = self.max[column]
+            for q in QUANTILES:
+                data[f"{column}_q{int(q * 100):02d}"] = self.quantile(column, q)
+        data["runs"] = self.n
+        return pd.DataFrame(data)
@@ -0,0 +1,212 @@
+# benchmark.py measures the cost of the main simulation paths
+# Usage: python benchmark.py <name>, run without argument to list the benchmarks
+
+import os
+import subprocess
+import sys
+from time import perf_counter
+from model import WasteModel
+
+
+def scaled_config(width, height, **overrides):
+    """Config with agents and wastes proportional to the grid area."""
+    density = width * height / 400
+    config = {
+        "width": width,
+        "height": height,
+        "num_green_agents": max(3, int(3 * density)),
+        "num_yellow_agents": max(3, int(3 * density)),
+        "num_red_agents": max(3, int(3 * density)),
+        "num_green_waste": max(4, int(20 * density)),
+        "num_yellow_waste": max(2, int(10 * density)),
+        "num_red_waste": max(2, int(10 * density)),
+        "Strategy_Green": "Fusion And Research",
+        "Strategy_Yellow": "Fusion And Research",
+        "Strategy_Red": "Fusion And Research",
+        "seed": 0,
+    }
+    config.update(overrides)
+    return config
+
+
+def bench_percept_act(sizes=((21, 10), (60, 30), (120, 60), (240, 120)), ticks=50):
+    """Time Robot.percept and a full Robot.step_agent per robot for both grid backends."""
+    print(f"{'backend':<11} {'grid':>9} {'robots':>7} {'percept (us)':>13} {'step (us)':>10}")
+    for backend in ("multigrid", "cell_space"):
+        for width, height in sizes:
+            model = WasteModel(**scaled_config(width, height, grid_backend=backend))
+            robots = model.robots
+
+            start = perf_counter()
+            for _ in range(ticks):
+                for robot in robots:
+                    robot.percept()
+            percept_time = (perf_counter() - start) / (ticks * len(robots))
+
+            start = perf_counter()
+            for _ in range(ticks):
+                for robot in robots:
+                    robot.step_agent()
+            step_time = (perf_counter() - start) / (ticks * len(robots))
+
+            print(
+                f"{backend:<11} {f'{width}x{height}':>9} {len(robots):>7} "
+                f"{percept_time * 1e6:>13.1f} {step_time * 1e6:>10.1f}"
+            )
+
+
+def bench_construction(sizes=((50, 25), (100, 50), (200, 100), (400, 200), (800, 400)), repeats=3):
+    """Time WasteModel construction against the grid area, best of `repeats`."""
+    print(f"{'backend':<11} {'grid':>9} {'cells':>8} {'build (s)':>10} {'per cell (us)':>14}")
+    for backend in ("multigrid", "cell_space"):
+        for width, height in sizes:
+            best = float("inf")
+            for _ in range(repeats):
+                start = perf_counter()
+                WasteModel(**scaled_config(width, height, grid_backend=backend))
+                best = min(best, perf_counter() - start)
+            cells = width * height
+            print(
+                f"{backend:<11} {f'{width}x{height}':>9} {cells:>8} "
+                f"{best:>10.3f} {best / cells * 1e6:>14.2f}"
+            )
+
+
+def import_time(command):
+    """Total import time in seconds reported by python -X importtime, and the modules loaded."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    total = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+        # Only top-level imports, nested ones are already in their parent cumulative time
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return total / 1e6, modules
+
+
+def bench_import_time():
+    """Import cost of the simulation modules, the analysis script and the headless entry point."""
+    commands = {
+        "import model": ["-c", "import model"],
+        "import run_strat": ["-c", "import run_strat"],
+        "import server": ["-c", "import server"],
+        "python -m robot_mission_13": ["-c", "import runpy, sys; sys.argv = ['', 'run', '--steps', '0']; runpy.run_path('__main__.py')"],
+    }
+    print(f"{'command':<28} {'import (s)':>10}  heavy modules loaded")
+    for label, command in commands.items():
+        total, modules = import_time(command)
+        heavy = [name for name in ("pandas", "matplotlib.pyplot", "solara") if name in modules]
+        print(f"{label:<28} {total:>10.3f}  {', '.join(heavy) or '-'}")
+
+
+def bench_contract_net(worlds=10, max_steps=7000):
+    """Steps to convergence and messages sent by the communicating strategies,
+    on the run_strat.py waste tuples with the same seeded worlds for each strategy."""
+    from run_strat import WASTE_TUPLES, STALL_WINDOW
+
+    strategies = ["Fusion And Research With Communication", "Fusion And Research With Contract Net"]
+    print(f"{'wastes':<13} {'strategy':<40} {'steps':>7} {'cleared':>8} {'messages':>9}")
+    for wastes in WASTE_TUPLES:
+        for strategy in strategies:
+            steps, cleared, messages = 0, 0, 0
+            for seed in range(worlds):
+                config = scaled_config(
+                    41, 20,
+                    num_green_agents=3, num_yellow_agents=3, num_red_agents=3,
+                    num_green_waste=wastes[0], num_yellow_waste=wastes[1], num_red_waste=wastes[2],
+                    Strategy_Green=strategy, Strategy_Yellow=strategy, Strategy_Red=strategy,
+                    seed=seed, stall_window=STALL_WINDOW,
+                )
+                model = WasteModel(**config)
+                while model.running and sum(model.waste_counts) > 0 and model.steps < max_steps:
+                    model.step()
+                # Stalled or unfinished runs count as max_steps
+                done = sum(model.waste_counts) == 0
+                steps += model.steps if done else max_steps
+                cleared += done
+                messages += model.get_message_count()
+            print(
+                f"{str(wastes):<13} {strategy:<40} {steps / worlds:>7.1f} "
+                f"{cleared / worlds:>8.0%} {messages / worlds:>9.1f}"
+            )
+
+
+def bench_strips(sizes=((120, 60), (300, 150), (600, 300)), steps=100):
+    """Time per step of a synchronous run in one process and split in one process per zone,
+    checking that both give the same waste counts."""
+    from strips import StripEngine
+
+    print(f"{'grid':>9} {'robots':>7} {'single (ms)':>12} {'strips (ms)':>12} {'same':>5}")
+    for width, height in sizes:
+        config = scaled_config(width, height)
+        model = WasteModel(**config, update_mode="synchronous")
+        start = perf_counter()
+        for _ in range(steps):
+            model.step()
+        single_time = (perf_counter() - start) / steps
+
+        engine = StripEngine(config)
+        start = perf_counter()
+        for _ in range(steps):
+            engine.step()
+        strips_time = (perf_counter() - start) / steps
+        engine.close()
+
+        same = all(list(model.datacollector.model_vars[c]) == engine.model_vars[c] for c in engine.model_vars)
+        print(
+            f"{f'{width}x{height}':>9} {len(model.robots):>7} "
+            f"{single_time * 1e3:>12.2f} {strips_time * 1e3:>12.2f} {str(same):>5}"
+        )
+
+
+def bench_vector_env(sizes=((21, 10), (60, 30), (120, 60)), num_envs=(1, 4), steps=200):
+    """Robot steps per second of a policy playing random actions in VectorWasteEnv,
+    against the strategies deliberating in a synchronous WasteModel."""
+    import numpy as np
+    from vector_env import VectorWasteEnv
+
+    print(f"{'grid':>9} {'robots':>7} {'strategies':>11} " + " ".join(f"{f'K={k}':>9}" for k in num_envs) + "  (robot steps/s)")
+    rng = np.random.default_rng(0)
+    for width, height in sizes:
+        config = scaled_config(width, height)
+        model = WasteModel(**config, update_mode="synchronous")
+        start = perf_counter()
+        for _ in range(steps):
+            model.step()
+        rates = [steps * len(model.robots) / (perf_counter() - start)]
+
+        for k in num_envs:
+            env = VectorWasteEnv(config, num_envs=k)
+            env.reset()
+            actions = rng.integers(0, 8, size=(steps, k, env.num_robots))
+            start = perf_counter()
+            for i in range(steps):
+                env.step(actions[i])
+            rates.append(steps * k * env.num_robots / (perf_counter() - start))
+            env.close()
+        print(f"{f'{width}x{height}':>9} {len(model.robots):>7} {rates[0]:>11.0f} " + " ".join(f"{rate:>9.0f}" for rate in rates[1:]))
+
+
+BENCHMARKS = {
+    "percept": bench_percept_act,
+    "construction": bench_construction,
+    "imports": bench_import_time,
+    "contract_net": bench_contract_net,
+    "strips": bench_strips,
+    "vector_env": bench_vector_env,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("Available benchmarks: " + ", ".join(BENCHMARKS))
+    else:
+        BENCHMARKS[sys.argv[1]]()
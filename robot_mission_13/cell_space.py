@@ -0,0 +1,81 @@
+# cell_space.py contains a grid backend built on Mesa's discrete cell space
+
+from mesa.discrete_space import OrthogonalMooreGrid
+from objects import WasteAgent
+
+
+class CellSpaceGrid:
+    """MultiGrid-compatible grid backed by Mesa's OrthogonalMooreGrid.
+
+    The radius-1 Moore neighborhood of a cell is computed once, the first time
+    a robot perceives from it, and radioactivity and the number of wastes lying on each cell
+    are kept in property layers so they can be read without scanning the cell.
+    Mesa cannot draw this class, the Solara view draws `space` (see server.CellSpaceGraph).
+
+    attr:
+        space: The underlying OrthogonalMooreGrid
+        radioactivity: Property layer with the radioactivity of each cell
+        waste_count: Property layer with the number of wastes on the ground of each cell
+    """
+
+    def __init__(self, width, height, random=None):
+        self.width = width
+        self.height = height
+        self.torus = False
+        self.space = OrthogonalMooreGrid((width, height), torus=False, random=random)
+        self.radioactivity = self.space.create_property_layer("radioactivity", default_value=0.0)
+        self.waste_count = self.space.create_property_layer("waste_count", default_value=0, dtype=int)
+
+        # Cells of the neighborhood used by Robot.percept, filled on first visit
+        self.neighborhoods = {}
+
+    def place_agent(self, agent, pos):
+        self.space[pos].add_agent(agent)
+        agent.pos = pos
+        if isinstance(agent, WasteAgent):
+            self.waste_count.data[pos] += 1
+
+    def remove_agent(self, agent):
+        self.space[agent.pos].remove_agent(agent)
+        if isinstance(agent, WasteAgent):
+            self.waste_count.data[agent.pos] -= 1
+        agent.pos = None
+
+    def move_agent(self, agent, pos):
+        self.space[agent.pos].remove_agent(agent)
+        self.space[pos].add_agent(agent)
+        agent.pos = pos
+
+    def get_cell_list_contents(self, cell_list):
+        contents = []
+        for pos in cell_list:
+            contents.extend(self.space[pos].agents)
+        return contents
+
+    def get_neighbors(self, pos, moore=True, include_center=False, radius=1):
+        if moore and include_center and radius == 1:
+            cells = self.neighborhoods.get(pos)
+            if cells is None:
+                cells = self.neighborhoods[pos] = self.moore_neighborhood(pos)
+        else:
+            # Only the Moore neighborhood is precomputed
+            cells = self.space[pos].get_neighborhood(radius=radius, include_center=include_center).cells
+        neighbors = []
+        for cell in cells:
+            neighbors.extend(cell.agents)
+        return neighbors
+
+    def moore_neighborhood(self, pos):
+        # Center included, in the same column-major order as MultiGrid.get_neighbors
+        x, y = pos
+        return tuple(
+            self.space[(i, j)]
+            for i in range(max(x - 1, 0), min(x + 2, self.width))
+            for j in range(max(y - 1, 0), min(y + 2, self.height))
+        )
+
+    def get_radioactivity(self, pos):
+        return float(self.radioactivity.data[pos])
+
+    def has_waste(self, pos):
+        return self.waste_count.data[pos] > 0
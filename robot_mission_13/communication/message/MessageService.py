@@ -9,6 +9,7 @@ class MessageService:
     attr:
     
         messages_to_proceed: the list of message to proceed mailbox of the agent (list)
+        message_count: the number of messages sent since the creation of the service (int)
     """
 
     __instance = None
@@ -28,15 +29,30 @@ class MessageService:
         self.__model = model
         self.__instant_delivery = instant_delivery
         self.__messages_to_proceed = []
+        self.__recorder = None
+        self.__message_count = 0
 
     def set_instant_delivery(self, instant_delivery):
         """ Set the instant delivery parameter.
         """
         self.__instant_delivery = instant_delivery
 
+    def set_recorder(self, recorder):
+        """ Set the recorder notified of every sent message (None to disable).
+        """
+        self.__recorder = recorder
+
+    def get_message_count(self):
+        """ Return the number of messages sent so far.
+        """
+        return self.__message_count
+
     def send_message(self, message):
         """ Dispatch message if instant delivery active, otherwise add the message to proceed list.
         """
+        self.__message_count += 1
+        if self.__recorder is not None:
+            self.__recorder.record_message(message)
         if self.__instant_delivery:
     
             self.dispatch_message(message)
@@ -0,0 +1,43 @@
+# coverage.py contains the map of the cells already swept by the explorers of a color
+
+import numpy as np
+
+
+class CoverageMap:
+    """Cells of a color zone visited by its explorers while they were free to collect.
+
+    Every waste of the color lying on a visited cell has been collected, so a row whose
+    zone cells are all visited does not need to be swept again. The map is shared by
+    the robots of the color (one bool per cell instead of a list per robot).
+
+    attr:
+        x_range: Columns [start, end) of the zone
+        visited: Bool array indexed [x, y] like WasteModel.radioactivity_map
+    """
+
+    def __init__(self, width, height, x_range):
+        self.x_range = x_range
+        self.visited = np.zeros((width, height), dtype=bool)
+
+    def mark(self, pos):
+        self.visited[pos] = True
+
+    def explored_rows(self):
+        start, end = self.x_range
+        return self.visited[start:end].all(axis=0)
+
+    def reset(self, low, high):
+        self.visited[:, low:high] = False
+
+
+def nearest_unexplored_row(explored, y, low, high, step):
+    """First unexplored row of [low, high) after y in the direction of step (+1 or -1),
+    or before y if there is none that way. Returns (row, same_direction), row None if
+    every row of the range is explored."""
+    ahead = np.flatnonzero(~explored[y + 1 : high]) + y + 1 if step > 0 else np.flatnonzero(~explored[low:y]) + low
+    behind = np.flatnonzero(~explored[low:y]) + low if step > 0 else np.flatnonzero(~explored[y + 1 : high]) + y + 1
+    if len(ahead):
+        return int(ahead[0] if step > 0 else ahead[-1]), True
+    if len(behind):
+        return int(behind[-1] if step > 0 else behind[0]), False
+    return None, False
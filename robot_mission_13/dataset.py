@@ -0,0 +1,206 @@
+# dataset.py exports the transitions of seeded WasteModel episodes for offline learning
+#
+# Episodes run in synchronous mode: every robot deliberates on the same grid, so the
+# observations of all the robots are built at once (see vector_env.Observer) before
+# they plan. Each step appends one (observation, action, outcome) row per robot to
+# column buffers, written as a compressed NPZ shard once they hold chunk_bytes, so a
+# worker never holds more than one shard. manifest.json lists the shards.
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from model import WasteModel
+from strategy import Action
+from vector_env import Observer, action_rewards, OBSERVATION_SIZE, CELL_OFFSETS, CELL_FEATURES, ROBOT_FEATURES
+
+# Columns of a shard: name -> (dtype, shape of one row)
+TRANSITION_COLUMNS = {
+    "episode": ("<u4", ()),
+    "step": ("<u4", ()),          # Step at which the action was applied, from 1
+    "robot": ("<u4", ()),         # Robot unique_id
+    "color": ("u1", ()),
+    "observation": ("<f4", (OBSERVATION_SIZE,)),
+    "action": ("u1", ()),         # Action value
+    "success": ("u1", ()),        # The action worked (LastActionNotWorked is None)
+    "reward": ("<f4", ()),        # 1 for a fusion or a disposal, see vector_env.action_rewards
+    "terminated": ("u1", ()),     # No waste left after this step
+}
+
+# Bytes of one transition in the buffers
+ROW_BYTES = sum(np.dtype(dtype).itemsize * int(np.prod(shape)) for dtype, shape in TRANSITION_COLUMNS.values())
+
+# Default size of the buffers of a worker, about 110 000 transitions
+CHUNK_BYTES = 32 << 20
+
+
+class ShardWriter:
+    """Column buffers of chunk_size transitions (as many as fit in chunk_bytes), flushed
+    to `<prefix>-<n>.npz` when full.
+
+    attr:
+        shards: Manifest entry of every shard written
+    """
+
+    def __init__(self, directory, prefix, chunk_bytes=CHUNK_BYTES):
+        if chunk_bytes <= 0:
+            raise ValueError(f"chunk_bytes must be positive, got {chunk_bytes}")
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_size = max(chunk_bytes // ROW_BYTES, 1)
+        self.buffers = {
+            name: np.zeros((self.chunk_size, *shape), dtype=dtype) for name, (dtype, shape) in TRANSITION_COLUMNS.items()
+        }
+        self.size = 0
+        self.shards = []
+
+    def append(self, columns):
+        count = len(columns["episode"])
+        offset = 0
+        while offset < count:
+            taken = min(count - offset, self.chunk_size - self.size)
+            for name, values in columns.items():
+                self.buffers[name][self.size : self.size + taken] = values[offset : offset + taken]
+            self.size += taken
+            offset += taken
+            if self.size == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        if self.size == 0:
+            return
+        name = f"{self.prefix}-{len(self.shards):05d}.npz"
+        np.savez_compressed(
+            os.path.join(self.directory, name),
+            **{column: buffer[: self.size] for column, buffer in self.buffers.items()},
+        )
+        episodes = self.buffers["episode"][: self.size]
+        self.shards.append({
+            "file": name,
+            "transitions": self.size,
+            "episodes": [int(episodes[0]), int(episodes[-1])],
+        })
+        self.size = 0
+
+
+class RecordingModel(WasteModel):
+    """A synchronous WasteModel appending the transitions of its robots to a ShardWriter.
+
+    The observations of all the robots are taken before they plan, which is only what
+    they saw in synchronous mode: another update_mode is refused.
+    """
+
+    def __init__(self, writer, episode, **config):
+        if config.get("update_mode", "synchronous") != "synchronous":
+            raise ValueError("Transitions are recorded in synchronous mode only, observations are taken before planning")
+        super().__init__(**{**config, "update_mode": "synchronous"})
+        self.writer = writer
+        self.episode = episode
+        self.observer = Observer(self)
+        self.observations = np.zeros((len(self.robots), OBSERVATION_SIZE), dtype=np.float32)
+        self.robot_ids = np.array([robot.unique_id for robot in self.robots])
+        self.robot_colors = np.array([robot.color for robot in self.robots])
+
+    def step_synchronous(self):
+        # What the robots see when they plan: the grid left by the last step
+        self.observer.observe(self.observations)
+        super().step_synchronous()
+
+        count = len(self.robots)
+        self.writer.append({
+            "episode": np.full(count, self.episode),
+            "step": np.full(count, self.steps),
+            "robot": self.robot_ids,
+            "color": self.robot_colors,
+            "observation": self.observations,
+            "action": [robot.action.value for robot in self.robots],
+            "success": [robot.knowledge["LastActionNotWorked"] is None for robot in self.robots],
+            "reward": action_rewards(self),
+            "terminated": np.full(count, sum(self.waste_counts) == 0),
+        })
+
+
+def record_episodes(directory, prefix, model_config, episodes, seeds, max_steps, chunk_bytes):
+    """Run the given episodes with their seeds and write their transitions.
+    Module-level so it can be sent to worker processes. Returns the shards and the
+    manifest entry of every episode."""
+    writer = ShardWriter(directory, prefix, chunk_bytes)
+    summaries = []
+    for episode, seed in zip(episodes, seeds):
+        model = RecordingModel(writer, episode, **{**model_config, "seed": seed})
+        while model.steps < max_steps and sum(model.waste_counts) > 0 and model.running:
+            model.step()
+        summaries.append({
+            "episode": episode,
+            "seed": seed,
+            "steps": model.steps,
+            "cleared": sum(model.waste_counts) == 0,
+            "stall_reason": model.stall_reason,
+        })
+    writer.flush()
+    return writer.shards, summaries
+
+
+def export_dataset(directory, model_config, episodes, base_seed=None, max_steps=1000, chunk_bytes=CHUNK_BYTES,
+                   episodes_per_task=16, workers=None):
+    """
+    Record `episodes` episodes of model_config (episode i with seed base_seed + i) in
+    directory, spread over `workers` processes (all cores if None, in this process if 1).
+    Blocks of episodes_per_task episodes are written by one task in their own shards.
+    Episodes run in synchronous mode, see RecordingModel.
+    Returns the manifest, also saved as directory/manifest.json.
+    """
+    if chunk_bytes <= 0:
+        raise ValueError(f"chunk_bytes must be positive, got {chunk_bytes}")
+    if model_config.get("trace_path") is not None:
+        raise ValueError("Traces are not supported by the dataset export")
+    if model_config.get("update_mode", "synchronous") != "synchronous":
+        raise ValueError("The dataset export runs in synchronous mode only, see RecordingModel")
+    model_config = {**model_config, "update_mode": "synchronous"}
+    if base_seed is None:
+        # Explicit seeds: forked workers would otherwise share the parent's random state
+        base_seed = int(np.random.SeedSequence().entropy % 2**32)
+    os.makedirs(directory, exist_ok=True)
+
+    blocks = [range(start, min(start + episodes_per_task, episodes)) for start in range(0, episodes, episodes_per_task)]
+    arguments = [
+        [directory] * len(blocks),
+        [f"shard-{i:05d}" for i in range(len(blocks))],
+        [model_config] * len(blocks),
+        [list(block) for block in blocks],
+        [[base_seed + episode for episode in block] for block in blocks],
+        [max_steps] * len(blocks),
+        [chunk_bytes] * len(blocks),
+    ]
+    if workers == 1:
+        results = list(map(record_episodes, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(record_episodes, *arguments))
+
+    shards = [shard for block_shards, _ in results for shard in block_shards]
+    manifest = {
+        "columns": {name: {"dtype": dtype, "shape": list(shape)} for name, (dtype, shape) in TRANSITION_COLUMNS.items()},
+        "observation_features": [
+            f"{feature} {dx:+d},{dy:+d}" for dx, dy in CELL_OFFSETS for feature in CELL_FEATURES
+        ] + list(ROBOT_FEATURES),
+        "actions": {action.name: action.value for action in Action},
+        "config": {key: value for key, value in model_config.items() if key != "radioactivity_map"},
+        "base_seed": base_seed,
+        "max_steps": max_steps,
+        "transitions": sum(shard["transitions"] for shard in shards),
+        "shards": shards,
+        "episodes": [summary for _, summaries in results for summary in summaries],
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def load_dataset(directory, columns=None):
+    """Yield the shards of an exported dataset one by one, as dicts of arrays."""
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    for shard in manifest["shards"]:
+        with np.load(os.path.join(directory, shard["file"])) as data:
+            yield {name: data[name] for name in (columns or manifest["columns"])}
@@ -0,0 +1,96 @@
+# distance_fields.py contains breadth-first distance fields over the static grid geometry
+
+from collections import OrderedDict
+import threading
+import numpy as np
+
+
+# Neighbor offsets in order of preference when several moves get closer to the target
+GRADIENT_OFFSETS = ((1, 0), (0, 1), (0, -1), (-1, 0))
+
+# Fields only depend on the geometry, so they are shared by every model of a process
+# (replicates with the same size and zones rebuild nothing). Least recently used first,
+# the contract net builds one per waste it goes to fetch
+FIELD_CACHE = OrderedDict()
+
+# Fields kept in FIELD_CACHE, each holds 5 bytes per cell
+FIELD_CACHE_SIZE = 64
+
+# Robots of a deliberation pool look fields up from several threads
+FIELD_CACHE_LOCK = threading.Lock()
+
+
+def bfs_distances(passable, targets):
+    """Number of 4-connected moves from each passable cell to the nearest target, -1 if unreachable."""
+    distances = np.full(passable.shape, -1, dtype=np.int32)
+    frontier = targets & passable
+    distance = 0
+    while frontier.any():
+        distances[frontier] = distance
+        grown = np.zeros_like(frontier)
+        grown[1:, :] |= frontier[:-1, :]
+        grown[:-1, :] |= frontier[1:, :]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        frontier = grown & passable & (distances < 0)
+        distance += 1
+    return distances
+
+
+class DistanceField:
+    """BFS distances to a set of target cells and, for each cell, the offset of the move
+    one step closer (the gradient), both indexed [x, y] like WasteModel.radioactivity_map.
+
+    attr:
+        distances: Moves to the nearest target, -1 outside the passable cells
+        gradient: Index in GRADIENT_OFFSETS of the next move, -1 on targets and unreachable cells
+    """
+
+    def __init__(self, passable, targets):
+        self.distances = bfs_distances(passable, targets)
+        self.gradient = np.full(passable.shape, -1, dtype=np.int8)
+        width, height = passable.shape
+        padded = np.full((width + 2, height + 2), -1, dtype=np.int32)
+        padded[1:-1, 1:-1] = self.distances
+        closer_to = self.distances - 1
+        # Offsets are tried in reverse so the preferred one is written last
+        for index in reversed(range(len(GRADIENT_OFFSETS))):
+            dx, dy = GRADIENT_OFFSETS[index]
+            neighbor = padded[1 + dx : width + 1 + dx, 1 + dy : height + 1 + dy]
+            self.gradient[(self.distances > 0) & (neighbor == closer_to)] = index
+
+    def distance(self, pos):
+        return int(self.distances[pos])
+
+    def next_offset(self, pos):
+        """Offset of the move toward the target, None on a target or an unreachable cell."""
+        index = self.gradient[pos]
+        return GRADIENT_OFFSETS[index] if index >= 0 else None
+
+
+def distance_field(model, max_radioactivity, target):
+    """Field over the cells a robot with max_radioactivity can enter, toward `target`:
+    "border" for the easternmost column it can reach, ("column", x) for a whole column,
+    or a cell position such as model.disposal_pos."""
+    key = (model.geometry, max_radioactivity, target)
+    with FIELD_CACHE_LOCK:
+        field = FIELD_CACHE.get(key)
+        if field is not None:
+            FIELD_CACHE.move_to_end(key)
+    if field is None:
+        # Reads the whole map: a field covers every cell the robot can reach
+        passable = model.radioactivity_map <= max_radioactivity
+        targets = np.zeros_like(passable)
+        if target == "border":
+            border = np.flatnonzero(passable.any(axis=1)).max()
+            targets[border] = passable[border]
+        elif target[0] == "column":
+            targets[target[1]] = passable[target[1]]
+        else:
+            targets[target] = True
+        field = DistanceField(passable, targets)
+        with FIELD_CACHE_LOCK:
+            FIELD_CACHE[key] = field
+            if len(FIELD_CACHE) > FIELD_CACHE_SIZE:
+                FIELD_CACHE.popitem(last=False)
+    return field
@@ -0,0 +1,82 @@
+# drop_offs.py indexes the wastes left on a zone border for the robots of the next color
+
+
+class DropOffBuffer:
+    """Upgraded wastes of one color lying where robots of the color below dropped them,
+    until a robot of their color collects them.
+
+    Robots drop a fused waste on the eastern border of their zone (see
+    FusionAndResearch), the wastes of a position form a pile. The model adds the drops
+    and removes the collects, so the piles can be queried without scanning the grid.
+
+    attr:
+        piles: Position -> wastes of the pile, in drop order
+        dropped_at: Waste unique_id -> (position, step of the drop)
+        latencies: Steps between the drop and the collect of every waste handed off
+        total_latency: Sum of latencies
+        claims: Position -> (robot unique_id, step) of the robot fetching the pile, renewed
+            at every step it keeps going there
+    """
+
+    def __init__(self):
+        self.piles = {}
+        self.dropped_at = {}
+        self.latencies = []
+        self.total_latency = 0
+        self.claims = {}
+
+    def __len__(self):
+        return len(self.dropped_at)
+
+    def add(self, waste, step):
+        self.piles.setdefault(waste.pos, []).append(waste)
+        self.dropped_at[waste.unique_id] = (waste.pos, step)
+
+    def discard(self, waste):
+        """Forget a waste of the buffer, returns the step it was dropped at or None."""
+        entry = self.dropped_at.pop(waste.unique_id, None)
+        if entry is None:
+            return None
+        pos, step = entry
+        pile = self.piles[pos]
+        pile.remove(waste)
+        if not pile:
+            del self.piles[pos]
+            self.claims.pop(pos, None)
+        return step
+
+    def take(self, waste, step):
+        """A robot collected the waste at `step`, returns its hand-off latency or None
+        if it was not in the buffer."""
+        dropped = self.discard(waste)
+        if dropped is None:
+            return None
+        self.latencies.append(step - dropped)
+        self.total_latency += step - dropped
+        return step - dropped
+
+    def counts(self):
+        return {pos: len(pile) for pos, pile in self.piles.items()}
+
+    def claim(self, pos, robot_id, step):
+        self.claims[pos] = (robot_id, step)
+
+    def claimed(self, pos, robot_id, step):
+        # A claim not renewed during the last step is over
+        claim = self.claims.get(pos)
+        return claim is not None and claim[0] != robot_id and claim[1] >= step - 1
+
+    def nearest(self, pos, rows=None, robot_id=None, step=None):
+        """Pile closest to pos (Manhattan distance), among the piles in rows [low, high)
+        if given and not claimed by another robot than robot_id at step, None if there
+        is none. Ties go to the oldest pile."""
+        best = None
+        for pile in self.piles:
+            if rows is not None and not rows[0] <= pile[1] < rows[1]:
+                continue
+            if robot_id is not None and self.claimed(pile, robot_id, step):
+                continue
+            distance = abs(pile[0] - pos[0]) + abs(pile[1] - pos[1])
+            if best is None or distance < best[0]:
+                best = (distance, pile)
+        return None if best is None else best[1]
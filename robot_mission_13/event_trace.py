@@ -0,0 +1,274 @@
+# event_trace.py records WasteModel runs in a compact binary file and replays them
+# without instantiating robots or strategies
+
+import atexit
+import os
+import sys
+import numpy as np
+import mesa
+from mesa.space import MultiGrid
+from objects import WasteAgent, WasteDisposalAgent, Colors
+from agents import Robot
+from strategy import Action
+
+
+# One fixed-size record per event, appended in step order
+TRACE_DTYPE = np.dtype(
+    [
+        ("step", "<u4"),
+        ("agent", "<u4"),
+        ("kind", "u1"),
+        ("code", "u1"),      # Action value, or performative value - 100 for messages
+        ("success", "u1"),
+        ("color", "u1"),     # Color of the waste involved, NO_COLOR if none
+        ("x", "<i2"),
+        ("y", "<i2"),
+        ("target", "<u4"),   # Receiver of a message
+    ]
+)
+
+NO_COLOR = 255
+
+WASTE_COLUMNS = {
+    "Green Wastes": Colors.GREEN,
+    "Yellow Wastes": Colors.YELLOW,
+    "Red Wastes": Colors.RED,
+}
+
+
+# Kinds of records stored in a trace
+class TraceKind:
+    ACTION = 0      # A robot action handled by WasteModel.do
+    MESSAGE = 1     # A message sent through the MessageService
+    WASTE = 2       # A waste lying on the grid at step 0
+    DISPOSAL = 3    # The waste disposal cell
+    ROBOT = 4       # A robot at step 0
+    GRID = 5        # Grid size, stored in x and y
+
+
+class TraceRecorder:
+    """Append-only recorder writing TRACE_DTYPE records to a binary file.
+
+    Records are buffered in a preallocated array and written with a single
+    tofile call when the buffer is full, so recording costs one row assignment
+    per event. The last records are written by close, called by WasteModel.close,
+    at the end of a with block, or at exit for a recorder left open.
+    """
+
+    def __init__(self, model, path, buffer_size=4096):
+        self.model = model
+        self.path = path
+        self.buffer = np.zeros(buffer_size, dtype=TRACE_DTYPE)
+        self.size = 0
+        self.robots = {}
+        self.closed = False
+        # Truncate any previous trace at the same path
+        open(path, "wb").close()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _append(self, agent_id, kind, code, success, color, pos, target=0):
+        if self.size == len(self.buffer):
+            self.flush()
+        self.buffer[self.size] = (
+            self.model.steps,
+            agent_id,
+            kind,
+            code,
+            success,
+            NO_COLOR if color is None else color,
+            pos[0],
+            pos[1],
+            target,
+        )
+        self.size += 1
+
+    def record_initial_state(self):
+        self._append(0, TraceKind.GRID, 0, 1, None, (self.model.width, self.model.height))
+        for agent in self.model.agents:
+            if isinstance(agent, Robot):
+                self.robots[agent.unique_id] = agent
+                self._append(agent.unique_id, TraceKind.ROBOT, 0, 1, agent.color, agent.pos)
+            elif isinstance(agent, WasteDisposalAgent):
+                self._append(agent.unique_id, TraceKind.DISPOSAL, 0, 1, None, agent.pos)
+            elif isinstance(agent, WasteAgent) and agent.pos is not None:
+                self._append(agent.unique_id, TraceKind.WASTE, 0, 1, agent.color, agent.pos)
+
+    def record_action(self, agent, action, color=None):
+        success = agent.knowledge["LastActionNotWorked"] is None
+        self._append(agent.unique_id, TraceKind.ACTION, action.value, success, color, agent.pos)
+
+    def record_message(self, message):
+        sender = self.robots.get(message.get_exp())
+        pos = sender.pos if sender is not None else (-1, -1)
+        self._append(
+            message.get_exp(),
+            TraceKind.MESSAGE,
+            message.get_performative().value - 100,
+            1,
+            None,
+            pos,
+            message.get_dest(),
+        )
+
+    def flush(self):
+        with open(self.path, "ab") as f:
+            self.buffer[: self.size].tofile(f)
+        self.size = 0
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        atexit.unregister(self.close)
+
+
+class TraceReplay:
+    """Read-only view over a trace file, memory-mapped so it is never fully loaded."""
+
+    def __init__(self, path):
+        # Whole records only, a run killed while flushing may leave a partial one
+        count = os.path.getsize(path) // TRACE_DTYPE.itemsize
+        if count == 0:
+            raise ValueError(f"Trace {path} has no record, was its recorder closed?")
+        self.records = np.memmap(path, dtype=TRACE_DTYPE, mode="r", shape=(count,))
+        steps = self.records["step"]
+        self.last_step = int(steps[-1])
+        # Records are appended in step order, so each step is a contiguous slice
+        self.step_starts = np.searchsorted(steps, np.arange(self.last_step + 2))
+
+        header = self.records_at(0)
+        grid = header[header["kind"] == TraceKind.GRID][0]
+        self.width, self.height = int(grid["x"]), int(grid["y"])
+        disposal = header[header["kind"] == TraceKind.DISPOSAL][0]
+        self.disposal = (int(disposal["x"]), int(disposal["y"]))
+
+    def records_at(self, step):
+        return self.records[self.step_starts[step] : self.step_starts[step + 1]]
+
+    def actions(self):
+        return self.records[self.records["kind"] == TraceKind.ACTION]
+
+    def messages(self):
+        return self.records[self.records["kind"] == TraceKind.MESSAGE]
+
+    def waste_counts(self):
+        """Rebuild the WasteModel datacollector columns, one row per step."""
+        header = self.records_at(0)
+        initial = np.bincount(
+            header[header["kind"] == TraceKind.WASTE]["color"], minlength=4
+        )[:4]
+
+        actions = self.actions()
+        actions = actions[actions["success"] == 1]
+        delta = np.zeros((self.last_step + 1, 4), dtype=np.int64)
+
+        # A fusion consumes two wastes of the robot color and creates one of the next
+        fusions = actions[actions["code"] == Action.FUSION.value]
+        np.add.at(delta, (fusions["step"], fusions["color"] - 1), -2)
+        np.add.at(delta, (fusions["step"], fusions["color"]), 1)
+
+        # A drop on the disposal cell destroys the waste
+        drops = actions[actions["code"] == Action.DROP.value]
+        disposed = drops[(drops["x"] == self.disposal[0]) & (drops["y"] == self.disposal[1])]
+        np.add.at(delta, (disposed["step"], disposed["color"]), -1)
+
+        counts = initial + np.cumsum(delta, axis=0)
+        columns = {"Wastes": counts.sum(axis=1)}
+        for column, color in WASTE_COLUMNS.items():
+            columns[column] = counts[:, color]
+        return columns
+
+
+class TraceMarker(mesa.Agent):
+    """Passive stand-in for a robot, waste or disposal drawn by the replay view."""
+
+    def __init__(self, model, kind, color=None):
+        super().__init__(model)
+        self.kind = kind
+        self.color = color
+
+    def step(self):
+        pass
+
+
+class ReplayModel(mesa.Model):
+    """Model driving the Solara view from a trace, advancing `speed` recorded steps per tick."""
+
+    def __init__(self, trace_path, speed=1, seed=None):
+        super().__init__(seed=seed)
+        self.replay = TraceReplay(trace_path)
+        self.speed = speed
+        self.trace_step = 0
+        self.width = self.replay.width
+        self.height = self.replay.height
+        self.grid = MultiGrid(self.width, self.height, torus=False)
+        self.robots = {}
+        self.counts = self.replay.waste_counts()
+
+        for record in self.replay.records_at(0):
+            pos = (int(record["x"]), int(record["y"]))
+            match record["kind"]:
+                case TraceKind.ROBOT:
+                    marker = TraceMarker(self, TraceKind.ROBOT, int(record["color"]))
+                    self.robots[int(record["agent"])] = marker
+                    self.grid.place_agent(marker, pos)
+                case TraceKind.WASTE:
+                    self.grid.place_agent(TraceMarker(self, TraceKind.WASTE, int(record["color"])), pos)
+                case TraceKind.DISPOSAL:
+                    self.grid.place_agent(TraceMarker(self, TraceKind.DISPOSAL), pos)
+
+        self.datacollector = mesa.DataCollector(
+            model_reporters={
+                column: (lambda m, column=column: int(m.counts[column][m.trace_step]))
+                for column in ["Wastes", *WASTE_COLUMNS]
+            }
+        )
+        self.datacollector.collect(self)
+
+    def apply(self, record):
+        if record["kind"] != TraceKind.ACTION or not record["success"]:
+            return
+        pos = (int(record["x"]), int(record["y"]))
+        robot = self.robots[int(record["agent"])]
+        match Action(int(record["code"])):
+            case Action.COLLECT:
+                for marker in self.grid.get_cell_list_contents([pos]):
+                    if marker.kind == TraceKind.WASTE and marker.color == record["color"]:
+                        self.grid.remove_agent(marker)
+                        marker.remove()
+                        break
+            case Action.DROP:
+                if pos != self.replay.disposal:
+                    self.grid.place_agent(TraceMarker(self, TraceKind.WASTE, int(record["color"])), pos)
+            case Action.FUSION | Action.DO_NOTHING:
+                pass
+            case _:
+                self.grid.move_agent(robot, pos)
+
+    def step(self):
+        for _ in range(self.speed):
+            if self.trace_step >= self.replay.last_step:
+                self.running = False
+                break
+            self.trace_step += 1
+            for record in self.replay.records_at(self.trace_step):
+                self.apply(record)
+        self.datacollector.collect(self)
+
+
+if __name__ == "__main__":
+    # Usage: python event_trace.py <trace file>
+    replay = TraceReplay(sys.argv[1])
+    counts = replay.waste_counts()
+    actions = replay.actions()
+    print(f"{replay.width}x{replay.height} grid, {replay.last_step} steps, {len(replay.records)} records")
+    print(f"{len(actions)} actions ({int(actions['success'].sum())} successful), {len(replay.messages())} messages")
+    cleared = np.flatnonzero(counts["Wastes"] == 0)
+    print(f"Final wastes: {int(counts['Wastes'][-1])}, cleared at step: {int(cleared[0]) if len(cleared) else None}")
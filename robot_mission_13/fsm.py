@@ -0,0 +1,118 @@
+# fsm.py evaluates the finite state machines the strategies declare as rule tables
+#
+# A strategy lists, for every state, its rules in priority order. A rule fires when
+# its guard holds over the perception features of the robot; it returns an Action
+# (a constant, or computed by a method, None meaning "fall through to the next
+# rule") and may switch the robot to another mode. Method names in the rules are
+# resolved once per strategy class, so a subclass overriding a method changes the
+# rule without copying the table.
+
+
+class Rule:
+    """One transition of a state.
+
+    attr:
+        guard: callable(strategy, features) -> bool, a method name, or None for "always"
+        action: An Action, or a callable / method name (strategy, features) -> Action or None
+        mode: Mode the strategy switches to when the rule fires, None to stay
+        then: callable / method name (strategy, features, action) -> Action applied to the result
+    """
+
+    __slots__ = ("guard", "action", "mode", "then")
+
+    def __init__(self, guard, action, mode=None, then=None):
+        self.guard = guard
+        self.action = action
+        self.mode = mode
+        self.then = then
+
+    def replace(self, **changes):
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return Rule(**fields)
+
+
+def resolve(cls, reference):
+    # Method names are looked up on the strategy class, functions are kept
+    return getattr(cls, reference) if isinstance(reference, str) else reference
+
+
+class StateMachine:
+    """Rule tables indexed by state, compiled per strategy class into tuples of
+    (guard, action, constant, mode, then) so a decision is a dict lookup and a scan.
+
+    attr:
+        states: Rules of every state, the state of a strategy is given by its state() method
+    """
+
+    def __init__(self, states):
+        self.states = {state: tuple(rules) for state, rules in states.items()}
+        self.compiled = {}
+
+    def derive(self, states):
+        """A machine with some states replaced, for a strategy refining another one."""
+        return StateMachine({**self.states, **states})
+
+    def tables(self, cls):
+        tables = self.compiled.get(cls)
+        if tables is None:
+            tables = {
+                state: tuple(
+                    (
+                        resolve(cls, rule.guard),
+                        resolve(cls, rule.action),
+                        not callable(rule.action) and not isinstance(rule.action, str),
+                        rule.mode,
+                        resolve(cls, rule.then),
+                    )
+                    for rule in rules
+                )
+                for state, rules in self.states.items()
+            }
+            self.compiled[cls] = tables
+        return tables
+
+    def run(self, strategy, features, start=0):
+        """Action of the first rule of the strategy state that fires, from rule `start`."""
+        tables = self.compiled.get(type(strategy)) or self.tables(type(strategy))
+        for guard, action, constant, mode, then in tables[strategy.state()][start:]:
+            if guard is not None and not guard(strategy, features):
+                continue
+            result = action if constant else action(strategy, features)
+            if result is None:
+                continue
+            if then is not None:
+                result = then(strategy, features, result)
+            if mode is not None:
+                strategy.mode = mode
+            return result
+        return None
+
+
+def first_rules(strategies, features):
+    """Index of the first rule whose guard holds for each strategy, in the MACHINE of its class.
+
+    Strategies in the same state are evaluated together, one rule at a time over the
+    robots for which no earlier guard held. Guards only read the features and the
+    strategy they are given, so this gives the rule run() would start from, and
+    machine.run(strategy, features, start=index) completes the decision.
+    """
+    groups = {}
+    for i, strategy in enumerate(strategies):
+        groups.setdefault((type(strategy), strategy.state()), []).append(i)
+    first = [None] * len(strategies)
+    for (cls, state), pending in groups.items():
+        rules = cls.MACHINE.tables(cls)[state]
+        for index, (guard, *_) in enumerate(rules):
+            remaining = []
+            for i in pending:
+                if guard is None or guard(strategies[i], features[i]):
+                    first[i] = index
+                else:
+                    remaining.append(i)
+            pending = remaining
+            if not pending:
+                break
+        for i in pending:
+            first[i] = len(rules)
+    return first
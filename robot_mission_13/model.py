@@ -1,28 +1,25 @@
+import hashlib
 import mesa
-from objects import RadioactivityAgent, WasteAgent, WasteDisposalAgent, Colors
+import numpy as np
+from objects import WasteAgent, WasteDisposalAgent, Colors, RADIOACTIVITY_BANDS
 from agents import GreenAgent, YellowAgent, RedAgent, Robot
-from strategy import Action
-from mesa.space import MultiGrid
+from strategy import Action, MOVE_DIRECTIONS
+from mesa.space import MultiGrid, PropertyLayer
+from concurrent.futures import ThreadPoolExecutor
 from communication.message.MessageService import MessageService
+from event_trace import TraceRecorder
+from cell_space import CellSpaceGrid
+from coverage import CoverageMap
+from drop_offs import DropOffBuffer
+from neighborhoods import NEIGHBOR_OFFSETS, border_classes, direction_masks, enterable_cells
 
 
 
 def compute_waste_number(model, color=None):
+    # Counters maintained by WasteModel, see waste_counts
     if color is None:
-        waste_agents = [
-            agent
-            for agent in model.agents_by_type[WasteAgent]
-            if isinstance(agent, WasteAgent)
-        ]
-        
-        return len(waste_agents)
-
-    waste_agents = [
-        agent
-        for agent in model.agents_by_type[WasteAgent]
-        if isinstance(agent, WasteAgent) and agent.color == color
-    ]
-    return len(waste_agents)
+        return sum(model.waste_counts)
+    return model.waste_counts[color]
 
 
 def compute_waste_model_red(model):
@@ -37,6 +34,19 @@ def compute_waste_model_green(model):
     return compute_waste_number(model, color=Colors.GREEN)
 
 
+def compute_pending_drop_offs(model):
+    return sum(len(buffer) for buffer in model.drop_offs)
+
+
+def compute_handoff_latency(model):
+    # Mean steps between the drop of a waste on a zone border and its collect by a
+    # robot of its color, over the hand-offs done so far
+    handed_off = sum(len(buffer.latencies) for buffer in model.drop_offs)
+    if handed_off == 0:
+        return None
+    return sum(buffer.total_latency for buffer in model.drop_offs) / handed_off
+
+
 class WasteModel(mesa.Model):
     """A model with some number of agents."""
 
@@ -61,10 +71,29 @@ class WasteModel(mesa.Model):
         Strategy_Yellow = "Random",
         Strategy_Red = "Random",
         seed=None,
+        trace_path=None,
+        macro_actions=False,
+        update_mode="sequential",
+        deliberation_workers=0,
+        grid_backend="multigrid",
+        stall_window=None,
+        radioactivity_map=None,
+        fetch_drop_offs=False,
     ):
         super().__init__(seed=seed)
 
-        self.grid = MultiGrid(width, height, torus=False)
+        # A custom radioactivity map, indexed [x, y] (for instance
+        # np.load("site.npy", mmap_mode="r")), replaces the three vertical bands.
+        # It is never copied: cells are read when robots look at them, see
+        # _initialize_radioactivity
+        self.radioactivity_map = radioactivity_map
+        self.zone_bands = radioactivity_map is None
+        if radioactivity_map is not None:
+            width, height = radioactivity_map.shape
+
+        # "multigrid": legacy mesa.space.MultiGrid
+        # "cell_space": Mesa discrete cell space with property layers, see cell_space.py
+        self.cell_space = grid_backend == "cell_space"
         self.width = width
         self.height = height
         self.Strategy = {
@@ -77,6 +106,20 @@ class WasteModel(mesa.Model):
         self.width_z2 = int(width * proportion_z2)
         self.width_z1 = width - self.width_z3 - self.width_z2
 
+        # Identifies the radioactivity of the grid, for caches shared between models,
+        # see the geometry property for custom maps
+        self._geometry = (width, height, self.width_z1, self.width_z2) if radioactivity_map is None else None
+
+        # First column of each zone, then the width
+        self.zone_limits = [0, self.width_z1, self.width_z1 + self.width_z2, width]
+        self.grid = self._create_grid()
+
+        # Cells swept by the explorers of each color over their zone, see coverage.py
+        self.coverage = [
+            CoverageMap(width, height, (self.zone_limits[color], self.zone_limits[color + 1]))
+            for color in (Colors.GREEN, Colors.YELLOW, Colors.RED)
+        ]
+
         self.num_agents = {
             "green": num_green_agents,
             "yellow": num_yellow_agents,
@@ -88,7 +131,50 @@ class WasteModel(mesa.Model):
             "yellow": num_yellow_waste,
             "red": num_red_waste,
         }
-        self.first_of_color = [False, False, False]
+
+        # Number of wastes of each color, on the grid or carried, updated on fusion
+        # and disposal so the collector never scans the waste agents
+        self.waste_counts = [0, 0, 0, 0]
+
+        # Fused wastes dropped on a zone border and not collected yet, by color, see
+        # drop_offs.py. With fetch_drop_offs, idle explorers go and take them
+        self.drop_offs = [DropOffBuffer() for _ in self.waste_counts]
+        self.fetch_drop_offs = fetch_drop_offs
+
+        # Macro actions let robots repeat a committed move without deliberating,
+        # see Strategy.macro_length
+        self.macro_actions = macro_actions
+        self.skipped_deliberations = 0
+        self.static_directions = {}
+
+        # Static tables of the grid geometry, see neighborhoods.py: the neighborhood
+        # class of each column and row, and per robot color the direction masks and
+        # the cells it can enter (built once the robots exist, without a custom map)
+        self.column_classes = border_classes(width).tolist()
+        self.row_classes = border_classes(height).tolist()
+        self.direction_masks = {}
+        self.enterable = {}
+
+        # "sequential": robots perceive, deliberate and act one after the other.
+        # "synchronous": all robots deliberate on the same grid state, then act
+        # in shuffled order, see step_synchronous
+        self.update_mode = update_mode
+        self.deliberation_pool = (
+            ThreadPoolExecutor(max_workers=deliberation_workers)
+            if deliberation_workers > 0
+            else None
+        )
+        self.collect_conflicts = 0
+        self.robots = []
+        # Robots of each color created so far, their rank gives their lane and role
+        self.robot_counts = [0, 0, 0]
+
+        # Progress monitor: a successful COLLECT, FUSION or DROP (the only actions
+        # changing the waste counts) is progress. After stall_window steps without
+        # any, the run is stopped and stall_reason describes the stuck state
+        self.stall_window = stall_window
+        self.last_progress_step = 0
+        self.stall_reason = None
         
         self.__messages_service = MessageService(self)
         self._next_id = 0
@@ -97,33 +183,96 @@ class WasteModel(mesa.Model):
         self._initialize_agents()
         self._initialize_waste_disposal()
 
+        # Optional binary trace of every action and message, see event_trace.py
+        self.trace = None
+        if trace_path is not None:
+            self.trace = TraceRecorder(self, trace_path)
+            self.trace.record_initial_state()
+            self.__messages_service.set_recorder(self.trace)
+
         self.datacollector = mesa.DataCollector(
             model_reporters={
                 "Wastes": compute_waste_number,
                 "Red Wastes": compute_waste_model_red,
                 "Yellow Wastes": compute_waste_model_yellow,
                 "Green Wastes": compute_waste_model_green,
+                "Pending Drop-offs": compute_pending_drop_offs,
+                "Handoff Latency": compute_handoff_latency,
             },
+            # Carried wastes and last failed action are kept in the knowledge of the
+            # robots, not as attributes
             agenttype_reporters={RedAgent:{
-                "carrying": "carrying",
-                "LastActionNotWorked": "LastActionNotWorked",
+                "carrying": lambda agent: len(agent.knowledge["carrying"]),
+                "LastActionNotWorked": lambda agent: agent.knowledge["LastActionNotWorked"],
                 "color": "color",
-            }},  # TODO : voir lesquels sont utiles
+            }},
         )
         self.datacollector.collect(self)
 
-    def _initialize_radioactivity(self):
-        zones = [(self.width_z1, 0.1), (self.width_z2, 0.5), (self.width_z3, 0.9)]
-        start_x = 0
+    def _create_grid(self):
+        if self.cell_space:
+            return CellSpaceGrid(self.width, self.height, random=self.random)
+        return MultiGrid(self.width, self.height, torus=False)
 
-        for width, radioactivity in zones:
-            for j in range(self.height):
-                for i in range(width):
-                    agent = RadioactivityAgent(self, radiocativity=radioactivity)
-                    self.grid.place_agent(agent, (start_x + i, j))
-            start_x += width
+    def _initialize_radioactivity(self):
+        if not self.zone_bands:
+            if self.cell_space:
+                self.grid.radioactivity.data[:] = self.radioactivity_map
+            return
+
+        # Radioactivity of every cell, one vertical band per zone. The grid holds no
+        # agent for it: robots read the map, the visualization its property layer
+        self.radioactivity_map = np.repeat(
+            np.array([0.1, 0.5, 0.9]), [self.width_z1, self.width_z2, self.width_z3]
+        )[:, np.newaxis].repeat(self.height, axis=1)
+        if self.cell_space:
+            self.grid.radioactivity.data[:] = self.radioactivity_map
+        else:
+            layer = PropertyLayer("radioactivity", self.width, self.height, np.float64(0))
+            layer.data = self.radioactivity_map
+            self.grid.add_property_layer(layer)
+
+    def _place_batch(self, agents, positions):
+        """Place newly created agents, skipping the per-call checks of MultiGrid.place_agent."""
+        if self.cell_space:
+            for agent, pos in zip(agents, positions):
+                self.grid.place_agent(agent, pos)
+        else:
+            for agent, (x, y) in zip(agents, positions):
+                self.grid[x][y].append(agent)
+                agent.pos = (x, y)
+        # Wastes created without a color take the one of the cell they lie on
+        for agent in agents:
+            if isinstance(agent, WasteAgent) and agent.color is None:
+                agent.init_color()
+
+    def sample_cells(self, color, count, rows=None):
+        """Up to `count` random cells of a custom radioactivity map in the band of `color`,
+        within rows [low, high) if given. Only the drawn cells of the map are read."""
+        low, high = RADIOACTIVITY_BANDS[color]
+        row_low, row_high = rows or (0, self.height)
+        cells = []
+        for _ in range(100):
+            x = self.rng.integers(0, self.width, size=max(4 * count, 64))
+            y = self.rng.integers(row_low, row_high, size=len(x))
+            values = np.asarray(self.radioactivity_map[x, y])
+            inside = (values > low) & (values <= high)
+            cells.extend(zip(x[inside].tolist(), y[inside].tolist()))
+            if len(cells) >= count:
+                break
+        return cells[:count]
 
     def _initialize_waste(self):
+        if not self.zone_bands:
+            for color in ("green", "yellow", "red"):
+                value = getattr(Colors, color.upper())
+                positions = self.sample_cells(value, self.num_waste[color]) if self.num_waste[color] > 0 else []
+                if len(positions) < self.num_waste[color]:
+                    print(f"No room for {color} waste, {len(positions)} placed")
+                if positions:
+                    self._add_wastes(value, positions)
+            return
+
         zones = [
             (self.width_z1, "green"),
             (self.width_z2, "yellow"),
@@ -133,18 +282,20 @@ class WasteModel(mesa.Model):
 
         for width, color in zones:
             num_waste = self.num_waste[color]
-            if width > 0 and num_waste > 0:
-                agents = WasteAgent.create_agents(
-                    self, n=num_waste, color=getattr(Colors, color.upper())
-                )
-                x = self.random.choices(range(start_x, start_x + width), k=num_waste)
-                y = self.random.choices(range(self.height), k=num_waste)
-                for a, i, j in zip(agents, x, y):
-                    self.grid.place_agent(a, (i, j))
-            else:
-                print(f"No {color} waste in Zone {zones.index((width, color)) + 1}")
+            if num_waste > 0 and width == 0:
+                print(f"No room for {color} waste in Zone {zones.index((width, color)) + 1}")
+            elif num_waste > 0:
+                # Positions drawn in one vectorized call per zone
+                x = self.rng.integers(start_x, start_x + width, size=num_waste).tolist()
+                y = self.rng.integers(0, self.height, size=num_waste).tolist()
+                self._add_wastes(getattr(Colors, color.upper()), list(zip(x, y)))
             start_x += width
 
+    def _add_wastes(self, color, positions):
+        agents = WasteAgent.create_agents(self, n=len(positions), color=color)
+        self._place_batch(agents, positions)
+        self.waste_counts[color] += len(positions)
+
     def _initialize_agents(self):
         agent_classes = {"green": GreenAgent, "yellow": YellowAgent, "red": RedAgent}
         start_x = {
@@ -157,6 +308,12 @@ class WasteModel(mesa.Model):
             for _ in range(num):
                 unique_id = self.next_id()
                 agent = agent_classes[color](self, unique_id, self.Strategy[color])
+                if not self.zone_bands:
+                    cells = self.sample_cells(agent.color, 1)
+                    if not cells:
+                        raise ValueError(f"No cell of the radioactivity map for a {color} robot")
+                    self._add_robot(agent, cells[0])
+                    continue
                 x = self.random.choice(
                     range(
                         self.width_z1
@@ -166,25 +323,67 @@ class WasteModel(mesa.Model):
                         else self.width_z3
                     )
                 )
+                # Drawn over the whole height whatever the strategy, so that every
+                # strategy gets the same world for a seed. Robots outside their lane
+                # first walk to it, see Strategy.restrict_to_lane
                 y = self.random.choice(range(self.height))
-                self.grid.place_agent(agent, (start_x[color] + x, y))
-        
+                self._add_robot(agent, (start_x[color] + x, y))
+
+        if self.zone_bands:
+            for robot in self.robots:
+                if robot.color not in self.direction_masks:
+                    self.direction_masks[robot.color] = direction_masks(
+                        self.radioactivity_map, robot.max_radioactivity, robot.color != Colors.GREEN
+                    ).tolist()
+                    self.enterable[robot.color] = enterable_cells(self.radioactivity_map, robot.max_radioactivity).tolist()
+
+    def _add_robot(self, agent, pos):
+        self.grid.place_agent(agent, pos)
+        self.robots.append(agent)
+        self.robot_counts[agent.color] += 1
 
     def _initialize_waste_disposal(self):
         x = self.width - 1
-        y = self.random.choice(range(self.height))
-        agent = WasteDisposalAgent(self)
-        self.grid.place_agent(agent, (x, y))
+        rows = range(self.height)
+        if not self.zone_bands:
+            # A red cell of the east edge, where the red robots look for it
+            low, high = RADIOACTIVITY_BANDS[Colors.RED]
+            edge = np.asarray(self.radioactivity_map[x])
+            rows = np.flatnonzero((edge > low) & (edge <= high)).tolist() or rows
+        y = self.random.choice(rows)
+        self._add_disposal(WasteDisposalAgent(self), (x, y))
+
+    def _add_disposal(self, agent, pos):
+        self.grid.place_agent(agent, pos)
+        self.disposal_pos = pos
 
     def is_movement_possible(self, agent, pos):
         x, y = pos
-        return (
-            0 <= x < self.width
-            and 0 <= y < self.height
-            and agent.max_radioactivity >= self.get_radioactivity(x, y)
-        )
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        enterable = self.enterable.get(agent.color)
+        if enterable is not None:
+            return enterable[x][y]
+        return agent.max_radioactivity >= self.get_radioactivity(x, y)
+
+    def get_neighbors(self, pos):
+        """Agents of the Moore neighborhood of pos, center included, in the order of
+        MultiGrid.get_neighbors, from the precomputed neighborhood offsets."""
+        if self.cell_space:
+            return self.grid.get_neighbors(pos, moore=True, include_center=True, radius=1)
+        x, y = pos
+        columns = self.grid._grid
+        return [
+            agent
+            for dx, dy in NEIGHBOR_OFFSETS[4 * self.column_classes[x] + self.row_classes[y]]
+            for agent in columns[x + dx][y + dy]
+        ]
 
-    def is_collect_possible(self, agent, pos):  # TODO
+    # First waste of the robot color lying on pos, False if there is none. The cell
+    # space keeps a count of the wastes of each cell, empty cells are not scanned
+    def is_collect_possible(self, agent, pos):
+        if self.cell_space and not self.grid.has_waste(pos):
+            return False
         for PossibleAgent in self.grid.get_cell_list_contents([pos]):
             if (
                 isinstance(PossibleAgent, WasteAgent)
@@ -193,15 +392,17 @@ class WasteModel(mesa.Model):
                 return PossibleAgent
         return False
 
+    def has_waste_or_disposal(self, pos):
+        return any(
+            isinstance(cell_content, (WasteAgent, WasteDisposalAgent))
+            for cell_content in self.grid.get_cell_list_contents([pos])
+        )
+
     def do(self, agent, action):
         """Advance the model by one step."""
 
-        movement_actions = {
-            Action.MOVE_LEFT: (-1, 0),
-            Action.MOVE_RIGHT: (1, 0),
-            Action.MOVE_UP: (0, 1),
-            Action.MOVE_DOWN: (0, -1),
-        }
+        movement_actions = MOVE_DIRECTIONS
+        waste_color = None
 
         match action:
             case action if action in movement_actions:
@@ -225,13 +426,17 @@ class WasteModel(mesa.Model):
             case Action.FUSION:
                 carrying = agent.knowledge["carrying"]
                 if len(carrying) >= 2 and carrying[0].color == carrying[1].color:
-                    for waste in carrying:
+                    waste_color = agent.color + 1
+                    # The first carried waste is recycled as the fused one, with a new id
+                    fused = carrying[0]
+                    self.waste_counts[fused.color] -= 1
+                    for waste in carrying[1:]:
+                        self.waste_counts[waste.color] -= 1
                         waste.remove()
-                    agent.knowledge["carrying"] = [
-                        WasteAgent.create_agents(
-                            model=self, n=1, color=agent.color + 1
-                        )[0]
-                    ]
+                    fused.color = waste_color
+                    fused.unique_id = self.next_id()
+                    self.waste_counts[waste_color] += 1
+                    agent.knowledge["carrying"] = [fused]
 
                     # print(
                     #     "je fusionne deux déchets de la couleur ",
@@ -248,6 +453,8 @@ class WasteModel(mesa.Model):
                 if possible_agent and possible_agent.pos:
                     self.grid.remove_agent(possible_agent)
                     agent.knowledge["carrying"].append(possible_agent)
+                    waste_color = possible_agent.color
+                    self.drop_offs[waste_color].take(possible_agent, self.steps)
                     agent.knowledge["LastActionNotWorked"] = None
                 else:
                     agent.knowledge["LastActionNotWorked"] = action
@@ -255,6 +462,7 @@ class WasteModel(mesa.Model):
             case Action.DROP:
                 if len(agent.knowledge["carrying"]) > 0:
                     DroppedAgent = agent.knowledge["carrying"].pop()
+                    waste_color = DroppedAgent.color
                     agent.knowledge["LastActionNotWorked"] = None
                     if any(
                         isinstance(cell_content, WasteDisposalAgent)
@@ -262,9 +470,13 @@ class WasteModel(mesa.Model):
                             [agent.pos]
                         )
                     ):
+                        self.waste_counts[DroppedAgent.color] -= 1
                         DroppedAgent.remove()
                     else:
                         self.grid.place_agent(DroppedAgent, agent.pos)
+                        # A fused waste left for the robots of the next color
+                        if waste_color == agent.color + 1:
+                            self.drop_offs[waste_color].add(DroppedAgent, self.steps)
                     # print(
                     #     "je pose à cet endroit ",
                     #     agent.pos,
@@ -276,17 +488,150 @@ class WasteModel(mesa.Model):
             case _:
                 agent.knowledge["LastActionNotWorked"] = action
         agent.knowledge["LastAction"].append(action)
+        if waste_color is not None:
+            self.last_progress_step = self.steps
+        if self.trace is not None:
+            self.trace.record_action(agent, action, waste_color)
         return agent.knowledge
 
+    def resolve_collect_conflicts(self, robots):
+        """Return the robots whose COLLECT cannot be served.
+
+        Wastes on a cell are granted in the given order, so when more robots try
+        to collect a color than there are wastes of that color on the cell, the
+        last ones lose.
+        """
+        available = {}
+        losers = []
+        for robot in robots:
+            if robot.action != Action.COLLECT:
+                continue
+            key = (robot.pos, robot.color)
+            if key not in available:
+                available[key] = sum(
+                    isinstance(cell_content, WasteAgent) and cell_content.color == robot.color
+                    for cell_content in self.grid.get_cell_list_contents([robot.pos])
+                )
+            if available[key] > 0:
+                available[key] -= 1
+            else:
+                losers.append(robot)
+        return losers
+
+    def step_synchronous(self):
+        # Phase 1: every robot deliberates against the same frozen grid
+        self.plan_robots()
+
+        # Phase 2: actions are applied in shuffled order
+        order = list(self.robots)
+        self.random.shuffle(order)
+        self.apply_actions(order)
+
+    def plan_robots(self):
+        if self.deliberation_pool is None:
+            for robot in self.robots:
+                robot.plan()
+            return
+        # Robots drawing random numbers or sending messages plan in robot order, so
+        # model.random and the message queue see the same sequence as without pool
+        serial = [robot for robot in self.robots if robot.strategy.plans_serially()]
+        parallel = [robot for robot in self.robots if not robot.strategy.plans_serially()]
+        futures = [self.deliberation_pool.submit(robot.plan) for robot in parallel]
+        for robot in serial:
+            robot.plan()
+        for future in futures:
+            future.result()
+
+    def close(self):
+        """Stop the deliberation threads and write the end of the trace. The model can
+        still be stepped, without pool nor trace."""
+        if self.deliberation_pool is not None:
+            self.deliberation_pool.shutdown()
+            self.deliberation_pool = None
+        if self.trace is not None:
+            self.trace.close()
+            self.__messages_service.set_recorder(None)
+            self.trace = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        # Models left without close do not keep their threads alive
+        if getattr(self, "deliberation_pool", None) is not None:
+            self.deliberation_pool.shutdown(wait=False)
+
+    def apply_actions(self, order):
+        losers = set(self.resolve_collect_conflicts(order))
+        self.collect_conflicts += len(losers)
+        for robot in order:
+            if robot in losers:
+                robot.knowledge["LastActionNotWorked"] = Action.COLLECT
+                robot.knowledge["LastAction"].append(Action.COLLECT)
+                if self.trace is not None:
+                    self.trace.record_action(robot, Action.COLLECT)
+            else:
+                robot.percepts = self.do(robot, robot.action)
+
     def step(self):
         self.__messages_service.dispatch_messages()
-        self.agents.shuffle_do("step")
+        if self.update_mode == "synchronous":
+            self.step_synchronous()
+        else:
+            self.agents.shuffle_do("step")
         self.datacollector.collect(self)
-            
-            
+        self.check_stall()
+
+    def check_stall(self):
+        if (
+            self.stall_window is not None
+            and self.steps - self.last_progress_step >= self.stall_window
+            and sum(self.waste_counts) > 0
+        ):
+            self.stall_reason = self.diagnose_stall()
+            self.running = False
+
+    def diagnose_stall(self):
+        """Describe where the remaining wastes are when no progress is made."""
+        reasons = []
+        for color in ("green", "yellow", "red"):
+            value = getattr(Colors, color.upper())
+            if self.waste_counts[value] == 0:
+                continue
+            holders = [
+                robot for robot in self.robots
+                if any(waste.color == value for waste in robot.knowledge["carrying"])
+            ]
+            on_ground = self.waste_counts[value] - sum(
+                sum(waste.color == value for waste in robot.knowledge["carrying"]) for robot in holders
+            )
+            if on_ground == 0 and len(holders) > 1 and all(
+                len(robot.knowledge["carrying"]) == 1 for robot in holders
+            ):
+                reasons.append(f"{len(holders)} robots each hold a single {color} waste")
+            else:
+                reasons.append(
+                    f"{self.waste_counts[value]} {color} wastes left, {on_ground} on the ground, "
+                    f"{len(holders)} robots carrying"
+                )
+        return f"no progress for {self.steps - self.last_progress_step} steps: " + "; ".join(reasons)
+
+    @property
+    def geometry(self):
+        # A custom map is identified by a hash of its content, computed on first use
+        # only: it reads the whole map
+        if self._geometry is None:
+            content = np.ascontiguousarray(self.radioactivity_map, dtype=np.float64)
+            self._geometry = (self.width, self.height, hashlib.sha1(content).hexdigest())
+        return self._geometry
+
+    def get_message_count(self):
+        return self.__messages_service.get_message_count()
 
     def get_radioactivity(self, i, j):
-        for agent in self.grid.get_cell_list_contents([(i, j)]):
-            if isinstance(agent, RadioactivityAgent):
-                return agent.get_radioactivity()
-        return None
+        if self.cell_space:
+            return self.grid.get_radioactivity((i, j))
+        return float(self.radioactivity_map[i, j])
@@ -0,0 +1,69 @@
+# neighborhoods.py contains the static tables of the grid geometry, built once per model
+
+import numpy as np
+
+
+# Offsets of the moves in the direction masks, bit i for MOVE_OFFSETS[i], in the
+# order of Strategy.check_possible_directions (left, right, up, down)
+MOVE_OFFSETS = ((-1, 0), (1, 0), (0, 1), (0, -1))
+LEFT_BIT, RIGHT_BIT = 1, 2
+
+
+def neighbor_offsets(x_class, y_class):
+    # Class 0: first column / row, 1: inside, 2: last one, 3: both (a single column / row)
+    dxs = [dx for dx in (-1, 0, 1) if not (dx < 0 and x_class in (0, 3)) and not (dx > 0 and x_class >= 2)]
+    dys = [dy for dy in (-1, 0, 1) if not (dy < 0 and y_class in (0, 3)) and not (dy > 0 and y_class >= 2)]
+    # Column-major with the center included, the order of MultiGrid.get_neighbors
+    return tuple((dx, dy) for dx in dxs for dy in dys)
+
+
+# Offsets of the Moore neighborhood (center included) of a cell, indexed by 4 * x_class + y_class
+NEIGHBOR_OFFSETS = tuple(neighbor_offsets(x_class, y_class) for x_class in range(4) for y_class in range(4))
+
+
+def border_classes(size):
+    classes = np.ones(size, dtype=np.uint8)
+    classes[0] = 0
+    classes[-1] = 2 if size > 1 else 3
+    return classes
+
+
+def neighborhood_classes(width, height):
+    """Index in NEIGHBOR_OFFSETS of the neighborhood of every cell, indexed [x, y]."""
+    return 4 * border_classes(width)[:, np.newaxis] + border_classes(height)[np.newaxis, :]
+
+
+def wall_masks(width, height):
+    """Bit i set where the cell at MOVE_OFFSETS[i] is inside the grid, indexed [x, y]."""
+    masks = np.zeros((width, height), dtype=np.uint8)
+    for bit, (dx, dy) in enumerate(MOVE_OFFSETS):
+        inside = np.zeros((width, height), dtype=bool)
+        inside[max(-dx, 0) : width - max(dx, 0), max(-dy, 0) : height - max(dy, 0)] = True
+        masks[inside] |= 1 << bit
+    return masks
+
+
+def direction_masks(radioactivity_map, max_radioactivity, keep_out_of_lower_zone):
+    """Moves a robot can choose on each cell, as bits of MOVE_OFFSETS: the walls, no move
+    right next to a cell above max_radioactivity, and, for yellow and red robots, no move
+    left from a cell of the zone below theirs."""
+    width, height = radioactivity_map.shape
+    masks = wall_masks(width, height)
+
+    # Cells with a too radioactive cell among their 3x3 neighbors
+    padded = np.zeros((width + 2, height + 2), dtype=bool)
+    padded[1:-1, 1:-1] = radioactivity_map > max_radioactivity
+    hot = np.zeros((width, height), dtype=bool)
+    for dx in (0, 1, 2):
+        for dy in (0, 1, 2):
+            hot |= padded[dx : dx + width, dy : dy + height]
+    masks[hot] &= ~np.uint8(RIGHT_BIT)
+
+    if keep_out_of_lower_zone:
+        masks[radioactivity_map <= max_radioactivity - 1 / 3] &= ~np.uint8(LEFT_BIT)
+    return masks
+
+
+def enterable_cells(radioactivity_map, max_radioactivity):
+    """Movement legality of a robot: the cells it can stand on, indexed [x, y]."""
+    return radioactivity_map <= max_radioactivity
@@ -1,4 +1,5 @@
 import mesa
+import numpy as np
 
 
 class Colors:
@@ -7,23 +8,21 @@ class Colors:
     RED = 2
 
 
-class RadioactivityAgent(mesa.Agent):
-    def __init__(self, model, radiocativity):
-        """initialize a RadioactivityAgent instance.
+# Radioactivity (low, high] of the cells of each color: its zone with the three
+# vertical bands, the cells its wastes and robots start on with a custom map
+RADIOACTIVITY_BANDS = {
+    Colors.GREEN: (-np.inf, 1 / 3),
+    Colors.YELLOW: (1 / 3, 2 / 3),
+    Colors.RED: (2 / 3, 1),
+}
 
-        Args:
-            model: A model instance
-        """
-        super().__init__(model)
-        self.radioactivity = radiocativity
-        self.unique_id = model.next_id()
 
-    def get_radioactivity(self):
-        return self.radioactivity
-    
-    def step(self):
-        
-        pass
+def band_color(radioactivity):
+    """Color whose band holds radioactivity, None above the red one (an obstacle)."""
+    for color, (low, high) in RADIOACTIVITY_BANDS.items():
+        if low < radioactivity <= high:
+            return color
+    return None
 
 
 class WasteAgent(mesa.Agent):
@@ -34,10 +33,8 @@ class WasteAgent(mesa.Agent):
             model: A model instance
         """
         super().__init__(model)
-        if color is None:
-            self.init_color(carried)
-        else:
-            self.color = color
+        # Without a color, the waste takes the one of its cell once placed, see init_color
+        self.color = color
         self.carried = carried
         self.unique_id = model.next_id()
     
@@ -45,18 +42,10 @@ class WasteAgent(mesa.Agent):
         
         pass
 
-    def init_color(self, carried):
-        if not carried:
-            cellmates = self.model.grid.get_cell_list_contents([self.pos])
-            for agent in cellmates:
-                if isinstance(agent, RadioactivityAgent):
-                    if agent.get_radioactivity() > 0.66:
-                        self.color = Colors.RED
-                    elif agent.get_radioactivity() > 0.33:
-                        self.color = Colors.YELLOW
-                    else:
-                        self.color = Colors.GREEN
-                    break
+    def init_color(self):
+        if self.pos is None:
+            raise ValueError("A waste takes the color of its cell, it must be placed first")
+        self.color = band_color(self.model.get_radioactivity(*self.pos))
 
     def destruct_agent(self):
         self.model.grid.remove_agent(self)
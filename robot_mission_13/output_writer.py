@@ -0,0 +1,68 @@
+# output_writer.py writes the CSVs and plots of run_strat.py off the simulation thread
+#
+# The simulations hand their results over (aggregators, rows) and go on, while a single
+# writer process builds the data frames, writes them and renders the plots: pandas and
+# matplotlib are only loaded there. The queue is bounded, when max_pending jobs are
+# waiting submit blocks until one is done, so a sweep faster than its writer does not
+# pile up results in memory.
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import threading
+
+
+class OutputWriter:
+    """Background writer fed by a bounded queue of jobs, run one at a time in submit order.
+
+    Jobs are module-level functions and their arguments, sent to the writer process.
+    A job that failed raises in the next submit or in close, once.
+
+    attr:
+        max_pending: Jobs submitted and not done before submit blocks
+        processes: Run the jobs in a separate process (True) or in a thread of this one
+    """
+
+    def __init__(self, max_pending=4, processes=True):
+        self.max_pending = max_pending
+        self.processes = processes
+        self.executor = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=1)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, function, *args):
+        self.check()
+        self.slots.acquire()
+        future = self.executor.submit(function, *args)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+        return future
+
+    def check(self):
+        # Forget the jobs done, raising the error of a failed one once
+        pending = []
+        failed = None
+        for future in self.futures:
+            if not future.done():
+                pending.append(future)
+            elif failed is None and future.exception() is not None:
+                failed = future
+        self.futures = pending
+        if failed is not None:
+            failed.result()
+
+    def close(self):
+        """Wait for all the jobs to be written."""
+        self.executor.shutdown(wait=True)
+        self.check()
+
+
+def write(writer, function, *args):
+    # Through the writer if there is one, otherwise right away
+    if writer is None:
+        return function(*args)
+    return writer.submit(function, *args)
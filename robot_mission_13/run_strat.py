@@ -1,21 +1,63 @@
 from model import WasteModel
+from aggregation import ReplicateAggregator
+from output_writer import OutputWriter, write
+from telemetry import worker_metrics
 from time import time
-from tqdm import tqdm
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import math
 import os
-import matplotlib.pyplot as plt
+import numpy as np
+
+# pandas and matplotlib are imported inside the functions that use them, so that
+# processes only simulating never pay for loading them. Given an OutputWriter, the
+# run functions hand their results to it and the frames are built, written and
+# plotted in its process while the next simulations run
+
+# Steps without any successful COLLECT, FUSION or DROP before a run is declared stuck.
+# Runs that finish go at most a few hundred steps without progress, even with "Random"
+STALL_WINDOW = 1000
+
+# Green, yellow and red waste counts of the reference experiments
+WASTE_TUPLES = [
+    (2, 1, 2),
+    (4, 2, 2),
+    (10, 5, 5),
+    (12, 10, 10),
+    (24, 10, 10),
+    (24, 20, 10),
+    (36, 20, 20),
+    (48, 20, 20)
+]
 
 
 def save_waste_df(waste_dfs, output_path):
     """
-    Save the waste data frame to a CSV file.
+    Save the per-step statistics of the runs to a CSV file and return them.
+    waste_dfs is a ReplicateAggregator, or a list of run data frames folded one by one.
     """
-    # Combine all dataframes in waste_dfs by calculating the mean and standard deviation
-    combined_df = pd.concat(waste_dfs).groupby(level=0).agg(['mean', 'std'])
-    # Flatten the multi-level columns
-    combined_df.columns = ['_'.join(col).strip() for col in combined_df.columns.values]
+    aggregator = waste_dfs
+    if not isinstance(aggregator, ReplicateAggregator):
+        aggregator = ReplicateAggregator()
+        for waste_df in waste_dfs:
+            aggregator.add(waste_df)
+    combined_df = aggregator.to_frame()
     # Save the combined dataframe to a CSV file
     combined_df.to_csv(output_path, index=False)
+    return combined_df
+
+def save_and_plot(aggregator, output_path, elapsed_time):
+    # Writer job: the plot is rendered from the aggregated frame, not read back from the CSV
+    combined_df = save_waste_df(aggregator, output_path)
+    plot_waste(combined_df, elapsed_time)
+
+def save_rows(rows, output_path):
+    import pandas as pd
+
+    pd.DataFrame(rows).to_csv(output_path, index=False)
+    print(f"Results saved to {output_path}")
+
+def save_frame(df, output_path):
+    df.to_csv(output_path, index=False)
 
 def extract_min_index_min_value(df, column_name):
     """
@@ -42,9 +84,13 @@ def extract_data_of_interest(df, data_dict):
     data_dict['total'].append([min_total_index, min_total_value])
     return data_dict
 
-def plot_waste(waste_df_path, elapsed_time, with_interval=True):
-    # Load the waste data frame from the CSV file
-    waste_df = pd.read_csv(waste_df_path)
+def plot_waste(waste_df, elapsed_time, with_interval=True):
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
+    # Accept the aggregated data frame directly, or the path of a saved one
+    if isinstance(waste_df, str):
+        waste_df = pd.read_csv(waste_df)
     # Find the first time step where 'Red Wastes' reaches zero
     if 'Red Wastes_mean' in waste_df.columns:
         zero_red_index = waste_df[waste_df['Red Wastes_mean'] == 0].index.min()
@@ -120,15 +166,20 @@ def plot_waste(waste_df_path, elapsed_time, with_interval=True):
     # Save the plot to a file
     timestamp = time()
     plot_path = f"data/waste_plots/waste_plot_{timestamp}.png"
+    os.makedirs(os.path.dirname(plot_path), exist_ok=True)
     plt.savefig(plot_path)
+    # A writer process renders many plots, figures left open would accumulate
+    plt.close()
 
 
-def run_and_save(model_config, output_path, batch_size=10):
+def run_and_save(model_config, output_path, batch_size=10, writer=None):
     """
     Run the model and save the waste data frame to a CSV file.
+    With a writer, returns once the runs are done, before the CSV and plot are written.
     """
     start_time = time()
-    waste_dfs = []
+    # Runs are folded as they finish, only one run is kept in memory
+    aggregator = ReplicateAggregator()
     data_dict = {
         'green':[],
         'yellow':[],
@@ -142,8 +193,9 @@ def run_and_save(model_config, output_path, batch_size=10):
         for i in range(1000):
             model.step()
         # Collect data
-        waste_dfs.append(model.datacollector.get_model_vars_dataframe())
-        data_dict = extract_data_of_interest(waste_dfs[iter], data_dict)
+        waste_df = model.datacollector.get_model_vars_dataframe()
+        aggregator.add(waste_df)
+        data_dict = extract_data_of_interest(waste_df, data_dict)
         
     end_time = time()
 
@@ -151,17 +203,126 @@ def run_and_save(model_config, output_path, batch_size=10):
     elapsed_time = end_time - start_time
     print(f"Elapsed time: {elapsed_time:.2f} seconds")
     # Save the waste data frame
-    save_waste_df(waste_dfs, output_path)
-    plot_waste(output_path, elapsed_time)
+    write(writer, save_and_plot, aggregator, output_path, elapsed_time)
+
+
+
+
+def run_replicate(model_config, seed, max_steps=1000):
+    """
+    Run one seeded replicate and return its waste columns (dict of lists).
+    Module-level so it can be sent to worker processes; stops once no waste is left,
+    or when the progress monitor stops a stuck run (set "stall_window" in the config).
+    """
+    model = WasteModel(**{**model_config, "seed": seed})
+    wastes = model.datacollector.model_vars["Wastes"]
+    for i in range(max_steps):
+        model.step()
+        if wastes[-1] == 0 or not model.running:
+            break
+    return model.datacollector.model_vars
+
+
+def red_clear_step(model_vars, max_steps):
+    # First step from which no red waste is left, max_steps if red waste remains
+    red = model_vars["Red Wastes"]
+    if red[-1] > 0:
+        return max_steps
+    remaining = [i for i, count in enumerate(red) if count > 0]
+    return remaining[-1] + 1 if remaining else 0
+
+
+def clear_step(model_vars, max_steps):
+    # Step at which all the waste is gone, max_steps if the run did not finish
+    wastes = model_vars["Wastes"]
+    return len(wastes) - 1 if wastes[-1] == 0 else max_steps
+
+
+def final_wastes(model_vars, max_steps):
+    return model_vars["Wastes"][-1]
+
+
+METRICS = {
+    "red_clear_step": red_clear_step,
+    "clear_step": clear_step,
+    "final_wastes": final_wastes,
+}
+
+
+def confidence_half_width(values, confidence=0.95):
+    """Half-width of the Student t confidence interval of the mean, inf below two values."""
+    from scipy.stats import t
+
+    n = len(values)
+    if n < 2:
+        return math.inf
+    std = np.std(values, ddof=1)
+    return t.ppf((1 + confidence) / 2, n - 1) * std / math.sqrt(n)
+
+
+def run_until_confident(model_config, output_path, metric="red_clear_step", target_half_width=10,
+                        time_budget=600, batch_size=8, workers=None, max_steps=1000,
+                        min_replicates=8, max_replicates=1000, confidence=0.95, writer=None):
+    """
+    Launch batches of replicates until the confidence interval of `metric` is narrower
+    than +/- target_half_width, or until time_budget seconds are spent.
+    A batch runs on `workers` processes (all cores if None, in this process if 1).
+    Replicate i uses seed + i, so a run with a fixed seed can be reproduced.
+    Returns the mean of the metric, its half-width and the number of replicates.
+    With a writer, the CSV and plot may not be written yet.
+    """
+    if max_replicates < 1 or batch_size < 1:
+        raise ValueError(f"max_replicates and batch_size must be at least 1, got {max_replicates} and {batch_size}")
+    start_time = time()
+    metric_function = METRICS[metric]
+    base_seed = model_config.get("seed")
+    if base_seed is None:
+        # Explicit seeds: forked workers would otherwise share the parent's random state
+        base_seed = int(np.random.SeedSequence().entropy % 2**32)
 
+    aggregator = ReplicateAggregator(horizon=max_steps + 1)
+    values = []
+    mean = half_width = np.nan
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    try:
+        while len(values) < max_replicates:
+            seeds = range(base_seed + len(values), base_seed + min(len(values) + batch_size, max_replicates))
+            configs = [model_config] * len(seeds)
+            steps = [max_steps] * len(seeds)
+            runs = pool.map(run_replicate, configs, seeds, steps) if pool else map(run_replicate, configs, seeds, steps)
+            for model_vars in runs:
+                aggregator.add(model_vars)
+                values.append(metric_function(model_vars, max_steps))
 
+            mean = np.mean(values)
+            half_width = confidence_half_width(values, confidence)
+            print(f"{len(values)} replicates: {metric} = {mean:.2f} +/- {half_width:.2f}")
+            if len(values) >= min_replicates and half_width <= target_half_width:
+                break
+            if time() - start_time >= time_budget:
+                print(f"Time budget of {time_budget}s exhausted before reaching +/- {target_half_width}")
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed_time = time() - start_time
+    print(f"Elapsed time: {elapsed_time:.2f} seconds")
+    write(writer, save_and_plot, aggregator, output_path, elapsed_time)
+    return float(mean), float(half_width), len(values)
 
 
 
-def run_model_results(strategies, tuples_green_yellow_red_waste, tuples_green_yellow_red_agents, largeur, hauteur):
+
+def run_model_results(strategies, tuples_green_yellow_red_waste, tuples_green_yellow_red_agents, largeur, hauteur,
+                      writer=None):
     """
     Run the model with different strategies and configurations, and save the results.
+    Progress is published to the TelemetryServer of this process if one is running.
     """
+    metrics = worker_metrics(
+        "run_model_results", len(strategies) * len(tuples_green_yellow_red_waste) * len(tuples_green_yellow_red_agents)
+    )
     results = []
     for strategy in strategies:
         for waste_tuple in tuples_green_yellow_red_waste:
@@ -181,59 +342,125 @@ def run_model_results(strategies, tuples_green_yellow_red_waste, tuples_green_ye
                     "Strategy_Green": strategy,
                     "Strategy_Yellow": strategy,
                     "Strategy_Red": strategy,
+                    "stall_window": STALL_WINDOW,
                 }
-                timestamp = time()
-                os.makedirs("data/model_runs", exist_ok=True)
-                os.makedirs("data/waste_plots", exist_ok=True)
-                output_path = f"data/model_runs/waste_data_{timestamp}.csv"
-                
                 # Run the model and save results
                 start_time = time()
                 model = WasteModel(**config)
+                metrics.track(model)
                 steps = 0
-                retry = False
+                stalls = []
                 while True:
-                    if retry:
-                        print("Retrying with same configuration...")
-                        model = WasteModel(**config)
-                        steps = 0
-                        retry = False
                     model.step()
                     steps += 1
-                    waste_df = model.datacollector.get_model_vars_dataframe()
-                    if 'Wastes' in waste_df.columns and waste_df['Wastes'].iloc[-1] == 0:
+                    metrics.step()
+                    if model.datacollector.model_vars["Wastes"][-1] == 0:
                         break
-                    if steps >= 7000:
-                        retry=True
-                    
-                    
+                    # Stuck runs are detected by the progress monitor, 7000 steps stays a hard limit
+                    if model.stall_reason is not None or steps >= 7000:
+                        stalls.append(model.stall_reason or "no convergence after 7000 steps")
+                        print(f"Retrying with same configuration ({stalls[-1]})...")
+                        model = WasteModel(**config)
+                        metrics.retry(model, stalls[-1])
+                        steps = 0
+
                 elapsed_time = time() - start_time
+                metrics.job_done()
                 results.append({
                     "strategy": strategy,
                     "waste_tuple": waste_tuple,
                     "agent_tuple": agent_tuple,
                     "steps": steps,
-                    "elapsed_time": elapsed_time
+                    "elapsed_time": elapsed_time,
+                    "stalls": len(stalls),
+                    "stall_reasons": " | ".join(stalls),
                 })
                 print(f"Strategy: {strategy}, Waste: {waste_tuple}, Agents: {agent_tuple}, Steps: {steps}, Time: {elapsed_time:.2f}s")
     timestamp = time()
     # Save the results to a CSV file
-    results_df = pd.DataFrame(results)
-    results_output_path = f"data/model_runs/results_{timestamp}.csv"
-    results_df.to_csv(results_output_path, index=False)
-    print(f"Results saved to {results_output_path}")
+    os.makedirs("data/model_runs", exist_ok=True)
+    write(writer, save_rows, results, f"data/model_runs/results_{timestamp}.csv")
+
+def paired_statistics(steps_a, steps_b, confidence=0.95):
+    """
+    Paired comparison of the steps needed by two strategies on the same worlds.
+    variance_reduction is how many times more worlds an unpaired comparison would
+    need for an interval of the same width.
+    """
+    from scipy.stats import ttest_rel
+
+    steps_a = np.asarray(steps_a, dtype=float)
+    steps_b = np.asarray(steps_b, dtype=float)
+    differences = steps_b - steps_a
+    difference_variance = np.var(differences, ddof=1)
+    return {
+        "worlds": len(differences),
+        "mean_difference": differences.mean(),
+        "half_width": confidence_half_width(differences, confidence),
+        "p_value": ttest_rel(steps_b, steps_a).pvalue,
+        "b_faster_share": np.mean(differences < 0),
+        "variance_reduction": (np.var(steps_a, ddof=1) + np.var(steps_b, ddof=1)) / difference_variance
+        if difference_variance > 0 else np.inf,
+    }
+
+
+def run_paired_comparison(strategies, model_config, num_worlds=30, base_seed=0, max_steps=7000, workers=None,
+                          writer=None):
+    """
+    Evaluate every strategy on the same seeded worlds and compare them pairwise.
+    World i is built with seed base_seed + i for every strategy, so waste, robot and
+    disposal placements are identical and only the strategy differs (the random draws
+    made during the run also start from the same state). A run that does not clear
+    the grid within max_steps is counted as max_steps, never retried on a new world.
+    Saves one row per run and one row per pair of strategies, and returns both frames.
+    """
+    import pandas as pd
+    from itertools import combinations
+
+    configs = []
+    seeds = []
+    for strategy in strategies:
+        config = {**model_config, "Strategy_Green": strategy, "Strategy_Yellow": strategy, "Strategy_Red": strategy}
+        configs += [config] * num_worlds
+        seeds += range(base_seed, base_seed + num_worlds)
+
+    start_time = time()
+    steps = [max_steps] * len(configs)
+    if workers == 1:
+        runs = list(map(run_replicate, configs, seeds, steps))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            runs = list(pool.map(run_replicate, configs, seeds, steps))
+    print(f"{len(runs)} runs in {time() - start_time:.2f}s")
+
+    results = pd.DataFrame({
+        "strategy": [config["Strategy_Green"] for config in configs],
+        "seed": seeds,
+        "steps": [clear_step(model_vars, max_steps) for model_vars in runs],
+        "cleared": [model_vars["Wastes"][-1] == 0 for model_vars in runs],
+    })
+    by_strategy = results.pivot(index="seed", columns="strategy", values="steps")
+
+    pairs = []
+    for strategy_a, strategy_b in combinations(strategies, 2):
+        statistics = paired_statistics(by_strategy[strategy_a], by_strategy[strategy_b])
+        pairs.append({"strategy_a": strategy_a, "strategy_b": strategy_b, **statistics})
+        print(
+            f"{strategy_b} - {strategy_a}: {statistics['mean_difference']:+.1f} "
+            f"+/- {statistics['half_width']:.1f} steps (p = {statistics['p_value']:.3g}, "
+            f"{statistics['variance_reduction']:.1f}x fewer worlds than unpaired)"
+        )
+    pairs = pd.DataFrame(pairs)
+
+    timestamp = time()
+    os.makedirs("data/model_runs", exist_ok=True)
+    write(writer, save_frame, results, f"data/model_runs/paired_runs_{timestamp}.csv")
+    write(writer, save_frame, pairs, f"data/model_runs/paired_stats_{timestamp}.csv")
+    return results, pairs
+
 
 if __name__ == "__main__":
-    tuples_green_yellow_red_waste = [
-        (2, 1, 2),
-        (4, 2, 2),
-        (10, 5, 5),
-        (12, 10, 10),
-        (24, 10, 10),
-        (24, 20, 10),
-        (36, 20, 20),
-        (48, 20, 20)
-    ]
+    tuples_green_yellow_red_waste = WASTE_TUPLES
     tuples_green_yellow_red_agents = [
         # (2, 2, 2),
         (3, 3, 3),
@@ -247,6 +474,10 @@ if __name__ == "__main__":
     ]
     
     # run_model_results(strategies, tuples_green_yellow_red_waste, tuples_green_yellow_red_agents, largeur = 41, hauteur = 20)
+    # With live metrics on http://localhost:9100/metrics (Prometheus text format):
+    # with telemetry.TelemetryServer(port=9100):
+    #     run_model_results(...)
+    # The same sweep over seeded worlds, shardable over machines: sweeps/waste_tuples.json, see sweep.py
 
     config = {
         "width": 21,
@@ -270,6 +501,12 @@ if __name__ == "__main__":
     os.makedirs("data/model_runs", exist_ok=True)
     os.makedirs("data/waste_plots", exist_ok=True)
     output_path = f"data/model_runs/waste_data_{timestamp}.csv"
-    run_and_save(config, output_path, batch_size=30)
+    # The CSV and plot are written by a background process, a sweep can go on meanwhile
+    with OutputWriter() as writer:
+        run_and_save(config, output_path, batch_size=30, writer=writer)
+    # Or run replicates until the steps needed to clear red waste are known within +/- 10 steps
+    # run_until_confident(config, output_path, metric="red_clear_step", target_half_width=10, time_budget=600)
+    # Or compare strategies on the same 30 seeded worlds
+    # run_paired_comparison(["Random", "Fusion And Research", "Fusion And Research With Communication"], config, num_worlds=30)
 
     
\ No newline at end of file
@@ -1,33 +1,21 @@
+import os
+import solara
 from model import WasteModel
-from objects import RadioactivityAgent, WasteDisposalAgent, WasteAgent
+from event_trace import ReplayModel, TraceMarker, TraceKind
+from objects import WasteDisposalAgent, WasteAgent
 from agents import GreenAgent, YellowAgent, RedAgent, Class_Strat
+from matplotlib.colors import ListedColormap
+from matplotlib.figure import Figure
 from mesa.visualization import SolaraViz, make_plot_component, make_space_component
+from mesa.visualization.components import PropertyLayerStyle
+from mesa.visualization.mpl_space_drawing import draw_space
+from mesa.visualization.utils import update_counter
 
 
 def agent_portrayal(agent):
-        
-    if isinstance(agent, RadioactivityAgent):
-        if agent.get_radioactivity() > 0.66:
-            return {
-                "color": "#FF00004C",  # Rouge avec transparence 0.8
-                "size": 400,
-                "layer": "background",
-                "marker": "s",
-            }
-        elif agent.get_radioactivity() > 0.33:
-            return {
-                "color": "#FFA5004C",  # Orange avec transparence 0.8
-                "size": 400,
-                "zorder": 1,
-                "marker": "s",
-            }
-        else:
-            return {
-                "color": "#00FF004C",  # Vert avec transparence 0.8
-                "size": 400,
-                "layer": "background",
-                "marker": "s",
-            }
+    if isinstance(agent, TraceMarker):
+        return trace_portrayal(agent)
+
     if isinstance(agent, GreenAgent):
         return {
             "color": "darkgreen",
@@ -77,6 +65,28 @@ def agent_portrayal(agent):
         }
 
 
+def radioactivity_portrayal(layer):
+    # The zones, from the radioactivity property layer of the grid: green, orange
+    # and red with transparency, one color per third of [0, 1]
+    if layer.name != "radioactivity":
+        return None
+    return PropertyLayerStyle(
+        colormap=ListedColormap(["#00FF00", "#FFA500", "#FF0000"]), alpha=0.3, vmin=1e-9, vmax=1, colorbar=False
+    )
+
+
+def trace_portrayal(marker):
+    colors = ["green", "orange", "red"]
+    robot_colors = ["darkgreen", "goldenrod", "darkred"]
+    match marker.kind:
+        case TraceKind.ROBOT:
+            return {"color": robot_colors[marker.color], "size": 50, "zorder": 2}
+        case TraceKind.WASTE:
+            return {"color": colors[min(marker.color, 2)], "shape": "s", "size": 50 // 2}
+        case _:
+            return {"color": "black", "size": 200}
+
+
 model_params = {
     "width": 21,
     "height": 10,
@@ -92,6 +102,7 @@ model_params = {
     "Strategy_Yellow": "Random",
     "Strategy_Red": "Random",
     "seed": None,
+    "grid_backend": "multigrid",
 }
 
 model_params_Slider = {
@@ -169,12 +180,51 @@ model_params_Slider = {
         "value": "Random",
         "values": list(Class_Strat.keys()),
     },
+    "grid_backend": {
+        "name": "Grille",
+        "type": "Select",
+        "value": "multigrid",
+        "values": ["multigrid", "cell_space"],
+    },
 
 }
 
-waste_model = WasteModel(**model_params)
+# WASTE_TRACE=<trace file> solara run server.py replays a recorded run instead of simulating
+trace_path = os.environ.get("WASTE_TRACE")
+if trace_path:
+    model_params_Slider = {
+        "trace_path": trace_path,
+        "speed": {
+            "name": "Recorded steps per tick",
+            "type": "SliderInt",
+            "value": 1,
+            "min": 1,
+            "max": 100,
+        },
+    }
+    waste_model = ReplayModel(trace_path)
+else:
+    waste_model = WasteModel(**model_params)
+
+MultiGridGraph = make_space_component(agent_portrayal, propertylayer_portrayal=radioactivity_portrayal)
+
+
+# Mesa draws the space found in model.grid, which it does not know for the cell space
+# backend: the drawn space is then the OrthogonalMooreGrid it wraps
+@solara.component
+def CellSpaceGraph(model):
+    update_counter.get()
+    fig = Figure()
+    ax = fig.add_subplot()
+    draw_space(model.grid.space, agent_portrayal, propertylayer_portrayal=radioactivity_portrayal, ax=ax)
+    solara.FigureMatplotlib(fig, format="png", bbox_inches="tight")
+
+
+def SpaceGraph(model):
+    if getattr(model, "cell_space", False):
+        return CellSpaceGraph(model)
+    return MultiGridGraph(model)
 
-SpaceGraph = make_space_component(agent_portrayal)
 WastePlot = make_plot_component(
     ["Wastes", "Yellow Wastes", "Green Wastes", "Red Wastes"]
 )
@@ -1,10 +1,14 @@
 # Strategy.py contains various strategies for waste collection agents
 
-import random
-from objects import WasteAgent, RadioactivityAgent, WasteDisposalAgent, Colors
+from objects import WasteAgent, WasteDisposalAgent, Colors
 from enum import Enum
 from communication.message.MessagePerformative import MessagePerformative
 from communication.message.Message import Message
+from distance_fields import distance_field
+from neighborhoods import MOVE_OFFSETS
+from coverage import nearest_unexplored_row
+from fsm import Rule, StateMachine
+import numpy as np
 
 
 # Enum representing different modes for the RandomStrategy agent
@@ -39,6 +43,57 @@ class Action(Enum):
     DO_NOTHING = 7     # Do nothing
 
 
+# Grid offset of each movement action
+MOVE_DIRECTIONS = {
+    Action.MOVE_LEFT: (-1, 0),
+    Action.MOVE_RIGHT: (1, 0),
+    Action.MOVE_UP: (0, 1),
+    Action.MOVE_DOWN: (0, -1),
+}
+
+
+# Movement action for each grid offset, see distance_fields.GRADIENT_OFFSETS
+OFFSET_ACTIONS = {offset: action for action, offset in MOVE_DIRECTIONS.items()}
+
+
+# Possible directions for each direction mask, see neighborhoods.direction_masks
+MASK_ACTIONS = tuple(
+    tuple(OFFSET_ACTIONS[offset] for bit, offset in enumerate(MOVE_OFFSETS) if mask >> bit & 1)
+    for mask in range(1 << len(MOVE_OFFSETS))
+)
+
+
+# Direction followed by each placing mode of FusionAndResearch
+PLACING_DIRECTIONS = {
+    AgentModeFusionAndResearch.PLACING_FUSION: Action.MOVE_RIGHT,
+    AgentModeFusionAndResearch.PLACING_TOP: Action.MOVE_UP,
+    AgentModeFusionAndResearch.PLACING_DOWN: Action.MOVE_DOWN,
+}
+
+
+# Modes in which FusionAndResearch robots sweep the rows of their zone
+RESEARCH_MODES = (AgentModeFusionAndResearch.RESEARCHING_TOP, AgentModeFusionAndResearch.RESEARCHING_DOWN)
+
+
+# Vertical direction of each research mode, the opposite one, and the mode sweeping back
+SWEEPS = {
+    AgentModeFusionAndResearch.RESEARCHING_TOP: {
+        "Top or Down": Action.MOVE_DOWN,
+        "Down or Top": Action.MOVE_UP,
+        "Change Mode": AgentModeFusionAndResearch.RESEARCHING_DOWN,
+    },
+    AgentModeFusionAndResearch.RESEARCHING_DOWN: {
+        "Top or Down": Action.MOVE_UP,
+        "Down or Top": Action.MOVE_DOWN,
+        "Change Mode": AgentModeFusionAndResearch.RESEARCHING_TOP,
+    },
+}
+
+
+# Keys of WasteModel.num_agents, by color
+COLOR_NAMES = {Colors.GREEN: "green", Colors.YELLOW: "yellow", Colors.RED: "red"}
+
+
 # Base Strategy class that other strategies inherit from
 class Strategy:
     def __init__(self, model, agent):
@@ -47,59 +102,113 @@ class Strategy:
         self.action = None
         self.mode = None
         self.percepts = {}
+        # Rows [low, high) the robot moves vertically in, the whole grid by default
+        self.lane = (0, model.height)
 
-    # Determines which directions the agent can move in based on its surroundings
+    # Determines which directions the agent can move in: walls, too radioactive cells
+    # around and the limit of the zone below, from the static tables of the model
     def check_possible_directions(self):
-        possible_moves = [
-            Action.MOVE_LEFT,
-            Action.MOVE_RIGHT,
-            Action.MOVE_UP,
-            Action.MOVE_DOWN,
-        ]
+        return self.possible_directions_at(self.agent.pos)
 
-        # Remove directions if there's no neighbor in that direction
-        if not any(
-            neighbor.pos[0] < self.agent.pos[0]
-            for neighbor in self.agent.knowledge["Neighbors"]
-        ):
-            possible_moves.remove(Action.MOVE_LEFT)
+    # The lane limits act as walls, robots outside their lane can only move toward it
+    def restrict_to_lane(self, possible_moves, pos):
+        low, high = self.current_lane()
+        if pos[1] >= high - 1 and Action.MOVE_UP in possible_moves:
+            possible_moves.remove(Action.MOVE_UP)
+        if pos[1] <= low and Action.MOVE_DOWN in possible_moves:
+            possible_moves.remove(Action.MOVE_DOWN)
+        return possible_moves
 
-        if not any(
-            neighbor.pos[0] > self.agent.pos[0]
-            for neighbor in self.agent.knowledge["Neighbors"]
-        ):
-            possible_moves.remove(Action.MOVE_RIGHT)
+    def current_lane(self):
+        return self.lane
 
-        if not any(
-            neighbor.pos[1] > self.agent.pos[1]
-            for neighbor in self.agent.knowledge["Neighbors"]
-        ):
-            possible_moves.remove(Action.MOVE_UP)
+    # Highest radioactivity of the cells the robot sees, its own included
+    def radioactivity_around(self):
+        x, y = self.agent.pos
+        return max(
+            self.model.get_radioactivity(i, j)
+            for i in range(max(x - 1, 0), min(x + 2, self.model.width))
+            for j in range(max(y - 1, 0), min(y + 2, self.model.height))
+        )
 
-        if not any(
-            neighbor.pos[1] < self.agent.pos[1]
-            for neighbor in self.agent.knowledge["Neighbors"]
-        ):
-            possible_moves.remove(Action.MOVE_DOWN)
+    # Directions a robot of this color could choose standing at pos, see neighborhoods.py
+    def possible_directions_at(self, pos):
+        masks = self.model.direction_masks.get(self.agent.color)
+        if masks is not None:
+            return self.restrict_to_lane(list(MASK_ACTIONS[masks[pos[0]][pos[1]]]), pos)
+        # Custom radioactivity maps have no tables, cells are read and cached as robots visit them
+        key = (pos, self.agent.color, self.current_lane())
+        if key not in self.model.static_directions:
+            self.model.static_directions[key] = self.compute_directions_at(pos)
+        return list(self.model.static_directions[key])
 
-        # Don't move right if there's too much radioactivity
-        if any(
-            isinstance(neighbor, RadioactivityAgent)
-            and getattr(neighbor, "radioactivity", 0) > self.agent.max_radioactivity
-            for neighbor in self.agent.knowledge["Neighbors"]
+    def compute_directions_at(self, pos):
+        x, y = pos
+        possible_moves = []
+        if x > 0:
+            possible_moves.append(Action.MOVE_LEFT)
+        if x < self.model.width - 1:
+            possible_moves.append(Action.MOVE_RIGHT)
+        if y < self.model.height - 1:
+            possible_moves.append(Action.MOVE_UP)
+        if y > 0:
+            possible_moves.append(Action.MOVE_DOWN)
+
+        if Action.MOVE_RIGHT in possible_moves and any(
+            self.model.get_radioactivity(i, j) > self.agent.max_radioactivity
+            for i in range(max(x - 1, 0), min(x + 2, self.model.width))
+            for j in range(max(y - 1, 0), min(y + 2, self.model.height))
         ):
             possible_moves.remove(Action.MOVE_RIGHT)
 
-        # Red/Yellow agents shouldn't go deep into the yellow zone
-        if (self.agent.color in [Colors.RED, Colors.YELLOW]) and any(
-            isinstance(neighbor, RadioactivityAgent)
-            and neighbor.pos == self.agent.pos
-            and neighbor.radioactivity <= self.agent.max_radioactivity - 1 / 3
-            for neighbor in self.agent.knowledge["Neighbors"]
+        if (
+            self.agent.color in [Colors.RED, Colors.YELLOW]
+            and Action.MOVE_LEFT in possible_moves
+            and self.model.get_radioactivity(x, y) <= self.agent.max_radioactivity - 1 / 3
         ):
-            if Action.MOVE_LEFT in possible_moves:
-                possible_moves.remove(Action.MOVE_LEFT)
-        return possible_moves
+            possible_moves.remove(Action.MOVE_LEFT)
+
+        # Cells too radioactive to enter, only found on custom radioactivity maps
+        possible_moves = [
+            action for action in possible_moves
+            if self.model.get_radioactivity(x + MOVE_DIRECTIONS[action][0], y + MOVE_DIRECTIONS[action][1])
+            <= self.agent.max_radioactivity
+        ]
+        return self.restrict_to_lane(possible_moves, pos)
+
+    # Condition on the possible directions under which deliberate keeps returning
+    # `action` once the robot moved, None if the decision cannot be committed to
+    def macro_condition(self, action):
+        return None
+
+    # Whether deliberate uses state shared by the robots: it draws from model.random or
+    # sends messages. With a deliberation pool these robots plan one after the other,
+    # in robot order, see WasteModel.plan_robots
+    def plans_serially(self):
+        return False
+
+    # Number of following ticks for which deliberate is known to return `action` again,
+    # as long as the robot does not stand on a waste or the disposal (checked by the robot)
+    def macro_length(self, action):
+        condition = self.macro_condition(action)
+        if condition is None:
+            return 0
+        dx, dy = MOVE_DIRECTIONS[action]
+        x, y = self.agent.pos
+        if not self.model.is_movement_possible(self.agent, (x + dx, y + dy)):
+            return 0
+        ticks = 0
+        while True:
+            x, y = x + dx, y + dy
+            if not condition(self.possible_directions_at((x, y))) or not (
+                self.model.is_movement_possible(self.agent, (x + dx, y + dy))
+            ):
+                return ticks
+            ticks += 1
+
+    # Called before every decision, including the ticks skipped by a macro action
+    def update_coverage(self):
+        pass
 
     # Abstract method to be implemented by subclasses
     def deliberate(self):
@@ -112,6 +221,10 @@ class StrategyRandom(Strategy):
         super().__init__(model, agent)
         self.mode = AgentModeRandom.SEEKING
 
+    # Moves and drops are drawn from model.random
+    def plans_serially(self):
+        return True
+
     # Checks for equivalent waste nearby to collect or move towards
     def check_equivalent_waste(self):
         # Check if agent has enough waste to fuse
@@ -152,7 +265,7 @@ class StrategyRandom(Strategy):
         if (
             len(self.agent.knowledge["carrying"]) == 1
             and self.agent.color != Colors.RED
-            and random.random() < 0.05
+            and self.model.random.random() < 0.05
         ):
             self.agent.knowledge["DroppedLast"] = [
                 self.agent.knowledge["carrying"][0],
@@ -168,7 +281,7 @@ class StrategyRandom(Strategy):
         # Move randomly if no waste found
         possible_moves = self.check_possible_directions()
         if possible_moves:
-            return random.choice(possible_moves)
+            return self.model.random.choice(possible_moves)
         return Action.DO_NOTHING
 
     # Decision making when carrying waste
@@ -185,11 +298,7 @@ class StrategyRandom(Strategy):
             return Action.MOVE_RIGHT
         else:
             # Drop waste if radioactivity is too high
-            if any(
-                isinstance(neighbor, RadioactivityAgent)
-                and neighbor.radioactivity > self.agent.max_radioactivity
-                for neighbor in self.agent.knowledge["Neighbors"]
-            ):
+            if self.radioactivity_around() > self.agent.max_radioactivity:
                 self.mode = AgentModeRandom.SEEKING
                 return Action.DROP
             else:
@@ -232,7 +341,7 @@ class StrategyRandom(Strategy):
                 return self.DeliberateCarryingAndSeekingWaste()
             case _:
                 # Default random movement
-                return random.choice(
+                return self.model.random.choice(
                     [
                         Action.MOVE_LEFT,
                         Action.MOVE_RIGHT,
@@ -242,272 +351,660 @@ class StrategyRandom(Strategy):
                 )
 
 
+class Features:
+    """What the rules of FusionAndResearch test, read once from the percept of a robot.
+
+    attr:
+        carrying: Wastes carried by the robot
+        count: Number of wastes carried
+        own_wastes: Wastes of the robot color on its cell
+        disposal_here: The waste disposal is on its cell
+        last_action: Last action of the robot
+        moves: Moves the robot can make, computed on first use
+        row_end: The robot cannot go further left or right, computed on first use
+    """
+
+    __slots__ = ("strategy", "carrying", "count", "own_wastes", "disposal_here", "last_action", "_moves", "_row_end")
+
+    def __init__(self, strategy):
+        agent = strategy.agent
+        pos = agent.pos
+        self.strategy = strategy
+        self.carrying = agent.knowledge["carrying"]
+        self.count = len(self.carrying)
+        self.own_wastes = []
+        self.disposal_here = False
+        # Neighbors are matched on their exact type, cheaper than isinstance
+        for neighbor in agent.knowledge["Neighbors"]:
+            kind = type(neighbor)
+            if kind is WasteAgent:
+                if neighbor.color == agent.color and neighbor.pos == pos:
+                    self.own_wastes.append(neighbor)
+            elif kind is WasteDisposalAgent and neighbor.pos == pos:
+                self.disposal_here = True
+        self.last_action = agent.knowledge["LastAction"][-1]
+        self._moves = self._row_end = None
+
+    @property
+    def moves(self):
+        if self._moves is None:
+            self._moves = self.strategy.check_possible_directions()
+        return self._moves
+
+    @property
+    def row_end(self):
+        if self._row_end is None:
+            moves = self.moves
+            self._row_end = Action.MOVE_LEFT not in moves or Action.MOVE_RIGHT not in moves
+        return self._row_end
+
+
+# Guards of the FusionAndResearch rules, over a strategy and the Features of its robot
+
+def can_fuse(strategy, features):
+    return features.count == 2 and strategy.agent.color != Colors.RED
+
+
+def carries_next_color(strategy, features):
+    return features.count == 1 and strategy.agent.color + 1 == features.carrying[0].color
+
+
+def red_at_disposal(strategy, features):
+    return strategy.agent.color == Colors.RED and features.count > 0 and features.disposal_here
+
+
+# A waste of the robot color it has not just dropped, with room to carry it
+def collectable(strategy, features):
+    return features.count <= 1 and any(
+        waste not in features.carrying and not strategy.recently_dropped(waste) for waste in features.own_wastes
+    )
+
+
+def collect_here(strategy, features):
+    return features.count <= 1 and bool(features.own_wastes)
+
+
+def waste_here(strategy, features):
+    return bool(features.own_wastes)
+
+
+def carrying_any(strategy, features):
+    return features.count > 0
+
+
+def carrying_nothing(strategy, features):
+    return features.count == 0
+
+
+def fusion_chef_empty(strategy, features):
+    return features.count == 0 and strategy.agent_type == AgentModeFusionAndResearch.PLACING_FUSION
+
+
+def second_waste_here(strategy, features):
+    return (
+        features.carrying[0].color == strategy.agent.color
+        and bool(features.own_wastes)
+        and strategy.agent.color != Colors.RED
+    )
+
+
+def just_dropped(strategy, features):
+    return features.last_action == Action.DROP
+
+
+def drop_offs_pending(strategy, features):
+    return strategy.model.fetch_drop_offs and len(strategy.model.drop_offs[strategy.agent.color]) > 0
+
+
+def has_target_row(strategy, features):
+    return strategy.target_row is not None
+
+
+def at_row_end(strategy, features):
+    return features.row_end
+
+
+def east_edge_unknown(strategy, features):
+    return strategy.agent.knowledge["x"] is None and Action.MOVE_RIGHT not in features.moves
+
+
+def returning(strategy, features):
+    return strategy.return_to is not None and features.count == 0
+
+
+def red_fusion_robot(strategy, features):
+    return strategy.is_red_fusion_robot()
+
+
+def red_fusion_collect(strategy, features):
+    return strategy.is_red_fusion_robot() and collect_here(strategy, features)
+
+
+# Robots start anywhere in the height of their zone, they first reach their lane
+def toward_lane(strategy, features):
+    return strategy.lane_move(features) in features.moves
+
+
+def can_move_left(strategy, features):
+    return Action.MOVE_LEFT in features.moves
+
+
+def moved_left(strategy, features):
+    return features.last_action == Action.MOVE_LEFT
+
+
+def bottom_reached(strategy, features):
+    return Action.MOVE_DOWN not in features.moves
+
+
+def top_reached(strategy, features):
+    return Action.MOVE_UP not in features.moves
+
+
+# Rules of a placing mode: collect on the way, follow the mode direction, and `blocked`
+# once it cannot go further
+def placing_rules(mode, blocked):
+    direction = PLACING_DIRECTIONS[mode]
+    return (
+        Rule(collect_here, Action.COLLECT),
+        Rule(toward_lane, "lane_move"),
+        Rule(lambda strategy, features: direction in features.moves, direction),
+        blocked,
+    )
+
+
+# Rules of a research mode: sweep the row, step to the next unexplored row at its end,
+# and turn back once the lane is crossed
+def research_rules(mode):
+    sweep = SWEEPS[mode]
+    return (
+        Rule(just_dropped, Action.MOVE_LEFT),
+        Rule(carrying_any, Action.MOVE_RIGHT, mode=AgentModeFusionAndResearch.CARRYING),
+        Rule(waste_here, Action.COLLECT, mode=AgentModeFusionAndResearch.CARRYING),
+        Rule(drop_offs_pending, "fetch_move"),
+        Rule(has_target_row, "target_row_move"),
+        Rule(lambda strategy, features: features.last_action == sweep["Top or Down"], "sweep_row"),
+        Rule(at_row_end, "skip_swept_rows"),
+        Rule(
+            lambda strategy, features: features.row_end and sweep["Top or Down"] not in features.moves,
+            sweep["Down or Top"],
+            mode=sweep["Change Mode"],
+        ),
+        Rule(at_row_end, sweep["Top or Down"]),
+        Rule(None, "repeat_last_action"),
+    )
+
+
 # Strategy that focuses on fusion and exploration
 class FusionAndResearch(Strategy):
+    # Rules of every state, see fsm.py and state()
+    MACHINE = StateMachine({
+        AgentModeFusionAndResearch.FUSION: (
+            Rule(can_fuse, Action.FUSION),
+            Rule(carries_next_color, Action.DROP),
+            # Special handling for red agents at disposal sites
+            Rule(red_at_disposal, Action.DROP),
+            Rule(collectable, Action.COLLECT),
+            Rule("can_hand_off", "hand_off"),
+            # Navigation with position tracking
+            Rule(bottom_reached, "climb"),
+            Rule(top_reached, "descend"),
+            Rule(None, "repeat_last_move"),
+        ),
+        AgentModeFusionAndResearch.CARRYING: (
+            # Return to placing mode if not carrying waste
+            Rule(fusion_chef_empty, Action.DO_NOTHING, mode=AgentModeFusionAndResearch.PLACING_FUSION),
+            Rule(carrying_nothing, "resume_and_wait"),
+            Rule(second_waste_here, Action.COLLECT),
+            Rule(can_fuse, Action.FUSION),
+            Rule(None, "deliver"),
+        ),
+        AgentModeFusionAndResearch.RESEARCHING_TOP: research_rules(AgentModeFusionAndResearch.RESEARCHING_TOP),
+        AgentModeFusionAndResearch.RESEARCHING_DOWN: research_rules(AgentModeFusionAndResearch.RESEARCHING_DOWN),
+        AgentModeFusionAndResearch.PLACING_FUSION: placing_rules(
+            AgentModeFusionAndResearch.PLACING_FUSION,
+            Rule(None, Action.MOVE_UP, mode=AgentModeFusionAndResearch.FUSION),
+        ),
+        AgentModeFusionAndResearch.PLACING_TOP: placing_rules(
+            AgentModeFusionAndResearch.PLACING_TOP,
+            Rule(None, Action.MOVE_LEFT, mode=AgentModeFusionAndResearch.RESEARCHING_TOP),
+        ),
+        AgentModeFusionAndResearch.PLACING_DOWN: placing_rules(
+            AgentModeFusionAndResearch.PLACING_DOWN,
+            Rule(None, Action.MOVE_LEFT, mode=AgentModeFusionAndResearch.RESEARCHING_DOWN),
+        ),
+        # Red agents seeking the last wastes, prioritizing moving left
+        AgentModeFusionAndResearch.REDSEEKING: (
+            Rule(carrying_any, Action.MOVE_RIGHT, mode=AgentModeFusionAndResearch.CARRYING),
+            Rule(waste_here, Action.COLLECT, mode=AgentModeFusionAndResearch.CARRYING),
+            Rule(can_move_left, Action.MOVE_LEFT),
+            Rule(moved_left, "random_vertical_move"),
+            Rule(bottom_reached, Action.MOVE_UP),
+            Rule(top_reached, Action.MOVE_DOWN),
+            Rule(None, "repeat_last_action"),
+        ),
+    })
+    # Modes replaced by red seeking once finished_fusion is set
+    SEEKING_MODES = (AgentModeFusionAndResearch.FUSION,)
+
     def __init__(self, model, agent):
         super().__init__(model, agent)
 
-        # Assign agent role based on whether it's first of its color
-        if not model.first_of_color[agent.color]:
-            model.first_of_color[agent.color] = True
+        # The zone is split in one horizontal lane per three robots of the color, each
+        # with a chef (the first robots created) and its explorers. With three robots
+        # there is a single lane covering the whole height.
+        index = model.robot_counts[agent.color]
+        num_robots = model.num_agents[COLOR_NAMES[agent.color]]
+        num_lanes = max(1, min(num_robots // 3, model.height))
+        lane = index % num_lanes
+        self.lane = (
+            round(lane * model.height / num_lanes),
+            round((lane + 1) * model.height / num_lanes),
+        )
+
+        if index < num_lanes:
             self.agent_type = AgentModeFusionAndResearch.PLACING_FUSION
+            # Chefs also patrol the top row of the lane below, where they hand down
+            # the single wastes they cannot fuse, see hand_off
+            self.lane = (max(self.lane[0] - 1, 0), self.lane[1])
         else:
-            # Alternate between top and bottom explorers
+            # Alternate between bottom and top explorers within a lane, by their rank
+            # among the explorers of the lane
+            rank = (index - num_lanes) // num_lanes
             self.agent_type = (
-                AgentModeFusionAndResearch.PLACING_TOP
-                if agent.unique_id % 2 == 0
-                else AgentModeFusionAndResearch.PLACING_DOWN
+                AgentModeFusionAndResearch.PLACING_DOWN
+                if rank % 2 == 0
+                else AgentModeFusionAndResearch.PLACING_TOP
             )
         self.mode = self.agent_type
         self.finished_fusion = False
+        # Row picked by next_row_move, reached before sweeping on
+        self.target_row = None
 
-    def deliberate_fusion(self):
-        if len(self.agent.knowledge["carrying"]) == 2 and not self.agent.color == Colors.RED:
-            return Action.FUSION
-        elif (
-            len(self.agent.knowledge["carrying"]) == 1
-            and self.agent.color + 1 == self.agent.knowledge["carrying"][0].color
-        ):
-            return Action.DROP
-        
-        # Special handling for red agents at disposal sites
-        elif self.agent.color == Colors.RED and len(self.agent.knowledge["carrying"]) > 0 and any(
-                (
-                    isinstance(neighbor, WasteDisposalAgent)
-                    and neighbor.pos == self.agent.pos
-                )
-                for neighbor in self.agent.knowledge["Neighbors"]
-            ):
-            return Action.DROP
-        
-        # Collect waste of matching color
-        elif len(self.agent.knowledge["carrying"]) <= 1 and any(
-            isinstance(others, WasteAgent)
-            and others.color == self.agent.color
-            and others.pos == self.agent.pos
-            and others not in self.agent.knowledge["carrying"]
-            for others in self.agent.knowledge["Neighbors"]
+    # The red chef has to reach the disposal, wherever it is, once it carries a waste
+    def current_lane(self):
+        if (
+            self.agent.color == Colors.RED
+            and self.agent_type == AgentModeFusionAndResearch.PLACING_FUSION
+            and self.agent.knowledge["carrying"]
         ):
-            return Action.COLLECT
-        
-        # Navigation with position tracking
-        possible_directions = self.check_possible_directions()
-        if Action.MOVE_DOWN not in possible_directions:
-            if self.agent.knowledge["y"] is None:
-                self.agent.knowledge["y"] = 1
-            return Action.MOVE_UP
+            return (0, self.model.height)
+        return self.lane
+
+    # With several lanes, a chef left with a single waste of its color drops it on the
+    # top row of the lane below, so that the wastes of every lane end up paired.
+    # The waste is remembered as dropped so the chef does not take it back.
+    def can_hand_off(self, features):
+        carrying = features.carrying
+        return (
+            self.agent_type == AgentModeFusionAndResearch.PLACING_FUSION
+            and self.agent.color != Colors.RED
+            and self.lane[0] > 0
+            and self.agent.pos[1] == self.lane[0]
+            and len(carrying) == 1
+            and carrying[0].color == self.agent.color
+        )
+
+    def hand_off(self, features):
+        self.agent.knowledge["DroppedLast"] = [features.carrying[0], 4 * (self.lane[1] - self.lane[0])]
+        return Action.DROP
 
-        elif Action.MOVE_UP not in possible_directions:
-            if self.agent.knowledge["y"] is None:
-                self.agent.knowledge["y"] = -1
-            elif self.agent.knowledge["height"] is None:
-                # Calculate map height when reaching the top
-                if self.agent.knowledge["y"] > 0:
-                    self.agent.knowledge["height"] = self.agent.knowledge["y"] - 1
-                    self.agent.knowledge["y"] = 0
-                else:
-                    self.agent.knowledge["height"] = self.agent.knowledge["y"] + 1
-                    self.agent.knowledge["y"] = self.agent.knowledge["height"]
+    def recently_dropped(self, waste):
+        dropped = self.agent.knowledge["DroppedLast"]
+        return dropped is not None and dropped[0] is waste
 
+    # An explorer not carrying anything collects every waste of its color it walks on
+    def is_sweeping(self):
+        return self.mode in RESEARCH_MODES and not self.agent.knowledge["carrying"]
+
+    def update_coverage(self):
+        if self.is_sweeping():
+            self.model.coverage[self.agent.color].mark(self.agent.pos)
+
+    # Rows swept by the explorers of the color, shared through the model
+    def explored_rows(self):
+        return self.model.coverage[self.agent.color].explored_rows()
+
+    def forget_explored_rows(self):
+        self.model.coverage[self.agent.color].reset(*self.lane)
+
+    # At the end of a row, the next row to sweep is the nearest row of the lane that no
+    # explorer of the color swept yet. Returns the vertical move toward it, or None when
+    # it is the next row anyway and the usual pattern applies. Once the whole lane is
+    # swept, its coverage is cleared and a new pass starts.
+    def next_row_move(self, top_or_down):
+        y = self.agent.pos[1]
+        step = 1 if top_or_down["Top or Down"] == Action.MOVE_UP else -1
+        row, same_direction = nearest_unexplored_row(self.explored_rows(), y, *self.lane, step)
+        if row is None:
+            self.forget_explored_rows()
+            return None
+        if row == y + step:
+            return None
+        if not same_direction:
+            self.mode = top_or_down["Change Mode"]
+        self.target_row = row
+        return Action.MOVE_UP if row > y else Action.MOVE_DOWN
+
+    # Vertical move into the lane, None once inside
+    def lane_move(self, features):
+        y = self.agent.pos[1]
+        if y < self.lane[0]:
+            return Action.MOVE_UP
+        if y >= self.lane[1]:
             return Action.MOVE_DOWN
+        return None
+
+    # Vertical move toward the row picked by next_row_move, then the sweep starts
+    def target_row_move(self, features):
+        y = self.agent.pos[1]
+        if y != self.target_row:
+            return Action.MOVE_UP if self.target_row > y else Action.MOVE_DOWN
+        self.target_row = None
+        return self.sweep_row(features)
 
+    # Nearest pile of wastes of the robot color left on a zone border in its lane, that
+    # no other explorer is fetching
+    def fetch_move(self, features):
+        buffer = self.model.drop_offs[self.agent.color]
+        target = buffer.nearest(self.agent.pos, self.lane, self.agent.unique_id, self.model.steps)
+        if target is None:
+            return None
+        move = self.pile_move(target, features)
+        if move is not None:
+            buffer.claim(target, self.agent.unique_id, self.model.steps)
+            # If the pile is taken first, the sweep goes on from its row, see target_row_move
+            self.target_row = target[1]
+        return move
+
+    # Straight to the pile, vertically first (the piles are on the western border of
+    # the zone), or back to the sweep if the way is blocked
+    def pile_move(self, target, features):
+        x, y = self.agent.pos
+        if target[1] != y:
+            move = Action.MOVE_UP if target[1] > y else Action.MOVE_DOWN
         else:
-            for action in reversed(self.agent.knowledge["LastAction"]):
-                if action not in [Action.COLLECT, Action.FUSION, Action.DROP]:
-                    return action
+            move = Action.MOVE_LEFT if target[0] < x else Action.MOVE_RIGHT
+        return move if move in features.moves else None
 
+    def sweep_row(self, features):
+        return Action.MOVE_LEFT if Action.MOVE_LEFT in features.moves else Action.MOVE_RIGHT
 
-    # Decision making when carrying waste
-    def deliberate_carrying(self):
-        # Return to placing mode if not carrying waste
-        if (
-            len(self.agent.knowledge["carrying"]) == 0
-            and self.agent_type == AgentModeFusionAndResearch.PLACING_FUSION
-        ):
-            self.mode = AgentModeFusionAndResearch.PLACING_FUSION
-            return Action.DO_NOTHING
+    def skip_swept_rows(self, features):
+        return self.next_row_move(SWEEPS[self.mode])
 
-        # Collect additional waste if possible
-        if (
-            self.agent.knowledge["carrying"][0].color == self.agent.color
-            and any(
-                isinstance(neighbor, WasteAgent)
-                and neighbor.color == self.agent.color
-                and neighbor.pos == self.agent.pos
-                for neighbor in self.agent.knowledge["Neighbors"]
-            )
-            and self.agent.color != Colors.RED
-        ):
-            return Action.COLLECT
-        # Fuse if carrying two pieces of waste
-        elif len(self.agent.knowledge["carrying"]) == 2 and not self.agent.color == Colors.RED:
-            return Action.FUSION
-        # Drop waste if radioactivity is too high
-        possible_directions = self.check_possible_directions()
-        if Action.MOVE_RIGHT not in possible_directions:
-            match self.agent_type:
-                case AgentModeFusionAndResearch.PLACING_TOP:
-                    self.mode = AgentModeFusionAndResearch.RESEARCHING_TOP
-                case AgentModeFusionAndResearch.PLACING_DOWN:
-                    self.mode = AgentModeFusionAndResearch.RESEARCHING_DOWN
+    # Vertical moves of the fusion robots, tracking their height from the edges
+    def climb(self, features):
+        if self.agent.knowledge["y"] is None:
+            self.agent.knowledge["y"] = 1
+        return Action.MOVE_UP
+
+    def descend(self, features):
+        if self.agent.knowledge["y"] is None:
+            self.agent.knowledge["y"] = -1
+        elif self.agent.knowledge["height"] is None:
+            # Calculate map height when reaching the top
+            if self.agent.knowledge["y"] > 0:
+                self.agent.knowledge["height"] = self.agent.knowledge["y"] - 1
+                self.agent.knowledge["y"] = 0
+            else:
+                self.agent.knowledge["height"] = self.agent.knowledge["y"] + 1
+                self.agent.knowledge["y"] = self.agent.knowledge["height"]
+        return Action.MOVE_DOWN
+
+    # Last move of the robot, whatever it collected, fused or dropped since
+    def repeat_last_move(self, features):
+        for action in reversed(self.agent.knowledge["LastAction"]):
+            if action not in [Action.COLLECT, Action.FUSION, Action.DROP]:
+                return action
+        return None
+
+    def repeat_last_action(self, features):
+        return features.last_action
+
+    def random_vertical_move(self, features):
+        return self.model.random.choice([Action.MOVE_UP, Action.MOVE_DOWN])
+
+    # Red robots seeking the last wastes draw a vertical move, see REDSEEKING
+    def plans_serially(self):
+        return self.agent.color == Colors.RED
+
+    # Resume exploring if the collect failed (waste taken by another robot)
+    def resume_and_wait(self, features):
+        self.resume_research()
+        return Action.DO_NOTHING
+
+    # Bring the carried waste east, dropping it where radioactivity gets too high
+    def deliver(self, features):
+        if Action.MOVE_RIGHT not in features.moves:
+            self.resume_research()
             return Action.DROP
 
         # Move right by default
         return Action.MOVE_RIGHT
 
-    # Decision making for exploration mode
-    def deliberate_research(self, top_or_down):
-        # Move left after dropping waste
-        if self.agent.knowledge["LastAction"][-1] == Action.DROP:
-            return Action.MOVE_LEFT
-        # Switch to carrying mode if waste collected
-        elif len(self.agent.knowledge["carrying"]) > 0:
-            self.mode = AgentModeFusionAndResearch.CARRYING
-            return Action.MOVE_RIGHT
-        # Collect waste if found
-        elif any(
-            isinstance(neighbor, WasteAgent)
-            and neighbor.color == self.agent.color
-            and neighbor.pos == self.agent.pos
-            for neighbor in self.agent.knowledge["Neighbors"]
-        ):
-            self.mode = AgentModeFusionAndResearch.CARRYING
-            return Action.COLLECT
-            
-        possible_moves = self.check_possible_directions()
+    def resume_research(self):
+        match self.agent_type:
+            case AgentModeFusionAndResearch.PLACING_TOP:
+                self.mode = AgentModeFusionAndResearch.RESEARCHING_TOP
+            case AgentModeFusionAndResearch.PLACING_DOWN:
+                self.mode = AgentModeFusionAndResearch.RESEARCHING_DOWN
 
-        # Movement logic during exploration
-        if self.agent.knowledge["LastAction"][-1] == top_or_down["Top or Down"]:
-            if Action.MOVE_LEFT in possible_moves:
-                return Action.MOVE_LEFT
-            else:
-                return Action.MOVE_RIGHT
-        # Switch exploration direction if blocked
-        elif top_or_down["Top or Down"] not in possible_moves and (
-            Action.MOVE_LEFT not in possible_moves
-            or Action.MOVE_RIGHT not in possible_moves
-        ):
-            self.mode = top_or_down["Change Mode"]
-            return top_or_down["Down or Top"]
-        # Continue in current direction if partly blocked
-        elif (
-            Action.MOVE_LEFT not in possible_moves
-            or Action.MOVE_RIGHT not in possible_moves
-        ):
-            return top_or_down["Top or Down"]
-        else:
-            return self.agent.knowledge["LastAction"][-1]
+    # Straight moves of the placing, carrying, research and fusion modes only depend
+    # on the carried wastes, the robot cell content and the static geometry.
+    # The guards mirror the rules of the matching state of MACHINE.
+    def macro_condition(self, action):
+        carrying = self.agent.knowledge["carrying"]
+        can_fuse = len(carrying) == 2 and self.agent.color != Colors.RED
+        match self.mode:
+            case AgentModeFusionAndResearch.PLACING_FUSION | AgentModeFusionAndResearch.PLACING_TOP | AgentModeFusionAndResearch.PLACING_DOWN:
+                if action == PLACING_DIRECTIONS[self.mode]:
+                    return lambda possible_moves: action in possible_moves
+            case AgentModeFusionAndResearch.CARRYING:
+                if action == Action.MOVE_RIGHT and len(carrying) > 0 and not can_fuse:
+                    return lambda possible_moves: Action.MOVE_RIGHT in possible_moves
+            # A pile dropped meanwhile would interrupt the sweep, see fetch_move
+            case AgentModeFusionAndResearch.RESEARCHING_TOP | AgentModeFusionAndResearch.RESEARCHING_DOWN if not self.model.fetch_drop_offs:
+                if action in [Action.MOVE_LEFT, Action.MOVE_RIGHT] and len(carrying) == 0 and self.target_row is None:
+                    return lambda possible_moves: (
+                        Action.MOVE_LEFT in possible_moves
+                        and Action.MOVE_RIGHT in possible_moves
+                    )
+            case AgentModeFusionAndResearch.FUSION if not self.finished_fusion:
+                upgraded = len(carrying) == 1 and self.agent.color + 1 == carrying[0].color
+                if action in MOVE_DIRECTIONS and not can_fuse and not upgraded:
+                    return lambda possible_moves: (
+                        Action.MOVE_UP in possible_moves
+                        and Action.MOVE_DOWN in possible_moves
+                    )
+        return None
 
-    # Decision making for red agents seeking waste
-    def deliberate_red_seeking(self):
-        if len(self.agent.knowledge["carrying"]) > 0:
-            self.mode = AgentModeFusionAndResearch.CARRYING
-            return Action.MOVE_RIGHT
-        if any(
-            isinstance(neighbor, WasteAgent)
-            and neighbor.color == self.agent.color
-            and neighbor.pos == self.agent.pos
-            for neighbor in self.agent.knowledge["Neighbors"]
-        ):
-            self.mode = AgentModeFusionAndResearch.CARRYING
-            return Action.COLLECT
-            
-        possible_moves = self.check_possible_directions()
-        # Prioritize moving left
-        if Action.MOVE_LEFT in possible_moves:
-            return Action.MOVE_LEFT
-        # Change direction if blocked
-        elif self.agent.knowledge["LastAction"][-1] == Action.MOVE_LEFT:
-            return random.choice([Action.MOVE_UP, Action.MOVE_DOWN])
-        # Navigation when certain directions are blocked
-        elif Action.MOVE_DOWN not in possible_moves:
-            return Action.MOVE_UP
-        elif Action.MOVE_UP not in possible_moves:
-            return Action.MOVE_DOWN
+    # State of MACHINE: the mode, or red seeking for the SEEKING_MODES once the
+    # exploration of the color is over
+    def state(self):
+        if self.finished_fusion and self.mode in self.SEEKING_MODES:
+            return AgentModeFusionAndResearch.REDSEEKING
+        return self.mode
+
+    # Main deliberation method: the first rule of the state that fires
+    def deliberate(self):
+        return self.MACHINE.run(self, Features(self))
+
+
+# FusionAndResearch where robots follow precomputed distance fields instead of
+# probing the grid. Green and yellow carriers walk to the eastern border of their zone.
+# Red wastes are taken straight to the disposal: explorers go back to the edge cell of
+# the row they were sweeping afterwards, and the red fusion robot patrols the yellow
+# border, where yellow robots drop the red wastes, instead of the east edge.
+class FusionAndResearchWithFields(FusionAndResearch):
+    MACHINE = FusionAndResearch.MACHINE.derive({
+        **{
+            mode: (Rule(returning, "return_move"),) + FusionAndResearch.MACHINE.states[mode]
+            for mode in RESEARCH_MODES
+        },
+        **{
+            mode: (
+                Rule(red_fusion_collect, Action.COLLECT),
+                Rule(red_fusion_robot, "pickup_move"),
+            ) + FusionAndResearch.MACHINE.states[mode]
+            for mode in PLACING_DIRECTIONS
+        },
+        AgentModeFusionAndResearch.FUSION: tuple(
+            rule.replace(then="steer") if rule.action in ["climb", "descend", "repeat_last_move"] else rule
+            for rule in FusionAndResearch.MACHINE.states[AgentModeFusionAndResearch.FUSION]
+        ),
+    })
+
+    def __init__(self, model, agent):
+        super().__init__(model, agent)
+        self.return_to = None
+
+    def field_move(self, target):
+        offset = distance_field(self.model, self.agent.max_radioactivity, target).next_offset(self.agent.pos)
+        return None if offset is None else OFFSET_ACTIONS[offset]
+
+    def is_red_fusion_robot(self):
+        return self.agent.color == Colors.RED and self.agent_type == AgentModeFusionAndResearch.PLACING_FUSION
+
+    # Eastern column of the yellow zone
+    def pickup_column(self):
+        return ("column", self.model.width_z1 + self.model.width_z2 - 1)
+
+    # Cells crossed on the way back are not swept
+    def is_sweeping(self):
+        return self.return_to is None and super().is_sweeping()
+
+    def patrol_move(self):
+        return Action.MOVE_UP if self.agent.pos[1] < self.current_lane()[1] - 1 else Action.MOVE_DOWN
+
+    def deliver(self, features):
+        carrying = features.carrying
+        if self.agent.color == Colors.RED and carrying[0].color == Colors.RED:
+            if self.return_to is None:
+                # Cell of the east edge where FusionAndResearch would have dropped it
+                self.return_to = (self.model.width - 1, self.agent.pos[1])
+            action = self.field_move(self.model.disposal_pos)
         else:
-            return self.agent.knowledge["LastAction"][-1]
+            action = self.field_move("border")
+        if action is None:
+            self.resume_research()
+            return Action.DROP
+        return action
 
-    # Decision making for placing agents in position
-    def deliberate_placing(self, action):
-        # Collect waste if available
-        if len(self.agent.knowledge["carrying"]) <= 1 and any(
-            isinstance(neighbor, WasteAgent)
-            and neighbor.color == self.agent.color
-            and neighbor.pos == self.agent.pos
-            for neighbor in self.agent.knowledge["Neighbors"]
-        ):
-            return Action.COLLECT
-            
-        possible_moves = self.check_possible_directions()
-        # Continue in desired direction if possible
-        if action in possible_moves:
+    def return_move(self, features):
+        action = self.field_move(self.return_to)
+        if action is not None:
             return action
-        else:
-            # Switch modes if blocked
-            match action:
-                case Action.MOVE_RIGHT:
-                    self.mode = AgentModeFusionAndResearch.FUSION
-                    return Action.MOVE_UP
-                case Action.MOVE_UP:
-                    self.mode = AgentModeFusionAndResearch.RESEARCHING_TOP
-                    return Action.MOVE_LEFT
-                case Action.MOVE_DOWN:
-                    self.mode = AgentModeFusionAndResearch.RESEARCHING_DOWN
-                    return Action.MOVE_LEFT
-                case Action.MOVE_LEFT:
-                    self.mode = AgentModeFusionAndResearch.FUSION
-                    return Action.MOVE_UP
+        # Back where the waste would have been dropped, sweep on from there
+        self.return_to = None
+        return Action.MOVE_LEFT
 
-    # Main deliberation method that delegates to appropriate sub-method
-    def deliberate(self):
-        match self.mode:
-            case AgentModeFusionAndResearch.FUSION:
-                if self.finished_fusion:
-                    return self.deliberate_red_seeking()
-                return self.deliberate_fusion()
-            case AgentModeFusionAndResearch.CARRYING:
-                return self.deliberate_carrying()
-            case AgentModeFusionAndResearch.RESEARCHING_TOP:
-                return self.deliberate_research(
-                    {
-                        "Top or Down": Action.MOVE_DOWN,
-                        "Down or Top": Action.MOVE_UP,
-                        "Change Mode": AgentModeFusionAndResearch.RESEARCHING_DOWN,
-                    }
-                )
-            case AgentModeFusionAndResearch.RESEARCHING_DOWN:
-                return self.deliberate_research(
-                    {
-                        "Top or Down": Action.MOVE_UP,
-                        "Down or Top": Action.MOVE_DOWN,
-                        "Change Mode": AgentModeFusionAndResearch.RESEARCHING_TOP,
-                    }
-                )
-            case AgentModeFusionAndResearch.PLACING_FUSION:
-                return self.deliberate_placing(Action.MOVE_RIGHT)
-            case AgentModeFusionAndResearch.PLACING_TOP:
-                return self.deliberate_placing(Action.MOVE_UP)
-            case AgentModeFusionAndResearch.PLACING_DOWN:
-                return self.deliberate_placing(Action.MOVE_DOWN)
-            case _:
-                # Default random movement
-                return random.choice(
-                    [
-                        Action.MOVE_LEFT,
-                        Action.MOVE_RIGHT,
-                        Action.MOVE_UP,
-                        Action.MOVE_DOWN,
-                    ]
-                )
+    def pile_move(self, target, features):
+        return self.field_move(target)
+
+    def pickup_move(self, features):
+        move = self.field_move(self.pickup_column())
+        if move is None:
+            self.mode = AgentModeFusionAndResearch.FUSION
+            return self.patrol_move()
+        return move
+
+    # Collects and drops are still decided by FusionAndResearch, only the moves change
+    def steer(self, features, action):
+        if self.agent.color != Colors.RED or action not in MOVE_DIRECTIONS:
+            return action
+        if features.carrying:
+            return self.field_move(self.model.disposal_pos) or action
+        if self.is_red_fusion_robot():
+            move = self.field_move(self.pickup_column())
+            if move is not None:
+                return move
+            if action in [Action.MOVE_LEFT, Action.MOVE_RIGHT]:
+                return self.patrol_move()
+        return action
+
+    # Moves along a field are not straight lines, they are never committed to
+    def macro_condition(self, action):
+        if (
+            self.agent.color == Colors.RED
+            or self.mode == AgentModeFusionAndResearch.CARRYING
+            or self.return_to is not None
+        ):
+            return None
+        return super().macro_condition(action)
 
 
 # Enhanced strategy that adds communication between agents
 class FusionAndResearchWithCommunication(FusionAndResearch):
+    MACHINE = FusionAndResearch.MACHINE.derive({
+        AgentModeFusionAndResearch.PLACING_TOP: placing_rules(
+            AgentModeFusionAndResearch.PLACING_TOP,
+            Rule(None, "enter_research_top", mode=AgentModeFusionAndResearch.RESEARCHING_TOP),
+        ),
+        AgentModeFusionAndResearch.PLACING_DOWN: placing_rules(
+            AgentModeFusionAndResearch.PLACING_DOWN,
+            Rule(None, "enter_research_down", mode=AgentModeFusionAndResearch.RESEARCHING_DOWN),
+        ),
+        **{
+            mode: research_rules(mode)[:3]
+            + (Rule(east_edge_unknown, "track_east_edge"),)
+            + research_rules(mode)[3:]
+            for mode in RESEARCH_MODES
+        },
+    })
+    # Explorers told that the exploration is over seek the last red wastes
+    SEEKING_MODES = (AgentModeFusionAndResearch.FUSION, *RESEARCH_MODES)
+
+    def __init__(self, model, agent):
+        super().__init__(model, agent)
+        # Rows swept by the explorers of the color, as known by this robot: its own
+        # sweeps and the "Covered" messages of the others
+        self.swept_rows = np.zeros(model.height, dtype=bool)
+
+    # Messages are exchanged at every deliberation, so no tick can be skipped
+    def macro_condition(self, action):
+        return None
+
+    def plans_serially(self):
+        return True
+
+    # Coverage goes through messages instead of the shared model map
+    def update_coverage(self):
+        pass
+
+    def explored_rows(self):
+        return self.swept_rows
+
+    def forget_explored_rows(self):
+        self.swept_rows[slice(*self.lane)] = False
+
+    # The row just swept is announced to the other explorers of the color sweeping it
+    def next_row_move(self, top_or_down):
+        y = self.agent.pos[1]
+        if not self.swept_rows[y]:
+            self.swept_rows[y] = True
+            for others in self.model.robots:
+                if (
+                    others.color == self.agent.color
+                    and others is not self.agent
+                    and others.strategy.agent_type != AgentModeFusionAndResearch.PLACING_FUSION
+                    and others.strategy.lane[0] <= y < others.strategy.lane[1]
+                ):
+                    self.agent.send_message(
+                        Message(
+                            self.agent.get_name(),
+                            others.get_name(),
+                            MessagePerformative.INFORM_REF,
+                            {"Message Type": "Covered", "Row": y},
+                        )
+                    )
+        return super().next_row_move(top_or_down)
+
     # Handle communication between agents
     def communicate(self):
-        # Send identification messages to agents in same row
+        # Send identification messages to agents in same row, within the same lane
         for others in self.agent.knowledge["Neighbors"]:
-            if isinstance(others, type(self.agent)) and others != self.agent and self.agent_type != AgentModeFusionAndResearch.PLACING_FUSION and self.mode not in [AgentModeFusionAndResearch.PLACING_TOP, AgentModeFusionAndResearch.PLACING_DOWN] and others.pos[1] == self.agent.pos[1] and not self.finished_fusion:
+            if isinstance(others, type(self.agent)) and others != self.agent and others.strategy.lane == self.lane and self.agent_type != AgentModeFusionAndResearch.PLACING_FUSION and self.mode not in [AgentModeFusionAndResearch.PLACING_TOP, AgentModeFusionAndResearch.PLACING_DOWN] and others.pos[1] == self.agent.pos[1] and not self.finished_fusion:
                 self.agent.send_message(
                     Message(
                         self.agent.get_name(),
@@ -527,6 +1024,7 @@ class FusionAndResearchWithCommunication(FusionAndResearch):
                 if ( 
                     message.get_content()["Message Type"] == "Identification"
                     and self.agent_type != AgentModeFusionAndResearch.PLACING_FUSION 
+                    and self.mode not in [AgentModeFusionAndResearch.PLACING_TOP, AgentModeFusionAndResearch.PLACING_DOWN]
                     and message.get_content()["Color"] == self.agent.color
                     and message.get_content()["Agent Type"] != self.agent_type
                 ):
@@ -546,192 +1044,175 @@ class FusionAndResearchWithCommunication(FusionAndResearch):
                             )
             # Handle end of exploration notifications
             if message.get_performative() == MessagePerformative.INFORM_REF:
-                if message.get_content() == "Fin d'exploration" and self.agent_type != AgentModeFusionAndResearch.PLACING_FUSION:
+                if isinstance(message.get_content(), dict) and message.get_content()["Message Type"] == "Covered":
+                    self.swept_rows[message.get_content()["Row"]] = True
+                elif message.get_content() == "Fin d'exploration" and self.agent_type != AgentModeFusionAndResearch.PLACING_FUSION:
                     self.mode = AgentModeFusionAndResearch.FUSION
                     self.finished_fusion = True
 
-    # Enhanced version of placing deliberation
-    def deliberate_placing(self, action):
-        if len(self.agent.knowledge["carrying"]) <= 1 and any(
-            isinstance(neighbor, WasteAgent)
-            and neighbor.color == self.agent.color
-            and neighbor.pos == self.agent.pos
-            for neighbor in self.agent.knowledge["Neighbors"]
-        ):
-            return Action.COLLECT
-        possible_moves = self.check_possible_directions()
-        if action in possible_moves:
-            return action
-        else:
-            # Handle transitions between modes with tracking of position
-            match action:
-                case Action.MOVE_RIGHT:
-                    self.mode = AgentModeFusionAndResearch.FUSION
-                    return Action.MOVE_UP
-                case Action.MOVE_UP:
-                    self.agent.knowledge["y"] = -1  # Track y position
-                    self.mode = AgentModeFusionAndResearch.RESEARCHING_TOP
-                    return Action.MOVE_RIGHT
-                case Action.MOVE_DOWN:
-                    self.agent.knowledge["y"] = 1   # Track y position
-                    self.mode = AgentModeFusionAndResearch.RESEARCHING_DOWN
-                    return Action.MOVE_RIGHT
-                case Action.MOVE_LEFT:
-                    self.mode = AgentModeFusionAndResearch.FUSION
-                    return Action.MOVE_UP
+    # Explorers blocked while placing enter the sweep eastward, tracking their y position
+    def enter_research_top(self, features):
+        self.agent.knowledge["y"] = -1
+        return Action.MOVE_RIGHT
 
-    # Enhanced research deliberation with position tracking
-    def deliberate_research(self, top_or_down):
-        if self.agent.knowledge["LastAction"][-1] == Action.DROP:
-            return Action.MOVE_LEFT
+    def enter_research_down(self, features):
+        self.agent.knowledge["y"] = 1
+        return Action.MOVE_RIGHT
 
-        elif len(self.agent.knowledge["carrying"]) > 0:
-            self.mode = AgentModeFusionAndResearch.CARRYING
-            return Action.MOVE_RIGHT
+    # Track x position when reaching edge
+    def track_east_edge(self, features):
+        self.agent.knowledge["x"] = 0
+        return Action.MOVE_LEFT
+
+    # Main deliberation method with communication
+    def deliberate(self):
+        self.communicate()  # Process communication before deciding action
+        return super().deliberate()
+
+
+# FusionAndResearch where the wastes a robot drops for the next color are handed out
+# through a contract net. The robot dropping the waste acts as manager: it calls for
+# proposals (PROPOSE) to the robots of the waste color, idle explorers bid their
+# distance (ACCEPT), and two ticks later the closest bidder is awarded the task (COMMIT).
+# A contractor that already works on another task refuses (ARGUE) and the next bidder
+# is tried. The contractor fetches the waste, delivers it as usual, then goes back to
+# where it left its sweep.
+class FusionAndResearchWithContractNet(FusionAndResearch):
+    # Ticks a manager waits for bids
+    BIDDING_TICKS = 2
+
+    def __init__(self, model, agent):
+        super().__init__(model, agent)
+        self.calls = {}        # Open calls of this manager: waste id -> position, deadline, bids
+        self.bidding_on = None # Waste id of the outstanding bid, and the step it was sent
+        self.task = None       # (waste id, position) of the awarded task
+        self.return_to = None
+
+    # Messages are exchanged at every deliberation, so no tick can be skipped
+    def macro_condition(self, action):
+        return None
+
+    def plans_serially(self):
+        return True
+
+    def is_sweeping(self):
+        return self.task is None and self.return_to is None and super().is_sweeping()
+
+    def is_idle_explorer(self):
+        return (
+            self.mode in [AgentModeFusionAndResearch.RESEARCHING_TOP, AgentModeFusionAndResearch.RESEARCHING_DOWN]
+            and not self.agent.knowledge["carrying"]
+            and self.task is None
+            and self.return_to is None
+        )
+
+    def send(self, dest, performative, content):
+        self.agent.send_message(Message(self.agent.get_name(), dest, performative, content))
+
+    def call_for_proposals(self, waste, pos):
+        self.calls[waste.unique_id] = {
+            "Position": pos,
+            "Deadline": self.model.steps + self.BIDDING_TICKS,
+            "Bids": [],
+            "Awarded": False,
+        }
+        for robot in self.model.robots:
+            if robot.color == waste.color:
+                self.send(robot.get_name(), MessagePerformative.PROPOSE,
+                          {"Task": waste.unique_id, "Position": pos, "Color": waste.color})
+
+    # Give the task to the closest remaining bidder, or drop the call if there is none
+    def award(self, waste_id):
+        call = self.calls[waste_id]
+        if not call["Bids"]:
+            del self.calls[waste_id]
+            return
+        call["Bids"].sort()
+        cost, contractor = call["Bids"].pop(0)
+        call["Awarded"] = True
+        self.send(contractor, MessagePerformative.COMMIT, {"Task": waste_id, "Position": call["Position"]})
+
+    def communicate(self):
+        for message in self.agent.get_new_messages():
+            content = message.get_content()
+            match message.get_performative():
+                # Contractor side
+                case MessagePerformative.PROPOSE:
+                    if self.is_idle_explorer() and self.bidding_on is None:
+                        x, y = content["Position"]
+                        cost = abs(x - self.agent.pos[0]) + abs(y - self.agent.pos[1])
+                        self.bidding_on = (content["Task"], self.model.steps)
+                        self.send(message.get_exp(), MessagePerformative.ACCEPT,
+                                  {"Task": content["Task"], "Cost": cost})
+                case MessagePerformative.COMMIT:
+                    if self.is_idle_explorer():
+                        self.task = (content["Task"], content["Position"])
+                        self.return_to = self.agent.pos
+                    else:
+                        self.send(message.get_exp(), MessagePerformative.ARGUE, {"Task": content["Task"]})
+                    self.bidding_on = None
+                # Manager side
+                case MessagePerformative.ACCEPT:
+                    if content["Task"] in self.calls:
+                        self.calls[content["Task"]]["Bids"].append((content["Cost"], message.get_exp()))
+                case MessagePerformative.ARGUE:
+                    if content["Task"] in self.calls:
+                        self.award(content["Task"])
+
+        # A bid that was not awarded does not block the next one
+        if self.bidding_on is not None and self.model.steps - self.bidding_on[1] > self.BIDDING_TICKS:
+            self.bidding_on = None
+        for waste_id, call in list(self.calls.items()):
+            if not call["Awarded"] and self.model.steps >= call["Deadline"]:
+                self.award(waste_id)
+            elif call["Awarded"] and self.model.steps >= call["Deadline"] + 2 * self.BIDDING_TICKS:
+                # Refusals come back within a tick or two, the call is settled
+                del self.calls[waste_id]
+
+    def move_to(self, pos):
+        offset = distance_field(self.model, self.agent.max_radioactivity, pos).next_offset(self.agent.pos)
+        return None if offset is None else OFFSET_ACTIONS[offset]
 
-        elif any(
+    # Action toward the awarded waste, None once the task is over without a collect
+    def deliberate_task(self):
+        waste_id, pos = self.task
+        if self.agent.pos != pos:
+            action = self.move_to(pos)
+            if action is not None:
+                return action
+        self.task = None
+        if any(
             isinstance(neighbor, WasteAgent)
-            and neighbor.color == self.agent.color
+            and neighbor.unique_id == waste_id
             and neighbor.pos == self.agent.pos
             for neighbor in self.agent.knowledge["Neighbors"]
         ):
             self.mode = AgentModeFusionAndResearch.CARRYING
             return Action.COLLECT
-            
-        possible_moves = self.check_possible_directions()
+        # Taken by another robot, back to the sweep
+        return None
 
-        # Track x position when reaching edge
+    def deliberate(self):
+        self.communicate()
+        if self.task is not None:
+            action = self.deliberate_task()
+            if action is not None:
+                return action
         if (
-            self.agent.knowledge["x"] is None
-            and Action.MOVE_RIGHT not in possible_moves
+            self.return_to is not None
+            and not self.agent.knowledge["carrying"]
+            and self.mode in [AgentModeFusionAndResearch.RESEARCHING_TOP, AgentModeFusionAndResearch.RESEARCHING_DOWN]
         ):
-            self.agent.knowledge["x"] = 0
-            return Action.MOVE_LEFT
-
-        # Navigation logic with position tracking
-        if self.agent.knowledge["LastAction"][-1] == top_or_down["Top or Down"]:
-            if Action.MOVE_LEFT in possible_moves:
-                return Action.MOVE_LEFT
-            else:
-                return Action.MOVE_RIGHT
+            action = self.move_to(self.return_to)
+            self.return_to = None if action is None else self.return_to
+            if action is not None:
+                return action
 
-        elif top_or_down["Top or Down"] not in possible_moves and (
-            Action.MOVE_LEFT not in possible_moves
-            or Action.MOVE_RIGHT not in possible_moves
+        action = super().deliberate()
+        # Fused wastes dropped for the next color are announced right away
+        carrying = self.agent.knowledge["carrying"]
+        if action == Action.DROP and carrying and carrying[-1].color != self.agent.color and (
+            self.agent.pos != self.model.disposal_pos
         ):
-            self.mode = top_or_down["Change Mode"]
-            return top_or_down["Down or Top"]
-
-        elif (
-            Action.MOVE_LEFT not in possible_moves
-            or Action.MOVE_RIGHT not in possible_moves
-        ):
-            # Track rows that have been checked
-            if self.agent.knowledge["x"] != 0:
-                self.agent.knowledge["checked_rows"].append(self.agent.knowledge["y"])
-            return top_or_down["Top or Down"]
-        else:
-            return self.agent.knowledge["LastAction"][-1]
-
-    # Enhanced fusion deliberation with support for red agents
-    def deliberate_fusion(self):
-        if len(self.agent.knowledge["carrying"]) == 2 and not self.agent.color == Colors.RED:
-            return Action.FUSION
-        elif (
-            len(self.agent.knowledge["carrying"]) == 1
-            and self.agent.color + 1 == self.agent.knowledge["carrying"][0].color
-        ):
-            return Action.DROP
-        
-        # Special handling for red agents at disposal sites
-        elif self.agent.color == Colors.RED and len(self.agent.knowledge["carrying"]) > 0 and any(
-                (
-                    isinstance(neighbor, WasteDisposalAgent)
-                    and neighbor.pos == self.agent.pos
-                )
-                for neighbor in self.agent.knowledge["Neighbors"]
-            ):
-            return Action.DROP
-        
-        # Collect waste of matching color
-        elif len(self.agent.knowledge["carrying"]) <= 1 and any(
-            isinstance(others, WasteAgent)
-            and others.color == self.agent.color
-            and others.pos == self.agent.pos
-            and others not in self.agent.knowledge["carrying"]
-            for others in self.agent.knowledge["Neighbors"]
-        ):
-            return Action.COLLECT
-        
-        # Navigation with position tracking
-        possible_directions = self.check_possible_directions()
-        if Action.MOVE_DOWN not in possible_directions:
-            if self.agent.knowledge["y"] is None:
-                self.agent.knowledge["y"] = 1
-            return Action.MOVE_UP
-
-        elif Action.MOVE_UP not in possible_directions:
-            if self.agent.knowledge["y"] is None:
-                self.agent.knowledge["y"] = -1
-            elif self.agent.knowledge["height"] is None:
-                # Calculate map height when reaching the top
-                if self.agent.knowledge["y"] > 0:
-                    self.agent.knowledge["height"] = self.agent.knowledge["y"] - 1
-                    self.agent.knowledge["y"] = 0
-                else:
-                    self.agent.knowledge["height"] = self.agent.knowledge["y"] + 1
-                    self.agent.knowledge["y"] = self.agent.knowledge["height"]
-
-            return Action.MOVE_DOWN
-
-        else:
-            for action in reversed(self.agent.knowledge["LastAction"]):
-                if action not in [Action.COLLECT, Action.FUSION, Action.DROP]:
-                    return action
-
-    # Main deliberation method with communication
-    def deliberate(self):
-        self.communicate()  # Process communication before deciding action
-        match self.mode:
-            case AgentModeFusionAndResearch.FUSION:
-                if self.finished_fusion:
-                    return self.deliberate_red_seeking()
-                return self.deliberate_fusion()
-            case AgentModeFusionAndResearch.CARRYING:
-                return self.deliberate_carrying()
-            case AgentModeFusionAndResearch.RESEARCHING_TOP:
-                if self.finished_fusion:
-                    return self.deliberate_red_seeking()
-                return self.deliberate_research(
-                    {
-                        "Top or Down": Action.MOVE_DOWN,
-                        "Down or Top": Action.MOVE_UP,
-                        "Change Mode": AgentModeFusionAndResearch.RESEARCHING_DOWN,
-                    }
-                )
-            case AgentModeFusionAndResearch.RESEARCHING_DOWN:
-                if self.finished_fusion:
-                    return self.deliberate_red_seeking()
-                return self.deliberate_research(
-                    {
-                        "Top or Down": Action.MOVE_UP,
-                        "Down or Top": Action.MOVE_DOWN,
-                        "Change Mode": AgentModeFusionAndResearch.RESEARCHING_TOP,
-                    }
-                )
-            case AgentModeFusionAndResearch.PLACING_FUSION:
-                return self.deliberate_placing(Action.MOVE_RIGHT)
-            case AgentModeFusionAndResearch.PLACING_TOP:
-                return self.deliberate_placing(Action.MOVE_UP)
-            case AgentModeFusionAndResearch.PLACING_DOWN:
-                return self.deliberate_placing(Action.MOVE_DOWN)
-            case _:
-                # Default random movement
-                return random.choice(
-                    [
-                        Action.MOVE_LEFT,
-                        Action.MOVE_RIGHT,
-                        Action.MOVE_UP,
-                        Action.MOVE_DOWN,
-                    ]
-                )
+            self.call_for_proposals(carrying[-1], self.agent.pos)
+        return action
@@ -0,0 +1,257 @@
+# strips.py runs a synchronous WasteModel with one process per zone
+#
+# Robots never leave their zone (and the border column of the zone on its left), and
+# a waste only changes zone when a robot drops a fused waste on its eastern border.
+# Each process builds the grid columns of one zone and the robots and wastes of its
+# color: it draws the same random numbers and takes the same ids as the seeded
+# WasteModel, so they land where they would in a single process. After every step the processes meet at a barrier where those wastes are
+# handed to the next zone and the fused wastes get the ids they would have had in a
+# single process, so the waste counts match WasteModel(update_mode="synchronous").
+
+import multiprocessing
+import numpy as np
+from mesa.space import MultiGrid
+from model import WasteModel
+from objects import WasteAgent, Colors
+from strategy import Action
+
+COLORS = (Colors.GREEN, Colors.YELLOW, Colors.RED)
+
+# Strategies whose deliberation draws no random number and whose messages stay
+# among the robots of a color. Random draws from the random generator the robots of
+# every color share in a single process. The communicating strategy (red wastes
+# reported) and the contract net (calls and bids) read in the same step messages sent
+# from another zone: relayed at the barrier they would arrive a step late and the
+# results would differ from WasteModel, so the MessageService is not relayed.
+STRIP_STRATEGIES = ("Fusion And Research", "Fusion And Research With Distance Fields")
+
+
+class StripGrid(MultiGrid):
+    """MultiGrid of the full size whose cells only exist in some columns, the others
+    are None: an agent placed or looked for there fails instead of being lost.
+
+    attr:
+        columns: Range of the columns with cells
+    """
+
+    def __init__(self, width, height, columns):
+        # Built empty, the cells of the other columns are never allocated
+        super().__init__(0, height, torus=False)
+        self.width = width
+        self.num_cells = width * height
+        self.columns = columns
+        self._grid = [[self.default_val() for _ in range(height)] if x in columns else None for x in range(width)]
+        self._empty_mask = np.ones((width, height), dtype=bool)
+
+
+class StripModel(WasteModel):
+    """The robots and wastes of one color of a synchronous WasteModel.
+
+    The grid only has the columns of the zone and the two around it (robots see one
+    cell around them). Robots and wastes of the other colors and the disposal of the
+    other strips are never built, only their ids and random draws are taken.
+
+    attr:
+        color: Color of the robots and wastes of the strip
+        robot_ids: Ids of all the robots, in the order of WasteModel.robots
+        incoming: (position, color, id, drop step) of the wastes to place before the next step
+        fusions: (order index, waste) of the wastes fused during the last step
+        outgoing: (order index, position, color, id, drop step) of the wastes dropped for the next zone
+    """
+
+    def __init__(self, color, **config):
+        # Read by the initializers of WasteModel
+        self.color = color
+        self.robot_ids = []
+        super().__init__(**config)
+        self.incoming = []
+        self.fusions = []
+        self.outgoing = []
+
+    def _create_grid(self):
+        start = max(self.zone_limits[self.color] - 2, 0)
+        end = min(self.zone_limits[self.color + 1] + 1, self.width)
+        return StripGrid(self.width, self.height, range(start, end))
+
+    def _add_wastes(self, color, positions):
+        if color == self.color:
+            super()._add_wastes(color, positions)
+        else:
+            self._next_id += len(positions)
+
+    def _add_robot(self, agent, pos):
+        # Every robot is created, its strategy may depend on the robots before it
+        self.robot_ids.append(agent.unique_id)
+        if agent.color == self.color:
+            super()._add_robot(agent, pos)
+        else:
+            self.robot_counts[agent.color] += 1
+            agent.remove()
+
+    def _add_disposal(self, agent, pos):
+        if pos[0] in self.grid.columns:
+            super()._add_disposal(agent, pos)
+        else:
+            agent.remove()
+            self.disposal_pos = pos
+
+    def remove_waste(self, waste):
+        self.drop_offs[waste.color].discard(waste)
+        self.grid.remove_agent(waste)
+        waste.remove()
+        self.waste_counts[waste.color] -= 1
+
+    def step(self):
+        # Wastes dropped on the border of the zone during the last step
+        next_id = self._next_id
+        for pos, color, unique_id, step in self.incoming:
+            waste = WasteAgent(self, color=color)
+            waste.unique_id = unique_id
+            self.grid.place_agent(waste, pos)
+            self.waste_counts[color] += 1
+            self.drop_offs[color].add(waste, step)
+        self._next_id = next_id
+
+        self.plan_robots()
+
+        # Same shuffle as WasteModel.step_synchronous: it only depends on the number of robots
+        ids = list(self.robot_ids)
+        self.random.shuffle(ids)
+        index = {unique_id: i for i, unique_id in enumerate(ids)}
+        order = sorted(self.robots, key=lambda robot: index[robot.unique_id])
+        dropped = {
+            robot: robot.knowledge["carrying"][-1]
+            for robot in order
+            if robot.action == Action.DROP and robot.knowledge["carrying"]
+        }
+
+        # Fusions take temporary ids, the engine numbers them across the strips
+        self.apply_actions(order)
+        self._next_id = next_id
+
+        self.fusions = [
+            (index[robot.unique_id], robot.knowledge["carrying"][0])
+            for robot in order
+            if robot.action == Action.FUSION and robot.knowledge["LastActionNotWorked"] is None
+        ]
+        self.outgoing = []
+        for robot, waste in dropped.items():
+            if waste.pos is not None and waste.color != self.color:
+                self.outgoing.append((index[robot.unique_id], waste.pos, waste.color, waste.unique_id, self.steps))
+                self.remove_waste(waste)
+
+
+def run_strip(connection, color, config):
+    """Process loop of one strip: step on request and report what crosses the border."""
+    model = StripModel(color, **config)
+    connection.send((list(model.waste_counts), model._next_id))
+    while True:
+        command = connection.recv()
+        if command is None:
+            break
+        model.incoming, fused_ids, model._next_id = command
+        for (_, waste), unique_id in zip(model.fusions, fused_ids):
+            waste.unique_id = unique_id
+        model.step()
+        connection.send((
+            [i for i, _ in model.fusions],
+            model.outgoing,
+            list(model.waste_counts),
+            model.last_progress_step,
+        ))
+    connection.close()
+
+
+class StripEngine:
+    """Runs a WasteModel configuration in synchronous mode with one process per zone.
+
+    The waste counts of every step are the ones of WasteModel(**config,
+    update_mode="synchronous") with the same seed. Only the STRIP_STRATEGIES are
+    supported, on the multigrid backend, without trace.
+
+    attr:
+        model_vars: Waste counts per step, like WasteModel.datacollector.model_vars
+        steps: Number of steps run
+        stall_reason: Set when stall_window steps pass without progress, see WasteModel
+    """
+
+    def __init__(self, config):
+        strategies = [config.get(key, "Random") for key in ("Strategy_Green", "Strategy_Yellow", "Strategy_Red")]
+        for strategy in strategies:
+            if strategy not in STRIP_STRATEGIES:
+                raise ValueError(f"{strategy} cannot be split in strips, use one of {', '.join(STRIP_STRATEGIES)}")
+        if config.get("trace_path") is not None:
+            raise ValueError("Traces are not supported by the strip engine")
+        if config.get("radioactivity_map") is not None:
+            raise ValueError("The strips follow the three vertical zones, custom radioactivity maps are not supported")
+        if config.get("grid_backend", "multigrid") != "multigrid":
+            raise ValueError("The strips only build the columns of their zone, which requires the multigrid backend")
+
+        config = dict(config, update_mode="synchronous", deliberation_workers=0)
+        self.stall_window = config.get("stall_window")
+        self.steps = 0
+        self.last_progress_step = 0
+        self.stall_reason = None
+        self.running = True
+
+        self.connections = []
+        self.processes = []
+        for color in COLORS:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_strip, args=(child, color, config), daemon=True)
+            process.start()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+        counts = []
+        for connection in self.connections:
+            waste_counts, self.next_id = connection.recv()
+            counts.append(waste_counts)
+        self.incoming = {color: [] for color in COLORS}
+        self.fused_ids = {color: [] for color in COLORS}
+        self.model_vars = {"Wastes": [], "Red Wastes": [], "Yellow Wastes": [], "Green Wastes": []}
+        self.collect(counts)
+
+    def collect(self, counts):
+        waste_counts = [sum(column) for column in zip(*counts)]
+        self.waste_counts = waste_counts
+        self.model_vars["Wastes"].append(sum(waste_counts))
+        self.model_vars["Red Wastes"].append(waste_counts[Colors.RED])
+        self.model_vars["Yellow Wastes"].append(waste_counts[Colors.YELLOW])
+        self.model_vars["Green Wastes"].append(waste_counts[Colors.GREEN])
+
+    def step(self):
+        for color, connection in zip(COLORS, self.connections):
+            connection.send((self.incoming[color], self.fused_ids[color], self.next_id))
+        results = [connection.recv() for connection in self.connections]
+        self.steps += 1
+
+        # Fused wastes are numbered in the order the actions were applied
+        fusions = sorted((i, color, rank) for color, (indices, *_) in zip(COLORS, results) for rank, i in enumerate(indices))
+        self.fused_ids = {color: [0] * len(indices) for color, (indices, *_) in zip(COLORS, results)}
+        for _, color, rank in fusions:
+            self.next_id += 1
+            self.fused_ids[color][rank] = self.next_id
+
+        self.incoming = {color: [] for color in COLORS}
+        for _, outgoing, _, _ in results:
+            for _, pos, color, unique_id, step in sorted(outgoing):
+                self.incoming[color].append((pos, color, unique_id, step))
+
+        # Wastes on their way to the next zone are still on the grid
+        in_transit = [[len(self.incoming[color]) if color == i else 0 for i in range(4)] for color in COLORS]
+        self.collect([waste_counts for _, _, waste_counts, _ in results] + in_transit)
+        self.last_progress_step = max(last_progress for *_, last_progress in results)
+        if (
+            self.stall_window is not None
+            and self.steps - self.last_progress_step >= self.stall_window
+            and sum(self.waste_counts) > 0
+        ):
+            self.stall_reason = f"no progress for {self.steps - self.last_progress_step} steps"
+            self.running = False
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+        for process in self.processes:
+            process.join()
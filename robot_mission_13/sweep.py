@@ -0,0 +1,220 @@
+# sweep.py runs the sweeps declared in a spec file, sharded over several machines
+#
+# A spec (JSON) gives the base configuration of WasteModel, the grid of values to
+# sweep, the seeds and the step limit. It expands to the same job list on every node;
+# node i of n runs the jobs i, i + n, ... and writes one result file per job, named
+# after a hash of its configuration, in an output directory the nodes share. A job
+# whose file exists is skipped, so a shard can be run again after a crash or on
+# another machine. merge_results gathers the files into a results_*.csv table with
+# the columns of run_strat.run_model_results, except stalls: a job has a fixed seed
+# and would stall again, so it is not retried and `stalled` tells whether it stopped.
+#
+# Example spec:
+#   {
+#     "base": {"width": 41, "height": 20, "stall_window": 1000},
+#     "grid": {"strategy": ["Fusion And Research", "Random"], "wastes": [[10, 5, 5], [24, 10, 10]],
+#              "agents": [[3, 3, 3]]},
+#     "seeds": {"start": 0, "count": 10},
+#     "max_steps": 7000
+#   }
+
+import csv
+import hashlib
+import inspect
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+from model import WasteModel
+from telemetry import init_worker, current_sink, worker_metrics
+
+# Shorthand grid keys -> WasteModel parameters they set, other keys are parameters
+GRID_SHORTHANDS = {
+    "strategy": ("Strategy_Green", "Strategy_Yellow", "Strategy_Red"),
+    "strategies": ("Strategy_Green", "Strategy_Yellow", "Strategy_Red"),
+    "wastes": ("num_green_waste", "num_yellow_waste", "num_red_waste"),
+    "agents": ("num_green_agents", "num_yellow_agents", "num_red_agents"),
+    "size": ("width", "height"),
+}
+
+# Values of the parameters a spec leaves out, for the result table
+MODEL_DEFAULTS = {
+    name: parameter.default
+    for name, parameter in inspect.signature(WasteModel.__init__).parameters.items()
+    if parameter.default is not parameter.empty
+}
+
+RESULT_COLUMNS = [
+    "strategy", "waste_tuple", "agent_tuple", "width", "height", "seed",
+    "steps", "cleared", "elapsed_time", "stalled", "stall_reasons", "job",
+]
+
+
+def load_spec(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def grid_parameters(key, value):
+    # "strategy" gives the same strategy to every color, the other shorthands a list
+    if key == "strategy":
+        return dict.fromkeys(GRID_SHORTHANDS[key], value)
+    if key in GRID_SHORTHANDS:
+        names = GRID_SHORTHANDS[key]
+        if len(value) != len(names):
+            raise ValueError(f"Sweep key {key!r} expects {len(names)} values, got {value!r}")
+        return dict(zip(names, value))
+    return {key: value}
+
+
+def spec_seeds(spec):
+    seeds = spec.get("seeds", {"start": 0, "count": 1})
+    if isinstance(seeds, dict):
+        return list(range(seeds.get("start", 0), seeds.get("start", 0) + seeds["count"]))
+    if any(seed is None for seed in seeds):
+        raise ValueError("Sweep seeds must be integers, unseeded jobs could not be run again identically")
+    return list(seeds)
+
+
+def job_id(config, max_steps):
+    # Hash of the canonical configuration, the same on every node and every run
+    canonical = json.dumps({"config": config, "max_steps": max_steps}, sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+def expand(spec):
+    """Job list of a spec: the product of the grid values in the order of the keys,
+    each with every seed. Identical jobs are only listed once."""
+    base = spec.get("base", {})
+    grid = spec.get("grid", {})
+    max_steps = spec.get("max_steps", 1000)
+    jobs = {}
+    for values in itertools.product(*grid.values()):
+        config = dict(base)
+        for key, value in zip(grid, values):
+            config.update(grid_parameters(key, value))
+        for seed in spec_seeds(spec):
+            job_config = {**config, "seed": seed}
+            identifier = job_id(job_config, max_steps)
+            jobs.setdefault(identifier, {"job": identifier, "config": job_config, "max_steps": max_steps})
+    return list(jobs.values())
+
+
+def parse_shard(text):
+    """'i/n' -> (i, n), shards numbered from 1 to n."""
+    index, count = (int(part) for part in text.split("/"))
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard {text!r} is not between 1/{count} and {count}/{count}")
+    return index, count
+
+
+def shard_jobs(jobs, index, count):
+    # Round robin, so slow configurations of a grid are spread over the nodes
+    return jobs[index - 1 :: count]
+
+
+def job_path(directory, job):
+    return os.path.join(directory, "jobs", f"{job['job']}.json")
+
+
+def run_job(job, metrics=None):
+    """Simulate a job until no waste is left, the progress monitor stops it or max_steps."""
+    metrics = metrics or worker_metrics()
+    start_time = time()
+    model = WasteModel(**job["config"])
+    metrics.track(model)
+    wastes = model.datacollector.model_vars["Wastes"]
+    steps = 0
+    while steps < job["max_steps"] and wastes[-1] > 0 and model.running:
+        model.step()
+        steps += 1
+        metrics.step()
+    metrics.job_done(model.stall_reason)
+    return {
+        "steps": steps,
+        "cleared": wastes[-1] == 0,
+        "wastes": wastes[-1],
+        "elapsed_time": time() - start_time,
+        "stall_reason": model.stall_reason,
+    }
+
+
+def write_job(directory, job, metrics=None):
+    """Run a job unless its result file exists, returns whether it ran."""
+    path = job_path(directory, job)
+    if os.path.exists(path):
+        return False
+    result = run_job(job, metrics)
+    # Written under a temporary name and renamed, a file present is always complete
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump({**job, "result": result}, f)
+    os.replace(temporary, path)
+    return True
+
+
+def run_shard(spec, directory, index, count):
+    """Run the jobs of shard index/count not done yet. Module-level so it can be sent
+    to worker processes. Returns the number of jobs run and skipped."""
+    os.makedirs(os.path.join(directory, "jobs"), exist_ok=True)
+    jobs = shard_jobs(expand(spec), index, count)
+    metrics = worker_metrics(f"shard {index}/{count}", len(jobs))
+    ran = skipped = 0
+    for job in jobs:
+        if write_job(directory, job, metrics):
+            ran += 1
+        else:
+            skipped += 1
+            metrics.job_skipped()
+    metrics.publish()
+    return ran, skipped
+
+
+def run_local(spec, directory, nodes):
+    """Run every shard of the spec on this machine, one process per node. The nodes
+    publish their metrics to the TelemetryServer of this process if one is running."""
+    with ProcessPoolExecutor(max_workers=nodes, initializer=init_worker, initargs=(current_sink(),)) as pool:
+        counts = list(pool.map(run_shard, [spec] * nodes, [directory] * nodes, range(1, nodes + 1), [nodes] * nodes))
+    return sum(ran for ran, _ in counts), sum(skipped for _, skipped in counts)
+
+
+def result_row(job, result):
+    config = {**MODEL_DEFAULTS, **job["config"]}
+    strategies = [config[name] for name in GRID_SHORTHANDS["strategy"]]
+    return {
+        "strategy": strategies[0] if len(set(strategies)) == 1 else " / ".join(strategies),
+        "waste_tuple": str(tuple(config[name] for name in GRID_SHORTHANDS["wastes"])),
+        "agent_tuple": str(tuple(config[name] for name in GRID_SHORTHANDS["agents"])),
+        "width": config["width"],
+        "height": config["height"],
+        "seed": config["seed"],
+        "steps": result["steps"],
+        "cleared": result["cleared"],
+        "elapsed_time": result["elapsed_time"],
+        "stalled": result["stall_reason"] is not None,
+        "stall_reasons": result["stall_reason"] or "",
+        "job": job["job"],
+    }
+
+
+def merge_results(spec, directory, output_path=None):
+    """Write the results of the jobs of the spec, in job list order, to
+    directory/results_<timestamp>.csv (or output_path). Jobs not run yet are left out.
+    Returns the path and the number of missing jobs."""
+    if output_path is None:
+        output_path = os.path.join(directory, f"results_{time()}.csv")
+    rows = []
+    missing = 0
+    for job in expand(spec):
+        path = job_path(directory, job)
+        if not os.path.exists(path):
+            missing += 1
+            continue
+        with open(path) as f:
+            rows.append(result_row(job, json.load(f)["result"]))
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return output_path, missing
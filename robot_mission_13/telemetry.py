@@ -0,0 +1,241 @@
+# telemetry.py serves live metrics of long sweeps in the Prometheus text format
+#
+# Simulating processes only bump a few counters per step in a WorkerMetrics; about
+# once a second (checked every CHECK_EVERY steps) it puts a snapshot of them in the
+# queue of the TelemetryServer. A collector thread of the server folds the snapshots
+# and computes the rates, and an HTTP thread renders them on GET /metrics, so neither
+# the aggregation nor the scrapes run on the simulation loop.
+#
+#   with TelemetryServer(port=9100):
+#       run_model_results(...)          # or sweep.run_local(...)
+#   curl localhost:9100/metrics
+
+import multiprocessing
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time
+
+# Steps between two looks at the clock
+CHECK_EVERY = 256
+
+# Seconds the rates are computed over, at least
+MIN_RATE_WINDOW = 1.0
+
+# Queue of the server the WorkerMetrics of this process publish to, None without one
+_sink = None
+
+
+def init_worker(sink):
+    """Publish the metrics of this process to sink. Initializer of the worker
+    processes of a pool, called by TelemetryServer.start in its own process."""
+    global _sink
+    _sink = sink
+
+
+def current_sink():
+    return _sink
+
+
+def worker_metrics(worker=None, jobs=0):
+    """WorkerMetrics publishing to the server of this process, inactive without one."""
+    return WorkerMetrics(_sink, worker, jobs)
+
+
+def rss_bytes():
+    # Resident set of this process from /proc on Linux, the peak one elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class WorkerMetrics:
+    """Counters of one simulating process, sent to the server as snapshots.
+
+    attr:
+        worker: Label of the worker in the metrics
+        jobs: Jobs given to the worker
+        steps, jobs_done, jobs_skipped, stalls, retries: Counters since the creation
+        messages: Messages sent by the finished models, the current one is added by publish
+        model: Model being simulated, for its message count
+    """
+
+    def __init__(self, sink, worker=None, jobs=0, interval=1.0):
+        self.sink = sink
+        self.worker = worker or f"pid {os.getpid()}"
+        self.jobs = jobs
+        self.interval = interval
+        self.steps = 0
+        self.jobs_done = 0
+        self.jobs_skipped = 0
+        self.stalls = 0
+        self.retries = 0
+        self.messages = 0
+        self.model = None
+        self.next_publish = 0
+
+    def track(self, model):
+        # A new model, the messages of the previous one are kept
+        self.messages += self.model_messages()
+        self.model = model
+
+    def model_messages(self):
+        return self.model.get_message_count() if self.model is not None else 0
+
+    def step(self):
+        self.steps += 1
+        if self.steps % CHECK_EVERY == 0 and self.sink is not None and time() >= self.next_publish:
+            self.publish()
+
+    def retry(self, model, stall_reason=None):
+        # The run was stopped and is started again on a new model
+        self.retries += 1
+        self.stalls += stall_reason is not None
+        self.track(model)
+
+    def job_done(self, stall_reason=None):
+        self.jobs_done += 1
+        self.stalls += stall_reason is not None
+        self.track(None)
+        self.publish()
+
+    def job_skipped(self):
+        self.jobs_skipped += 1
+
+    def publish(self):
+        if self.sink is None:
+            return
+        self.next_publish = time() + self.interval
+        self.sink.put({
+            "worker": self.worker,
+            "time": time(),
+            "steps": self.steps,
+            "jobs": self.jobs,
+            "jobs_done": self.jobs_done,
+            "jobs_skipped": self.jobs_skipped,
+            "stalls": self.stalls,
+            "retries": self.retries,
+            "messages": self.messages + self.model_messages(),
+            "rss_bytes": rss_bytes(),
+        })
+
+
+# Exposed metrics: name -> (type, help, snapshot key or rate)
+METRICS = {
+    "robot_mission_steps_total": ("counter", "Simulation steps run.", "steps"),
+    "robot_mission_steps_per_second": ("gauge", "Steps per second over the last second or more.", "steps_rate"),
+    "robot_mission_jobs_done_total": ("counter", "Jobs simulated to the end.", "jobs_done"),
+    "robot_mission_jobs_skipped_total": ("counter", "Jobs skipped, their result already existed.", "jobs_skipped"),
+    "robot_mission_jobs_remaining": ("gauge", "Jobs of the worker neither done nor skipped.", "jobs_remaining"),
+    "robot_mission_stalls_total": ("counter", "Runs stopped by the progress monitor.", "stalls"),
+    "robot_mission_retries_total": ("counter", "Runs started again on a new model.", "retries"),
+    "robot_mission_messages_total": ("counter", "Messages sent through the MessageService.", "messages"),
+    "robot_mission_messages_per_second": ("gauge", "Messages per second over the last second or more.",
+                                          "messages_rate"),
+    "robot_mission_worker_rss_bytes": ("gauge", "Resident memory of the worker process.", "rss_bytes"),
+}
+
+
+def label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.telemetry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the output of the sweep
+        pass
+
+
+class TelemetryServer:
+    """Local HTTP endpoint of the metrics published by the workers.
+
+    attr:
+        port: Port listened to (a free one if created with port 0)
+        queue: Snapshots sent by the WorkerMetrics, given to pools with init_worker
+        workers: Worker label -> last snapshot, with its rates
+        bases: Worker label -> snapshot the rates are computed from
+    """
+
+    def __init__(self, port=9100, host="127.0.0.1"):
+        self.queue = multiprocessing.Queue()
+        self.workers = {}
+        self.bases = {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.telemetry = self
+        self.port = self.httpd.server_address[1]
+        self.collector = threading.Thread(target=self.collect, daemon=True)
+        self.http_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        self.collector.start()
+        self.http_thread.start()
+        init_worker(self.queue)
+        return self
+
+    def close(self):
+        init_worker(None)
+        self.queue.put(None)
+        self.collector.join()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def collect(self):
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                return
+            self.update(snapshot)
+
+    def update(self, snapshot):
+        snapshot["jobs_remaining"] = max(snapshot["jobs"] - snapshot["jobs_done"] - snapshot["jobs_skipped"], 0)
+        worker = snapshot["worker"]
+        with self.lock:
+            previous = self.workers.get(worker, {"steps_rate": 0.0, "messages_rate": 0.0})
+            base = self.bases.setdefault(worker, snapshot)
+            elapsed = snapshot["time"] - base["time"]
+            # Rates over at least MIN_RATE_WINDOW seconds, snapshots sent at the end of
+            # close jobs would give noise
+            for counter in ("steps", "messages"):
+                snapshot[f"{counter}_rate"] = (
+                    (snapshot[counter] - base[counter]) / elapsed if elapsed >= MIN_RATE_WINDOW
+                    else previous[f"{counter}_rate"]
+                )
+            if elapsed >= MIN_RATE_WINDOW:
+                self.bases[worker] = snapshot
+            if snapshot["jobs"] and not snapshot["jobs_remaining"]:
+                # A worker done with its jobs no longer simulates
+                snapshot["steps_rate"] = snapshot["messages_rate"] = 0.0
+            self.workers[worker] = snapshot
+
+    def render(self):
+        with self.lock:
+            workers = sorted(self.workers.items())
+        lines = []
+        for name, (kind, description, key) in METRICS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for worker, snapshot in workers:
+                lines.append(f'{name}{{worker="{label(worker)}"}} {snapshot[key]}')
+        return "\n".join(lines) + "\n"
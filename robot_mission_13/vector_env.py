@@ -0,0 +1,304 @@
+# vector_env.py runs K WasteModels driven by a policy, one process per model
+#
+# The interface follows the Gymnasium vector environments (reset / step returning
+# observations, rewards, terminated, truncated, infos) without depending on it.
+# Observations, rewards and actions live in shared memory: each process writes the
+# rows of its model, only the done flags and infos go through the pipes.
+
+import multiprocessing
+import numpy as np
+from model import WasteModel
+from objects import WasteAgent
+from strategy import Action
+
+# Actions by value, a policy plays Action values or Action members
+ACTIONS = tuple(Action)
+
+# Observation of a robot: the 3x3 cells around it, column-major like its percept,
+# then the robot itself. Cells outside the grid have a radioactivity of WALL.
+CELL_OFFSETS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+# Wastes have the colors of WasteModel.waste_counts, the last one is a fusion of two
+# red wastes (a red robot may fuse, see WasteModel.do).
+WASTE_COLORS = 4
+CELL_FEATURES = ("radioactivity", "green wastes", "yellow wastes", "red wastes", "fused red wastes", "disposal", "robots")
+ROBOT_FEATURES = (
+    "color", "carried green", "carried yellow", "carried red", "carried fused red", "x", "y", "last action failed",
+)
+OBSERVATION_SIZE = len(CELL_OFFSETS) * len(CELL_FEATURES) + len(ROBOT_FEATURES)
+WALL = -1.0
+
+
+class PolicyModel(WasteModel):
+    """A synchronous WasteModel whose robots play the actions set in `actions`
+    instead of deliberating, and earn a reward for each waste fused or disposed.
+
+    attr:
+        actions: Action of each robot of `robots` for the next step
+        rewards: Reward of each robot of `robots` for the last step
+    """
+
+    def __init__(self, fusion_reward=1.0, disposal_reward=1.0, **config):
+        super().__init__(**config)
+        self.fusion_reward = fusion_reward
+        self.disposal_reward = disposal_reward
+        self.actions = [Action.DO_NOTHING] * len(self.robots)
+        self.rewards = [0.0] * len(self.robots)
+
+    def step(self):
+        for robot, action in zip(self.robots, self.actions):
+            robot.action = action
+
+        # Same conflict resolution as WasteModel.step_synchronous
+        order = list(self.robots)
+        self.random.shuffle(order)
+        self.apply_actions(order)
+
+        self.rewards = action_rewards(self, self.fusion_reward, self.disposal_reward)
+        self.check_stall()
+
+
+def action_rewards(model, fusion_reward=1.0, disposal_reward=1.0):
+    """Reward of each robot of model.robots for the action it just applied: a fusion
+    or a drop in the waste disposal that worked."""
+    rewards = [0.0] * len(model.robots)
+    for i, robot in enumerate(model.robots):
+        if robot.knowledge["LastActionNotWorked"] is not None:
+            continue
+        if robot.action == Action.FUSION:
+            rewards[i] = fusion_reward
+        elif robot.action == Action.DROP and robot.pos == model.disposal_pos:
+            rewards[i] = disposal_reward
+    return rewards
+
+
+class Observer:
+    """Builds the observations of the robots of a model with array operations over
+    their positions, instead of one percept per robot.
+
+    attr:
+        counts: Wastes of each color, then robots, per cell, padded by one cell, all
+            zero between two calls
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.counts = np.zeros((WASTE_COLORS + 1, model.width + 2, model.height + 2), dtype=np.int32)
+        self.dx, self.dy = (np.array(offsets) for offsets in zip(*CELL_OFFSETS))
+
+    def observe(self, out):
+        """Write the observation of every robot in out, shape (robots, OBSERVATION_SIZE)."""
+        model = self.model
+        robots = model.robots
+        x = np.array([robot.pos[0] for robot in robots])
+        y = np.array([robot.pos[1] for robot in robots])
+        cx = x[:, np.newaxis] + self.dx
+        cy = y[:, np.newaxis] + self.dy
+        size = len(CELL_FEATURES)
+        end = len(CELL_OFFSETS) * size
+
+        # Only the cells around the robots are read, the map may be memory-mapped
+        inside = (cx >= 0) & (cx < model.width) & (cy >= 0) & (cy < model.height)
+        radioactivity = np.asarray(
+            model.radioactivity_map[np.clip(cx, 0, model.width - 1), np.clip(cy, 0, model.height - 1)],
+            dtype=np.float32,
+        )
+        radioactivity[~inside] = WALL
+        out[:, 0:end:size] = radioactivity
+
+        # Wastes on the grid (carried ones have no position) and robots, counted per cell
+        wastes = [waste for waste in model.agents_by_type.get(WasteAgent, ()) if waste.pos is not None]
+        channels = np.array([waste.color for waste in wastes] + [WASTE_COLORS] * len(robots), dtype=np.intp)
+        px = np.array([waste.pos[0] for waste in wastes] + x.tolist(), dtype=np.intp) + 1
+        py = np.array([waste.pos[1] for waste in wastes] + y.tolist(), dtype=np.intp) + 1
+        np.add.at(self.counts, (channels, px, py), 1)
+        around = self.counts[:, cx + 1, cy + 1]
+        self.counts[channels, px, py] = 0
+        for channel in range(WASTE_COLORS):
+            out[:, 1 + channel : end : size] = around[channel]
+        out[:, size - 1 : end : size] = around[WASTE_COLORS]
+        out[:, CELL_OFFSETS.index((0, 0)) * size + size - 1] -= 1
+
+        disposal_x, disposal_y = model.disposal_pos
+        out[:, size - 2 : end : size] = (cx == disposal_x) & (cy == disposal_y)
+
+        carried = np.zeros((len(robots), WASTE_COLORS), dtype=np.float32)
+        for i, robot in enumerate(robots):
+            for waste in robot.knowledge["carrying"]:
+                carried[i, waste.color] += 1
+        out[:, end] = [robot.color for robot in robots]
+        out[:, end + 1 : end + 1 + WASTE_COLORS] = carried
+        out[:, -3] = x
+        out[:, -2] = y
+        out[:, -1] = [robot.knowledge["LastActionNotWorked"] is not None for robot in robots]
+
+
+def shared_views(shared, num_envs, num_robots):
+    """Observation, reward and action arrays over the shared buffers."""
+    observations, rewards, actions = shared
+    return (
+        np.frombuffer(observations, dtype=np.float32).reshape(num_envs, num_robots, OBSERVATION_SIZE),
+        np.frombuffer(rewards, dtype=np.float32).reshape(num_envs, num_robots),
+        np.frombuffer(actions, dtype=np.int8).reshape(num_envs, num_robots),
+    )
+
+
+def episode_seed(seed, index, episode, num_envs):
+    # Every (environment, episode) pair gets its own seed, None stays random
+    return None if seed is None else seed + episode * num_envs + index
+
+
+def run_env(connection, index, num_envs, num_robots, config, shared, max_episode_steps):
+    """Process loop of one environment: step and reset on request."""
+    observations, rewards, actions = shared_views(shared, num_envs, num_robots)
+    seed = config.get("seed")
+    episode = 0
+
+    def new_model():
+        # Every episode is built from the same configuration, only the seed changes,
+        # so a seeded reset always gives the same world
+        model = PolicyModel(**dict(config, seed=episode_seed(seed, index, episode, num_envs)))
+        return model, Observer(model)
+
+    model = observer = None
+    while True:
+        command = connection.recv()
+        if command is None:
+            break
+        name, argument = command
+        if name == "reset":
+            if argument is not None:
+                seed, episode = argument, 0
+            elif model is not None:
+                episode += 1
+            model, observer = new_model()
+            observer.observe(observations[index])
+            connection.send({"steps": 0, "wastes": np.array(model.waste_counts)})
+            continue
+
+        model.actions = [ACTIONS[action] for action in actions[index].tolist()]
+        model.step()
+        rewards[index] = model.rewards
+        terminated = sum(model.waste_counts) == 0
+        truncated = not terminated and (
+            not model.running or (max_episode_steps is not None and model.steps >= max_episode_steps)
+        )
+        info = {"steps": model.steps, "wastes": np.array(model.waste_counts)}
+        if terminated or truncated:
+            # Automatic reset, the last observation of the episode goes in the info
+            observer.observe(observations[index])
+            info["final_observation"] = observations[index].copy()
+            info["stall_reason"] = model.stall_reason
+            episode += 1
+            model, observer = new_model()
+        observer.observe(observations[index])
+        connection.send((terminated, truncated, info))
+    connection.close()
+
+
+def merge_infos(infos):
+    """Infos of the environments as one dict, like the Gymnasium vector environments:
+    key -> array over the environments, with a boolean mask `_key` of the environments
+    that set it."""
+    num_envs = len(infos)
+    merged = {}
+    for i, info in enumerate(infos):
+        for key, value in info.items():
+            if key not in merged:
+                if isinstance(value, (bool, int, float)):
+                    merged[key] = np.zeros(num_envs, dtype=type(value))
+                elif isinstance(value, np.ndarray):
+                    merged[key] = np.zeros((num_envs, *value.shape), dtype=value.dtype)
+                else:
+                    merged[key] = np.full(num_envs, None, dtype=object)
+                merged[f"_{key}"] = np.zeros(num_envs, dtype=bool)
+            merged[key][i] = value
+            merged[f"_{key}"][i] = True
+    return merged
+
+
+class VectorWasteEnv:
+    """K copies of a WasteModel configuration stepped together by a policy.
+
+    Every step takes one action per robot of every model, shape (num_envs,
+    num_robots), as Action members or values, and returns the observations (see
+    OBSERVATION_SIZE), the rewards, the terminated (no waste left) and truncated
+    (stall_window or max_episode_steps) flags and the infos (see merge_infos:
+    infos["steps"][i] is the step of model i). A model whose episode ends is replaced
+    by a new one at once, its last observation is in infos["final_observation"][i],
+    flagged by infos["_final_observation"][i].
+
+    attr:
+        num_envs: Number of models
+        num_robots: Number of robots per model, in the order of WasteModel.robots
+        robot_colors: Color of each robot
+        observation_shape: (num_envs, num_robots, OBSERVATION_SIZE)
+    """
+
+    def __init__(self, config, num_envs=4, max_episode_steps=None, fusion_reward=1.0, disposal_reward=1.0, copy=True):
+        if config.get("trace_path") is not None:
+            raise ValueError("Traces are not supported by the vector environment")
+        config = dict(
+            config,
+            update_mode="synchronous",
+            deliberation_workers=0,
+            fusion_reward=fusion_reward,
+            disposal_reward=disposal_reward,
+        )
+        self.num_envs = num_envs
+        self.copy = copy
+        self.robot_colors = (
+            [0] * config.get("num_green_agents", 3)
+            + [1] * config.get("num_yellow_agents", 3)
+            + [2] * config.get("num_red_agents", 3)
+        )
+        self.num_robots = len(self.robot_colors)
+        self.observation_shape = (num_envs, self.num_robots, OBSERVATION_SIZE)
+
+        shared = (
+            multiprocessing.RawArray("f", num_envs * self.num_robots * OBSERVATION_SIZE),
+            multiprocessing.RawArray("f", num_envs * self.num_robots),
+            multiprocessing.RawArray("b", num_envs * self.num_robots),
+        )
+        self.observations, self.rewards, self.actions = shared_views(shared, num_envs, self.num_robots)
+
+        self.connections = []
+        self.processes = []
+        for index in range(num_envs):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_env,
+                args=(child, index, num_envs, self.num_robots, config, shared, max_episode_steps),
+                daemon=True,
+            )
+            process.start()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def views(self):
+        # With copy=False the arrays are the shared buffers, overwritten by the next step
+        return (self.observations.copy(), self.rewards.copy()) if self.copy else (self.observations, self.rewards)
+
+    def reset(self, seed=None):
+        for connection in self.connections:
+            connection.send(("reset", seed))
+        infos = [connection.recv() for connection in self.connections]
+        return self.views()[0], merge_infos(infos)
+
+    def step(self, actions):
+        if isinstance(actions, np.ndarray) and actions.dtype.kind in "iu":
+            self.actions[:] = actions
+        else:
+            self.actions[:] = [[getattr(action, "value", action) for action in row] for row in actions]
+        for connection in self.connections:
+            connection.send(("step", None))
+        results = [connection.recv() for connection in self.connections]
+        observations, rewards = self.views()
+        terminated = np.array([result[0] for result in results])
+        truncated = np.array([result[1] for result in results])
+        return observations, rewards, terminated, truncated, merge_infos([result[2] for result in results])
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+        for process in self.processes:
+            process.join()
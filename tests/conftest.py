@@ -0,0 +1,54 @@
+# The modules of robot_mission_13 import each other by bare name, as when run from
+# that directory
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "robot_mission_13"))
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    # Runs write their outputs under the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def small_config(strategy, seed, **overrides):
+    """A 21x10 world cleared in a few hundred steps by the Fusion And Research strategies."""
+    return {
+        "width": 21,
+        "height": 10,
+        "num_green_agents": 2,
+        "num_yellow_agents": 2,
+        "num_red_agents": 2,
+        "num_green_waste": 8,
+        "num_yellow_waste": 4,
+        "num_red_waste": 2,
+        "Strategy_Green": strategy,
+        "Strategy_Yellow": strategy,
+        "Strategy_Red": strategy,
+        "seed": seed,
+        **overrides,
+    }
+
+
+def run_model(config, steps=300):
+    from model import WasteModel
+
+    model = WasteModel(**config)
+    for _ in range(steps):
+        model.step()
+    model.close()
+    return model
+
+
+def robot_states(model):
+    """Id, position and past actions of every robot, to compare two runs."""
+    from agents import Robot
+
+    return sorted(
+        (robot.unique_id, robot.pos, tuple(action.value for action in robot.knowledge["LastAction"]))
+        for robot in model.agents
+        if isinstance(robot, Robot)
+    )
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from aggregation import ReplicateAggregator
+
+RUNS = [[9, 7, 4, 2, 0], [9, 8, 6], [9, 6, 6, 5, 3, 1], [9, 9, 3, 0]]
+
+
+def aggregate(runs, **kwargs):
+    aggregator = ReplicateAggregator(columns=["Wastes"], **kwargs)
+    for run in runs:
+        aggregator.add({"Wastes": run})
+    return aggregator
+
+
+def padded(runs, horizon):
+    return np.array([run[:horizon] + [run[-1]] * (horizon - len(run[:horizon])) for run in runs], dtype=float)
+
+
+def test_matches_numpy_with_a_horizon():
+    aggregator = aggregate(RUNS, horizon=5)
+    values = padded(RUNS, 5)
+    assert np.allclose(aggregator.mean["Wastes"], values.mean(axis=0))
+    assert np.allclose(aggregator.std("Wastes"), values.std(axis=0, ddof=1))
+    assert np.array_equal(aggregator.min["Wastes"], values.min(axis=0))
+    assert np.array_equal(aggregator.max["Wastes"], values.max(axis=0))
+    for q in (0.1, 0.5, 0.9):
+        expected = np.quantile(values, q, axis=0, method="inverted_cdf")
+        assert np.array_equal(aggregator.quantile("Wastes", q), expected)
+
+
+def test_without_horizon_steps_only_count_the_runs_reaching_them():
+    aggregator = aggregate(RUNS)
+    assert len(aggregator) == 6
+    assert aggregator.n.tolist() == [4, 4, 4, 3, 2, 1]
+    assert aggregator.mean["Wastes"][3] == pytest.approx((2 + 5 + 0) / 3)
+    assert aggregator.mean["Wastes"][5] == 1
+
+
+@pytest.mark.parametrize("horizon", [None, 5])
+def test_empty_runs_are_skipped(horizon):
+    aggregator = aggregate([[], *RUNS, []], horizon=horizon)
+    reference = aggregate(RUNS, horizon=horizon)
+    assert aggregator.n.tolist() == reference.n.tolist()
+    assert np.allclose(aggregator.mean["Wastes"], reference.mean["Wastes"])
+
+
+def test_merge_equals_a_single_aggregator():
+    merged = aggregate(RUNS[:1]).merge(aggregate(RUNS[1:]))
+    reference = aggregate(RUNS)
+    assert merged.n.tolist() == reference.n.tolist()
+    assert np.allclose(merged.mean["Wastes"], reference.mean["Wastes"])
+    assert np.allclose(merged.m2["Wastes"], reference.m2["Wastes"])
+    assert np.array_equal(merged.histogram["Wastes"], reference.histogram["Wastes"])
+
+
+def test_non_integer_columns_have_no_quantiles():
+    aggregator = aggregate([[0.5, 1.0]])
+    assert np.isnan(aggregator.quantile("Wastes", 0.5)).all()
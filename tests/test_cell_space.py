@@ -0,0 +1,26 @@
+import pytest
+
+from conftest import robot_states, run_model, small_config
+from model import WasteModel
+from objects import WasteAgent
+
+
+@pytest.mark.parametrize("strategy", ["Random", "Fusion And Research", "Fusion And Research With Communication"])
+@pytest.mark.parametrize("update_mode", ["sequential", "synchronous"])
+def test_cell_space_matches_multigrid(strategy, update_mode):
+    multigrid = run_model(small_config(strategy, 3, update_mode=update_mode))
+    cell_space = run_model(small_config(strategy, 3, update_mode=update_mode, grid_backend="cell_space"))
+    assert cell_space.datacollector.model_vars["Wastes"] == multigrid.datacollector.model_vars["Wastes"]
+    assert robot_states(cell_space) == robot_states(multigrid)
+
+
+def test_property_layers_follow_the_grid():
+    model = WasteModel(**small_config("Fusion And Research", 0, grid_backend="cell_space"))
+    for _ in range(50):
+        model.step()
+    grid = model.grid
+    for x in range(model.width):
+        for y in range(model.height):
+            on_ground = sum(isinstance(agent, WasteAgent) for agent in grid.get_cell_list_contents([(x, y)]))
+            assert grid.waste_count.data[x, y] == on_ground
+            assert grid.get_radioactivity((x, y)) == model.radioactivity_map[x, y]
@@ -0,0 +1,58 @@
+import pytest
+
+from communication.message.MessagePerformative import MessagePerformative
+from communication.message.MessageService import MessageService
+from conftest import small_config
+from model import WasteModel
+from strategy import FusionAndResearchWithContractNet
+
+
+@pytest.fixture
+def run(monkeypatch):
+    sent = []
+    send_message = MessageService.send_message
+
+    def record(service, message):
+        sent.append((model.steps, message.get_performative(), message.get_content(), message.get_exp(), message.get_dest()))
+        send_message(service, message)
+
+    monkeypatch.setattr(MessageService, "send_message", record)
+    model = WasteModel(**small_config("Fusion And Research With Contract Net", 6, num_green_waste=12))
+    for _ in range(400):
+        model.step()
+    model.close()
+    return model, sent
+
+
+def test_calls_go_to_every_robot_of_the_waste_color(run):
+    model, sent = run
+    names = {color: {robot.get_name() for robot in model.robots if robot.color == color} for color in (1, 2)}
+    calls = {}
+    for _, performative, content, sender, dest in sent:
+        if performative == MessagePerformative.PROPOSE:
+            calls.setdefault((sender, content["Task"]), (content["Color"], set()))[1].add(dest)
+    assert calls
+    for color, destinations in calls.values():
+        assert destinations == names[color]
+
+
+def test_tasks_are_awarded_to_the_closest_bidder(run):
+    model, sent = run
+    proposed = {}
+    bids = {}
+    awarded = set()
+    for step, performative, content, sender, dest in sent:
+        task = content["Task"] if isinstance(content, dict) else None
+        match performative:
+            case MessagePerformative.PROPOSE:
+                proposed.setdefault(task, (step, sender))
+            case MessagePerformative.ACCEPT:
+                # Bids answer a call, to its manager
+                assert proposed[task][1] == dest
+                bids.setdefault(task, []).append((content["Cost"], sender))
+            case MessagePerformative.COMMIT if task not in awarded:
+                awarded.add(task)
+                assert step >= proposed[task][0] + FusionAndResearchWithContractNet.BIDDING_TICKS
+                assert min(bids[task])[1] == dest
+    assert awarded
+    assert model.datacollector.model_vars["Wastes"][-1] == 0
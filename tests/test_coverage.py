@@ -0,0 +1,42 @@
+import numpy as np
+
+from conftest import small_config
+from coverage import CoverageMap, nearest_unexplored_row
+from model import WasteModel
+
+
+def test_rows_are_explored_once_every_zone_cell_is_visited():
+    coverage = CoverageMap(9, 4, (3, 6))
+    for x in range(3, 6):
+        coverage.mark((x, 1))
+    for x in range(3, 5):
+        coverage.mark((x, 2))
+    # Cells outside the zone do not count
+    coverage.mark((0, 3))
+    assert coverage.explored_rows().tolist() == [False, True, False, False]
+
+    coverage.mark((5, 2))
+    assert coverage.explored_rows().tolist() == [False, True, True, False]
+    coverage.reset(2, 4)
+    assert coverage.explored_rows().tolist() == [False, True, False, False]
+
+
+def test_nearest_unexplored_row():
+    explored = np.array([False, True, True, False, True, False])
+    assert nearest_unexplored_row(explored, 1, 0, 6, 1) == (3, True)
+    assert nearest_unexplored_row(explored, 4, 0, 6, -1) == (3, True)
+    # Nothing left ahead within the range, the search turns back
+    assert nearest_unexplored_row(explored, 4, 0, 5, 1) == (3, False)
+    assert nearest_unexplored_row(explored, 2, 1, 3, 1) == (None, False)
+
+
+def test_explorers_mark_the_cells_of_their_zone():
+    with WasteModel(**small_config("Fusion And Research", 2)) as model:
+        for _ in range(60):
+            model.step()
+        for color, coverage in enumerate(model.coverage):
+            start, end = coverage.x_range
+            assert (start, end) == (model.zone_limits[color], model.zone_limits[color + 1])
+            assert coverage.visited[start:end].any()
+            # The explorers also sweep the border column of the zone below
+            assert not coverage.visited[: max(start - 1, 0)].any() and not coverage.visited[end:].any()
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import distance_fields
+from agents import Robot
+from conftest import small_config
+from model import WasteModel
+from objects import RADIOACTIVITY_BANDS, WasteAgent, band_color
+
+
+@pytest.fixture
+def site(tmp_path):
+    # A diagonal gradient with an obstacle wall, saved and reopened as a memmap
+    x, y = np.meshgrid(np.arange(24), np.arange(12), indexing="ij")
+    radioactivity = (x + y) / 36 * 0.99 + 0.005
+    radioactivity[10, 2:10] = 2.0
+    np.save(tmp_path / "site.npy", radioactivity)
+    return np.load(tmp_path / "site.npy", mmap_mode="r")
+
+
+def custom_config(site, seed=0, strategy="Fusion And Research With Distance Fields"):
+    return {**small_config(strategy, seed), "radioactivity_map": site}
+
+
+def test_agents_are_placed_in_the_band_of_their_color(site):
+    with WasteModel(**custom_config(site)) as model:
+        assert (model.width, model.height) == site.shape
+        assert model.radioactivity_map is site
+        wastes = [agent for agent in model.agents if isinstance(agent, WasteAgent)]
+        assert len(wastes) == 8 + 4 + 2
+        for agent in wastes:
+            assert band_color(site[agent.pos]) == agent.color
+        for robot in model.agents:
+            if isinstance(robot, Robot):
+                low, high = RADIOACTIVITY_BANDS[robot.color]
+                assert low < site[robot.pos] <= high
+        x, y = model.disposal_pos
+        assert x == model.width - 1 and band_color(site[x, y]) == 2
+
+
+def test_robots_never_enter_cells_too_radioactive_for_them(site):
+    with WasteModel(**custom_config(site)) as model:
+        for _ in range(150):
+            model.step()
+            for robot in model.robots:
+                assert site[robot.pos] <= robot.max_radioactivity
+
+
+def test_geometry_is_a_hash_of_the_map_content(site):
+    first = WasteModel(**custom_config(site, 0))
+    copy = WasteModel(**custom_config(np.array(site), 1))
+    changed = np.array(site)
+    changed[0, 0] = 0.2
+    other = WasteModel(**custom_config(changed))
+    assert first.geometry == copy.geometry != other.geometry
+    assert first.geometry[:2] == site.shape
+
+
+def test_field_cache_keeps_the_most_recent_fields(site, monkeypatch):
+    monkeypatch.setattr(distance_fields, "FIELD_CACHE_SIZE", 3)
+    monkeypatch.setattr(distance_fields, "FIELD_CACHE", type(distance_fields.FIELD_CACHE)())
+    model = WasteModel(**custom_config(site))
+    fields = [distance_fields.distance_field(model, 1, ("column", x)) for x in range(4)]
+    assert len(distance_fields.FIELD_CACHE) == 3
+    # The oldest field was evicted, a lookup refreshes the others
+    assert distance_fields.distance_field(model, 1, ("column", 0)) is not fields[0]
+    assert distance_fields.distance_field(model, 1, ("column", 2)) is fields[2]
+    assert list(distance_fields.FIELD_CACHE)[-1] == (model.geometry, 1, ("column", 2))
@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import small_config
+from dataset import ROW_BYTES, TRANSITION_COLUMNS, ShardWriter, export_dataset, load_dataset
+from model import WasteModel
+from vector_env import ACTIONS, OBSERVATION_SIZE, Observer, PolicyModel
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(sys.modules[WasteModel.__module__].__file__))
+CONFIG = small_config("Fusion And Research", 0, update_mode="synchronous")
+
+
+def rows(episode, count):
+    return {
+        name: np.full((count, *shape), episode, dtype=dtype) for name, (dtype, shape) in TRANSITION_COLUMNS.items()
+    }
+
+
+def test_shards_hold_chunk_bytes(tmp_path):
+    writer = ShardWriter(str(tmp_path), "test", chunk_bytes=5 * ROW_BYTES)
+    writer.append(rows(0, 7))
+    writer.append(rows(1, 5))
+    writer.flush()
+    assert [(shard["transitions"], shard["episodes"]) for shard in writer.shards] == [
+        (5, [0, 0]), (5, [0, 1]), (2, [1, 1]),
+    ]
+    with np.load(tmp_path / "test-00001.npz") as data:
+        assert data["episode"].tolist() == [0, 0, 1, 1, 1]
+        assert data["observation"].shape == (5, OBSERVATION_SIZE)
+
+
+@pytest.mark.parametrize("chunk_bytes", [0, -1])
+def test_chunk_sizes_must_be_positive(tmp_path, chunk_bytes):
+    with pytest.raises(ValueError):
+        ShardWriter(str(tmp_path), "test", chunk_bytes=chunk_bytes)
+    with pytest.raises(ValueError):
+        export_dataset(str(tmp_path), CONFIG, 1, chunk_bytes=chunk_bytes, workers=1)
+
+
+def test_the_command_line_refuses_empty_chunks(tmp_path):
+    command = [sys.executable, "-m", "robot_mission_13", "dataset", "--out", str(tmp_path), "--chunk-mb", "0"]
+    result = subprocess.run(command, cwd=PACKAGE_ROOT, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "not a positive integer" in result.stderr
+
+
+def test_export_round_trip(tmp_path):
+    manifest = export_dataset(
+        str(tmp_path), CONFIG, 3, base_seed=40, max_steps=60, chunk_bytes=100 * ROW_BYTES,
+        episodes_per_task=2, workers=1,
+    )
+    with open(tmp_path / "manifest.json") as f:
+        assert json.load(f) == json.loads(json.dumps(manifest))
+    assert [episode["seed"] for episode in manifest["episodes"]] == [40, 41, 42]
+    assert manifest["shards"][0]["file"].startswith("shard-00000-")
+
+    shards = list(load_dataset(str(tmp_path)))
+    transitions = {name: np.concatenate([shard[name] for shard in shards]) for name in TRANSITION_COLUMNS}
+    assert len(transitions["episode"]) == manifest["transitions"] == 3 * 60 * 6
+    for episode in range(3):
+        steps = transitions["step"][transitions["episode"] == episode]
+        assert sorted(set(steps.tolist())) == list(range(1, 61))
+
+    # The recorded actions, replayed from the same seed, give back the observations
+    first = transitions["episode"] == 0
+    model = PolicyModel(**dict(CONFIG, seed=40))
+    observer = Observer(model)
+    observations = np.zeros((6, OBSERVATION_SIZE), dtype=np.float32)
+    for step in range(1, 61):
+        at_step = first & (transitions["step"] == step)
+        observer.observe(observations)
+        assert np.array_equal(observations, transitions["observation"][at_step])
+        model.actions = [ACTIONS[action] for action in transitions["action"][at_step].tolist()]
+        model.step()
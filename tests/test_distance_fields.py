@@ -0,0 +1,65 @@
+from collections import deque
+
+import numpy as np
+
+from conftest import small_config
+from distance_fields import DistanceField, bfs_distances, distance_field
+from model import WasteModel
+
+
+def reference_distances(passable, targets):
+    width, height = passable.shape
+    distances = np.full(passable.shape, -1)
+    queue = deque()
+    for pos in zip(*np.nonzero(targets & passable)):
+        distances[pos] = 0
+        queue.append(pos)
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and passable[nx, ny] and distances[nx, ny] < 0:
+                distances[nx, ny] = distances[x, y] + 1
+                queue.append((nx, ny))
+    return distances
+
+
+def maze(seed):
+    rng = np.random.default_rng(seed)
+    passable = rng.random((17, 11)) > 0.3
+    targets = np.zeros_like(passable)
+    targets[16, 3] = targets[0, 10] = True
+    return passable, targets
+
+
+def test_bfs_matches_a_queue_based_search():
+    for seed in range(5):
+        passable, targets = maze(seed)
+        assert np.array_equal(bfs_distances(passable, targets), reference_distances(passable, targets))
+
+
+def test_following_the_gradient_reaches_a_target():
+    passable, targets = maze(1)
+    field = DistanceField(passable, targets)
+    for start in zip(*np.nonzero(field.distances > 0)):
+        pos, moves = start, 0
+        while (offset := field.next_offset(pos)) is not None:
+            following = (pos[0] + offset[0], pos[1] + offset[1])
+            assert field.distance(following) == field.distance(pos) - 1
+            pos, moves = following, moves + 1
+        assert targets[pos] and moves == field.distance(start)
+    assert field.next_offset((16, 3)) is None
+
+
+def test_border_fields_are_shared_by_models_of_the_same_geometry():
+    first = WasteModel(**small_config("Random", 0))
+    second = WasteModel(**small_config("Random", 1))
+    green = distance_field(first, 1 / 3, "border")
+    assert distance_field(second, 1 / 3, "border") is green
+    # The green robots reach the last column of the green zone
+    border = first.width_z1 - 1
+    assert green.distance((border, 4)) == 0
+    assert green.distance((0, 4)) == border
+    assert green.distance((border + 1, 4)) == -1
+    to_disposal = distance_field(first, 1, first.disposal_pos)
+    assert to_disposal.distance((0, first.disposal_pos[1])) == first.width - 1
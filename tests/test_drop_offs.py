@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from conftest import run_model, small_config
+from drop_offs import DropOffBuffer
+
+
+def waste(unique_id, pos):
+    return SimpleNamespace(unique_id=unique_id, pos=pos)
+
+
+def test_piles_and_latencies():
+    buffer = DropOffBuffer()
+    first, second, third = waste(1, (6, 2)), waste(2, (6, 2)), waste(3, (6, 7))
+    buffer.add(first, 10)
+    buffer.add(second, 12)
+    buffer.add(third, 15)
+    assert len(buffer) == 3
+    assert buffer.counts() == {(6, 2): 2, (6, 7): 1}
+
+    assert buffer.take(second, 20) == 8
+    assert buffer.take(third, 21) == 6
+    assert buffer.take(third, 22) is None
+    assert buffer.counts() == {(6, 2): 1}
+    assert buffer.latencies == [8, 6] and buffer.total_latency == 14
+
+    # A waste taken back by the robot that dropped it is not a hand-off
+    assert buffer.discard(first) == 10
+    assert len(buffer) == 0 and buffer.latencies == [8, 6]
+
+
+def test_nearest_pile_skips_other_rows_and_claims():
+    buffer = DropOffBuffer()
+    for unique_id, pos in enumerate([(6, 1), (6, 5), (6, 9)]):
+        buffer.add(waste(unique_id, pos), 0)
+    assert buffer.nearest((3, 4)) == (6, 5)
+    assert buffer.nearest((3, 4), rows=(6, 10)) == (6, 9)
+    # Ties go to the oldest pile
+    assert buffer.nearest((6, 3)) == (6, 1)
+
+    buffer.claim((6, 5), robot_id=7, step=30)
+    assert buffer.nearest((3, 4), robot_id=8, step=31) == (6, 1)
+    assert buffer.nearest((3, 4), robot_id=7, step=31) == (6, 5)
+    # Claims not renewed during the last step are over
+    assert buffer.nearest((3, 4), robot_id=8, step=32) == (6, 5)
+
+
+def test_the_model_tracks_the_dropped_wastes():
+    model = run_model(small_config("Fusion And Research", 3, num_green_waste=12), steps=150)
+    columns = model.datacollector.model_vars
+    assert max(columns["Pending Drop-offs"]) > 0
+    assert columns["Pending Drop-offs"][-1] == sum(len(buffer) for buffer in model.drop_offs)
+    for color, buffer in enumerate(model.drop_offs):
+        for pile, wastes in buffer.piles.items():
+            assert all(waste.pos == pile and waste.color == color for waste in wastes)
+    latencies = [latency for buffer in model.drop_offs for latency in buffer.latencies]
+    assert latencies and columns["Handoff Latency"][-1] == sum(latencies) / len(latencies)
+
+
+def test_fetching_drop_offs_still_clears_the_grid():
+    model = run_model(small_config("Fusion And Research", 3, num_green_waste=12, fetch_drop_offs=True), steps=600)
+    assert model.datacollector.model_vars["Wastes"][-1] == 0
+    assert sum(len(buffer) for buffer in model.drop_offs) == 0
@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import small_config
+from event_trace import TRACE_DTYPE, ReplayModel, TraceKind, TraceReplay
+from model import WasteModel
+
+ROBOT_MISSION = os.path.dirname(sys.modules[WasteModel.__module__].__file__)
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    path = str(tmp_path / "run.trace")
+    with WasteModel(**small_config("Fusion And Research With Contract Net", 4, trace_path=path)) as model:
+        for _ in range(250):
+            model.step()
+    return model, path
+
+
+def test_replay_rebuilds_the_waste_counts(recorded):
+    model, path = recorded
+    replay = TraceReplay(path)
+    assert replay.last_step == 250
+    assert (replay.width, replay.height) == (21, 10)
+    assert replay.disposal == model.disposal_pos
+    for column, values in replay.waste_counts().items():
+        assert values.tolist() == list(model.datacollector.model_vars[column]), column
+
+
+def test_records_are_in_step_order(recorded):
+    model, path = recorded
+    replay = TraceReplay(path)
+    assert np.all(np.diff(replay.records["step"].astype(np.int64)) >= 0)
+    header = replay.records_at(0)
+    assert (header["kind"] == TraceKind.ROBOT).sum() == len(model.robots)
+    assert len(replay.messages()) == model.get_message_count()
+
+
+def test_replay_model_moves_the_robots_to_their_last_positions(recorded):
+    model, path = recorded
+    replay = ReplayModel(path, speed=50)
+    while replay.running:
+        replay.step()
+    assert replay.trace_step == 250
+    positions = {unique_id: marker.pos for unique_id, marker in replay.robots.items()}
+    assert positions == {robot.unique_id: robot.pos for robot in model.robots}
+
+
+def test_buffered_records_are_written_on_close(tmp_path):
+    path = tmp_path / "run.trace"
+    model = WasteModel(**small_config("Fusion And Research", 0, trace_path=str(path)))
+    for _ in range(5):
+        model.step()
+    assert path.stat().st_size == 0
+    model.close()
+    assert TraceReplay(str(path)).last_step == 5
+
+
+def test_unclosed_recorders_are_written_at_exit(tmp_path):
+    path = tmp_path / "run.trace"
+    script = (
+        "from model import WasteModel\n"
+        f"model = WasteModel(seed=0, trace_path={str(path)!r})\n"
+        "for _ in range(5):\n"
+        "    model.step()\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=ROBOT_MISSION, check=True, capture_output=True)
+    assert TraceReplay(str(path)).last_step == 5
+
+
+def test_empty_and_truncated_traces(tmp_path):
+    empty = tmp_path / "empty.trace"
+    empty.write_bytes(b"")
+    with pytest.raises(ValueError):
+        TraceReplay(str(empty))
+
+    with WasteModel(**small_config("Fusion And Research", 0, trace_path=str(tmp_path / "run.trace"))) as model:
+        for _ in range(20):
+            model.step()
+    data = (tmp_path / "run.trace").read_bytes()
+    truncated = tmp_path / "truncated.trace"
+    truncated.write_bytes(data[: len(data) - TRACE_DTYPE.itemsize // 2])
+    assert len(TraceReplay(str(truncated)).records) == len(data) // TRACE_DTYPE.itemsize - 1
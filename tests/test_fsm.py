@@ -0,0 +1,76 @@
+import pytest
+
+from conftest import run_model, small_config
+from fsm import Rule, StateMachine, first_rules
+from model import WasteModel
+from strategy import Action, Features, FusionAndResearch, FusionAndResearchWithCommunication
+
+# Wastes at steps 50, 100, 200 and 300, and their sum over the 300 steps. The rule
+# tables matched the if/else strategies on these runs; the values were recorded
+# again on purpose when the explorer roles started to follow the robot ranks
+RULE_TABLE_WASTES = {
+    ("Fusion And Research", 0): [12, 8, 2, 0, 1678],
+    ("Fusion And Research", 1): [12, 7, 4, 0, 1711],
+    ("Fusion And Research With Distance Fields", 0): [11, 7, 1, 0, 1424],
+    ("Fusion And Research With Distance Fields", 1): [11, 6, 2, 0, 1465],
+    ("Fusion And Research With Communication", 0): [11, 8, 1, 0, 1555],
+    ("Fusion And Research With Communication", 1): [12, 7, 2, 1, 1715],
+    ("Fusion And Research With Contract Net", 0): [11, 7, 1, 0, 1516],
+    ("Fusion And Research With Contract Net", 1): [11, 6, 1, 0, 1387],
+}
+
+
+@pytest.mark.parametrize("strategy, seed", list(RULE_TABLE_WASTES))
+def test_rule_tables_keep_the_recorded_runs(strategy, seed):
+    wastes = run_model(small_config(strategy, seed)).datacollector.model_vars["Wastes"]
+    assert [wastes[50], wastes[100], wastes[200], wastes[-1], sum(wastes)] == RULE_TABLE_WASTES[strategy, seed]
+
+
+def test_first_rules_resume_to_the_same_actions():
+    model = WasteModel(**small_config("Fusion And Research", 2))
+    for _ in range(200):
+        strategies = [robot.strategy for robot in model.robots]
+        for robot in model.robots:
+            robot.knowledge = robot.percept()
+        features = [Features(strategy) for strategy in strategies]
+        starts = first_rules(strategies, features)
+        for strategy, feature, start in zip(strategies, features, starts):
+            mode = strategy.mode
+            batched = strategy.MACHINE.run(strategy, feature, start)
+            batched_mode, strategy.mode = strategy.mode, mode
+            assert strategy.MACHINE.run(strategy, Features(strategy)) == batched
+            assert strategy.mode == batched_mode
+        model.step()
+
+
+class Stub:
+    MACHINE = StateMachine({
+        "idle": (
+            Rule(lambda strategy, features: features["blocked"], Action.DO_NOTHING),
+            Rule(None, "pick", mode="busy"),
+            Rule(None, Action.MOVE_UP),
+        ),
+    })
+
+    def __init__(self, picked):
+        self.picked = picked
+        self.mode = "idle"
+
+    def state(self):
+        return self.mode
+
+    def pick(self, features):
+        return Action.COLLECT if self.picked else None
+
+
+def test_rules_fall_through_and_switch_modes():
+    picking, empty = Stub(True), Stub(False)
+    assert Stub.MACHINE.run(picking, {"blocked": True}) == Action.DO_NOTHING
+    assert Stub.MACHINE.run(empty, {"blocked": False}) == Action.MOVE_UP and empty.mode == "idle"
+    assert Stub.MACHINE.run(picking, {"blocked": False}) == Action.COLLECT and picking.mode == "busy"
+
+
+def test_derived_machines_keep_the_other_states():
+    base, derived = FusionAndResearch.MACHINE, FusionAndResearchWithCommunication.MACHINE
+    changed = {state for state in base.states if derived.states[state] != base.states[state]}
+    assert changed and changed != set(base.states)
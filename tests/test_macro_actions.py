@@ -0,0 +1,24 @@
+import pytest
+
+from conftest import robot_states, run_model, small_config
+
+FUSION_STRATEGIES = [
+    "Fusion And Research",
+    "Fusion And Research With Distance Fields",
+    "Fusion And Research With Communication",
+    "Fusion And Research With Contract Net",
+]
+
+
+@pytest.mark.parametrize("strategy", FUSION_STRATEGIES)
+@pytest.mark.parametrize("seed", [0, 1])
+def test_macro_actions_keep_seeded_runs(strategy, seed):
+    plain = run_model(small_config(strategy, seed))
+    macro = run_model(small_config(strategy, seed, macro_actions=True))
+    assert macro.datacollector.model_vars["Wastes"] == plain.datacollector.model_vars["Wastes"]
+    assert robot_states(macro) == robot_states(plain)
+
+
+def test_macro_actions_skip_deliberations():
+    model = run_model(small_config("Fusion And Research", 0, macro_actions=True))
+    assert model.skipped_deliberations > 0
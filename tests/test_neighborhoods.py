@@ -0,0 +1,41 @@
+import pytest
+from mesa.space import MultiGrid
+
+from conftest import small_config
+from model import WasteModel
+from neighborhoods import NEIGHBOR_OFFSETS, border_classes
+
+
+@pytest.mark.parametrize("width, height", [(5, 4), (1, 3), (4, 1), (2, 2)])
+def test_offsets_follow_the_multigrid_neighborhoods(width, height):
+    grid = MultiGrid(width, height, torus=False)
+    column_classes, row_classes = border_classes(width), border_classes(height)
+    for x in range(width):
+        for y in range(height):
+            offsets = NEIGHBOR_OFFSETS[4 * column_classes[x] + row_classes[y]]
+            expected = grid.get_neighborhood((x, y), moore=True, include_center=True)
+            assert [(x + dx, y + dy) for dx, dy in offsets] == list(expected)
+
+
+def test_model_neighbors_are_those_of_the_grid():
+    with WasteModel(**small_config("Fusion And Research", 1)) as model:
+        for _ in range(20):
+            model.step()
+        for x in range(model.width):
+            for y in range(model.height):
+                expected = model.grid.get_neighbors((x, y), moore=True, include_center=True)
+                assert model.get_neighbors((x, y)) == expected
+
+
+def test_direction_masks_match_the_directions_read_from_the_map():
+    with WasteModel(**small_config("Fusion And Research", 1)) as model:
+        for color in range(3):
+            strategy = next(robot for robot in model.robots if robot.color == color).strategy
+            # Cells the robot can stand on, entering a cell is checked with model.enterable
+            for x in range(model.width):
+                for y in range(model.height):
+                    if not model.enterable[color][x][y]:
+                        continue
+                    tabled = strategy.possible_directions_at((x, y))
+                    assert set(tabled) == set(strategy.compute_directions_at((x, y))), (color, x, y)
+
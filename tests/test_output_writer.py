@@ -0,0 +1,52 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from output_writer import OutputWriter, write
+from run_strat import save_rows
+
+
+def test_jobs_run_in_submit_order():
+    done = []
+    with OutputWriter(max_pending=3, processes=False) as writer:
+        for i in range(10):
+            writer.submit(done.append, i)
+    assert done == list(range(10))
+
+
+def test_submit_blocks_while_max_pending_jobs_wait():
+    gate = threading.Event()
+    writer = OutputWriter(max_pending=2, processes=False)
+    writer.submit(gate.wait)
+    writer.submit(gate.wait)
+    submitted = threading.Event()
+    third = threading.Thread(target=lambda: (writer.submit(gate.wait), submitted.set()))
+    third.start()
+    assert not submitted.wait(0.2)
+    gate.set()
+    third.join(5)
+    assert submitted.is_set()
+    writer.close()
+
+
+def test_failed_jobs_raise_in_the_next_call():
+    writer = OutputWriter(processes=False)
+    writer.submit(int, "not a number").exception()
+    with pytest.raises(ValueError):
+        writer.submit(print, "after")
+    writer.submit(int, "still not a number")
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_jobs_run_in_the_writer_process(tmp_path):
+    path = str(tmp_path / "rows.csv")
+    with OutputWriter() as writer:
+        future = write(writer, save_rows, [{"strategy": "Random", "steps": 12}], path)
+    assert future.done()
+    assert pd.read_csv(path).to_dict("records") == [{"strategy": "Random", "steps": 12}]
+
+
+def test_without_writer_jobs_run_right_away():
+    assert write(None, sum, [1, 2, 3]) == 6
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from conftest import small_config
+from run_strat import clear_step, paired_statistics, run_paired_comparison, run_replicate
+
+STRATEGIES = ["Fusion And Research", "Fusion And Research With Contract Net"]
+
+
+def test_paired_statistics():
+    steps_a = [300, 420, 510, 350]
+    steps_b = [280, 400, 470, 360]
+    statistics = paired_statistics(steps_a, steps_b)
+    assert statistics["worlds"] == 4
+    assert statistics["mean_difference"] == pytest.approx(-17.5)
+    assert statistics["b_faster_share"] == 0.75
+    differences = np.subtract(steps_b, steps_a)
+    expected = (np.var(steps_a, ddof=1) + np.var(steps_b, ddof=1)) / np.var(differences, ddof=1)
+    assert statistics["variance_reduction"] == pytest.approx(expected)
+    # World difficulty dominates, pairing removes it
+    assert statistics["variance_reduction"] > 10
+
+
+def test_strategies_run_on_the_same_seeds():
+    config = small_config(None, None, stall_window=300)
+    results, pairs = run_paired_comparison(STRATEGIES, config, num_worlds=3, base_seed=20, max_steps=600, workers=1)
+
+    assert len(results) == 6
+    for strategy in STRATEGIES:
+        runs = results[results["strategy"] == strategy]
+        assert runs["seed"].tolist() == [20, 21, 22]
+        expected = [
+            clear_step(run_replicate({**config, "Strategy_Green": strategy, "Strategy_Yellow": strategy,
+                                      "Strategy_Red": strategy}, seed, 600), 600)
+            for seed in (20, 21, 22)
+        ]
+        assert runs["steps"].tolist() == expected
+
+    assert len(pairs) == 1
+    pair = pairs.iloc[0]
+    assert (pair["strategy_a"], pair["strategy_b"]) == tuple(STRATEGIES)
+    by_strategy = results.pivot(index="seed", columns="strategy", values="steps")
+    assert pair["mean_difference"] == pytest.approx((by_strategy[STRATEGIES[1]] - by_strategy[STRATEGIES[0]]).mean())
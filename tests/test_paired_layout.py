@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from agents import Class_Strat, Robot
+from conftest import small_config
+from model import WasteModel
+from objects import WasteAgent
+
+
+def layout(model):
+    wastes = sorted((agent.pos, agent.color) for agent in model.agents if isinstance(agent, WasteAgent))
+    robots = [(robot.color, robot.pos) for robot in model.agents if isinstance(robot, Robot)]
+    return wastes, robots, model.disposal_pos
+
+
+def custom_map():
+    # Three bands with an obstacle row, the robots are placed in the cells of their band
+    radioactivity = np.repeat(np.linspace(0.05, 0.95, 21)[:, None], 10, axis=1)
+    radioactivity[5:15, 4] = 2.0
+    return radioactivity
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {},
+        # Two lanes per color for the Fusion And Research strategies
+        {"height": 12, "num_green_agents": 6, "num_yellow_agents": 6, "num_red_agents": 6},
+        {"radioactivity_map": custom_map()},
+    ],
+    ids=["bands", "lanes", "custom map"],
+)
+def test_every_strategy_gets_the_same_world_for_a_seed(overrides):
+    layouts = {}
+    for strategy in Class_Strat:
+        with WasteModel(**small_config(strategy, 3, **overrides)) as model:
+            layouts[strategy] = layout(model)
+    reference = layouts["Random"]
+    assert reference[0] and reference[1]
+    for strategy, world in layouts.items():
+        assert world == reference, strategy
+
+
+def test_robots_outside_their_lane_walk_to_it():
+    config = small_config("Fusion And Research", 3, height=12, num_green_agents=6, num_yellow_agents=6, num_red_agents=6)
+
+    def outside(model):
+        return {robot.unique_id for robot in model.robots if not robot.strategy.lane[0] <= robot.pos[1] < robot.strategy.lane[1]}
+
+    with WasteModel(**config) as model:
+        waiting = outside(model)
+        assert waiting
+        for _ in range(40):
+            model.step()
+            waiting &= outside(model)
+        assert not waiting
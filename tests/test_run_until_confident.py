@@ -0,0 +1,59 @@
+import math
+
+import matplotlib
+import numpy as np
+import pytest
+from scipy.stats import t
+
+from conftest import small_config
+from run_strat import clear_step, confidence_half_width, red_clear_step, run_until_confident
+
+matplotlib.use("Agg")
+
+CONFIG = small_config("Fusion And Research", 10, stall_window=200)
+
+
+def test_half_width_is_the_student_interval():
+    values = [310, 280, 295, 330, 301]
+    expected = t.ppf(0.975, 4) * np.std(values, ddof=1) / math.sqrt(5)
+    assert confidence_half_width(values) == pytest.approx(expected)
+    assert confidence_half_width([310]) == math.inf
+
+
+def test_metrics_of_a_run():
+    model_vars = {"Wastes": [5, 4, 2, 1, 0], "Red Wastes": [1, 1, 0, 1, 0]}
+    assert red_clear_step(model_vars, 100) == 4
+    assert clear_step(model_vars, 100) == 4
+    assert clear_step({"Wastes": [5, 4]}, 100) == 100
+    assert red_clear_step({"Red Wastes": [1, 1]}, 100) == 100
+
+
+@pytest.mark.parametrize("arguments", [{"max_replicates": 0}, {"batch_size": 0}])
+def test_bad_arguments_are_refused(tmp_path, arguments):
+    with pytest.raises(ValueError):
+        run_until_confident(CONFIG, str(tmp_path / "out.csv"), workers=1, **arguments)
+
+
+def test_stops_once_the_interval_is_tight_enough(tmp_path):
+    mean, half_width, count = run_until_confident(
+        CONFIG, str(tmp_path / "out.csv"), metric="clear_step", target_half_width=1e9,
+        batch_size=3, min_replicates=4, workers=1, max_steps=400,
+    )
+    # Two batches are needed to reach min_replicates
+    assert count == 6
+    assert half_width < 1e9 and 0 < mean <= 400
+    assert (tmp_path / "out.csv").exists()
+
+    again = run_until_confident(
+        CONFIG, str(tmp_path / "again.csv"), metric="clear_step", target_half_width=1e9,
+        batch_size=3, min_replicates=4, workers=1, max_steps=400,
+    )
+    assert again == (mean, half_width, count)
+
+
+def test_stops_at_max_replicates(tmp_path):
+    _, _, count = run_until_confident(
+        CONFIG, str(tmp_path / "out.csv"), metric="final_wastes", target_half_width=-1,
+        batch_size=4, max_replicates=5, workers=1, max_steps=50,
+    )
+    assert count == 5
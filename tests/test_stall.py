@@ -0,0 +1,59 @@
+import glob
+
+import pandas as pd
+
+import run_strat
+from conftest import small_config
+from model import WasteModel
+from objects import WasteAgent
+
+
+def test_runs_without_progress_stop_after_the_window():
+    # Only yellow and red robots, which never pick up green wastes
+    config = small_config("Random", 0, num_green_agents=0, num_yellow_waste=0, num_red_waste=0, stall_window=30)
+    with WasteModel(**config) as model:
+        while model.running:
+            model.step()
+    assert model.steps == 30
+    assert model.stall_reason == "no progress for 30 steps: 8 green wastes left, 8 on the ground, 0 robots carrying"
+
+
+def test_robots_holding_a_single_waste_each_are_reported():
+    config = small_config("Fusion And Research", 0, num_green_waste=2, num_yellow_waste=0, num_red_waste=0)
+    with WasteModel(**config) as model:
+        wastes = [agent for agent in model.agents if isinstance(agent, WasteAgent)]
+        robots = [robot for robot in model.robots if robot.color == 0]
+        for robot, waste in zip(robots, wastes):
+            model.grid.remove_agent(waste)
+            robot.knowledge["carrying"] = [waste]
+        assert model.diagnose_stall().endswith("2 robots each hold a single green waste")
+
+
+def test_without_window_runs_are_never_stopped():
+    config = small_config("Random", 0, num_green_agents=0, num_yellow_waste=0, num_red_waste=0)
+    with WasteModel(**config) as model:
+        for _ in range(200):
+            model.step()
+        assert model.running and model.stall_reason is None
+
+
+def test_stalled_runs_are_retried(monkeypatch):
+    built = []
+
+    def first_run_stalls(**config):
+        # Without green robots first, then a seeded world that gets cleared
+        if built:
+            config = {**config, "seed": 3}
+        else:
+            config = {**config, "num_green_agents": 0, "stall_window": 40}
+        built.append(config)
+        return WasteModel(**config)
+
+    monkeypatch.setattr(run_strat, "WasteModel", first_run_stalls)
+    run_strat.run_model_results(["Fusion And Research"], [(4, 2, 1)], [(2, 2, 2)], 21, 10)
+
+    assert len(built) == 2
+    (path,) = glob.glob("data/model_runs/results_*.csv")
+    row = pd.read_csv(path).iloc[0]
+    assert row["stalls"] == 1
+    assert row["stall_reasons"].startswith("no progress for 40 steps: 4 green wastes left")
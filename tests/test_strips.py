@@ -0,0 +1,48 @@
+import pytest
+
+from conftest import run_model, small_config
+from strips import StripEngine, StripModel
+from objects import Colors, WasteAgent
+
+
+def strip_config(strategy="Fusion And Research", seed=0):
+    return small_config(strategy, seed, width=41, height=20, num_green_waste=20, num_yellow_waste=8, num_red_waste=6)
+
+
+@pytest.mark.parametrize("strategy", ["Fusion And Research", "Fusion And Research With Distance Fields"])
+def test_strips_match_synchronous_model(strategy):
+    config = strip_config(strategy)
+    model = run_model({**config, "update_mode": "synchronous"}, steps=600)
+    engine = StripEngine(config)
+    try:
+        for _ in range(600):
+            engine.step()
+    finally:
+        engine.close()
+    for column, values in engine.model_vars.items():
+        assert values == list(model.datacollector.model_vars[column]), column
+
+
+def test_strips_only_build_their_zone():
+    full = run_model({**strip_config(), "update_mode": "synchronous"}, steps=0)
+    strip = StripModel(Colors.YELLOW, **{**strip_config(), "update_mode": "synchronous"})
+    assert {robot.color for robot in strip.robots} == {Colors.YELLOW}
+    assert [robot.pos for robot in strip.robots] == [robot.pos for robot in full.robots if robot.color == Colors.YELLOW]
+    assert sorted(
+        (agent.unique_id, agent.pos) for agent in strip.agents if isinstance(agent, WasteAgent)
+    ) == sorted(
+        (agent.unique_id, agent.pos) for agent in full.agents if isinstance(agent, WasteAgent) and agent.color == Colors.YELLOW
+    )
+    columns = strip.grid.columns
+    assert strip.grid._grid[columns.start - 1] is None and strip.grid._grid[columns.stop] is None
+    assert strip.disposal_pos == full.disposal_pos
+
+
+@pytest.mark.parametrize("config", [
+    strip_config("Random"),
+    strip_config("Fusion And Research With Communication"),
+    {**strip_config(), "grid_backend": "cell_space"},
+])
+def test_strips_reject_what_they_cannot_split(config):
+    with pytest.raises(ValueError):
+        StripEngine(config)
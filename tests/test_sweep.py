@@ -0,0 +1,68 @@
+import csv
+
+import pytest
+
+from sweep import expand, job_path, merge_results, parse_shard, run_shard, shard_jobs
+
+SPEC = {
+    "base": {"width": 21, "height": 10, "stall_window": 200},
+    "grid": {"strategy": ["Fusion And Research", "Random"], "wastes": [[4, 2, 1], [6, 2, 2]]},
+    "seeds": {"start": 5, "count": 3},
+    "max_steps": 150,
+}
+
+
+def test_expand_is_the_grid_product_times_the_seeds():
+    jobs = expand(SPEC)
+    assert len(jobs) == 2 * 2 * 3
+    first = jobs[0]["config"]
+    assert first["Strategy_Green"] == first["Strategy_Yellow"] == first["Strategy_Red"] == "Fusion And Research"
+    assert (first["num_green_waste"], first["num_yellow_waste"], first["num_red_waste"]) == (4, 2, 1)
+    assert [job["config"]["seed"] for job in jobs[:3]] == [5, 6, 7]
+    assert all(job["max_steps"] == 150 and job["config"]["width"] == 21 for job in jobs)
+
+
+def test_job_ids_are_stable_and_unique():
+    jobs = expand(SPEC)
+    assert [job["job"] for job in jobs] == [job["job"] for job in expand(dict(SPEC))]
+    assert len({job["job"] for job in jobs}) == len(jobs)
+    # A duplicated grid value lists its jobs once
+    duplicated = {**SPEC, "grid": {**SPEC["grid"], "strategy": ["Random", "Random"]}}
+    assert len(expand(duplicated)) == 2 * 3
+
+
+def test_bad_specs_are_refused():
+    with pytest.raises(ValueError):
+        expand({**SPEC, "grid": {"wastes": [[1, 2]]}})
+    with pytest.raises(ValueError):
+        expand({**SPEC, "seeds": [1, None]})
+
+
+def test_shards_partition_the_jobs():
+    jobs = expand(SPEC)
+    shards = [shard_jobs(jobs, *parse_shard(f"{i}/5")) for i in range(1, 6)]
+    assert sorted(job["job"] for shard in shards for job in shard) == sorted(job["job"] for job in jobs)
+    assert shards[1] == jobs[1::5]
+
+
+@pytest.mark.parametrize("text", ["0/3", "4/3", "1/0"])
+def test_shards_are_numbered_from_one(text):
+    with pytest.raises(ValueError):
+        parse_shard(text)
+
+
+def test_shards_skip_done_jobs_and_merge(tmp_path):
+    spec = {**SPEC, "grid": {"strategy": ["Fusion And Research"], "wastes": [[4, 2, 1]]}}
+    assert run_shard(spec, str(tmp_path), 1, 2) == (2, 0)
+    assert run_shard(spec, str(tmp_path), 1, 2) == (0, 2)
+
+    path, missing = merge_results(spec, str(tmp_path), str(tmp_path / "results.csv"))
+    assert missing == 1
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    jobs = expand(spec)
+    assert [row["job"] for row in rows] == [jobs[0]["job"], jobs[2]["job"]]
+    assert rows[0]["stalled"] in ("True", "False")
+    assert (tmp_path / "jobs" / f"{jobs[0]['job']}.json").exists()
+    assert not (tmp_path / "jobs" / f"{jobs[1]['job']}.json").exists()
+    assert job_path(str(tmp_path), jobs[1]).endswith(f"{jobs[1]['job']}.json")
@@ -0,0 +1,46 @@
+import pytest
+
+from conftest import robot_states, run_model, small_config
+from model import WasteModel
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    ["Random", "Fusion And Research", "Fusion And Research With Communication", "Fusion And Research With Contract Net"],
+)
+def test_deliberation_pool_keeps_seeded_runs(strategy):
+    serial = run_model(small_config(strategy, 5, update_mode="synchronous"), steps=150)
+    pooled = run_model(small_config(strategy, 5, update_mode="synchronous", deliberation_workers=3), steps=150)
+    assert robot_states(pooled) == robot_states(serial)
+    assert list(pooled.datacollector.model_vars["Wastes"]) == list(serial.datacollector.model_vars["Wastes"])
+    assert pooled.collect_conflicts == serial.collect_conflicts
+
+
+def test_robots_plan_on_the_same_grid_before_acting(monkeypatch):
+    model = WasteModel(**small_config("Fusion And Research", 2, update_mode="synchronous"))
+    apply_actions = model.apply_actions
+    planned = {}
+
+    def check_then_apply(order):
+        # Planning moved nobody, every robot then plays its planned action
+        assert {robot.unique_id: robot.pos for robot in model.robots} == positions
+        planned.update({robot.unique_id: robot.action for robot in order})
+        apply_actions(order)
+
+    monkeypatch.setattr(model, "apply_actions", check_then_apply)
+    for _ in range(30):
+        positions = {robot.unique_id: robot.pos for robot in model.robots}
+        model.step()
+        for robot in model.robots:
+            assert robot.knowledge["LastAction"][-1] == planned[robot.unique_id]
+    model.close()
+
+
+def test_closed_models_step_without_pool():
+    with WasteModel(**small_config("Fusion And Research", 0, update_mode="synchronous", deliberation_workers=2)) as model:
+        pool = model.deliberation_pool
+        model.step()
+    assert model.deliberation_pool is None
+    assert pool._shutdown
+    model.step()
+    assert model.steps == 2
@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+import telemetry
+from conftest import small_config
+from model import WasteModel
+from telemetry import CHECK_EVERY, METRICS, TelemetryServer, WorkerMetrics, label
+
+
+def snapshot(time, steps, messages=0, jobs=2, jobs_done=0):
+    return {
+        "worker": "w0", "time": time, "steps": steps, "jobs": jobs, "jobs_done": jobs_done,
+        "jobs_skipped": 0, "stalls": 0, "retries": 0, "messages": messages, "rss_bytes": 1024,
+    }
+
+
+def test_worker_metrics_count_and_publish():
+    sent = []
+    metrics = WorkerMetrics(SimpleNamespace(put=sent.append), worker="w0", jobs=3, interval=0.0)
+    model = WasteModel(**small_config("Fusion And Research With Communication", 0))
+    metrics.track(model)
+    for _ in range(CHECK_EVERY - 1):
+        model.step()
+        metrics.step()
+    assert sent == []
+    model.step()
+    metrics.step()
+    assert len(sent) == 1 and sent[0]["steps"] == CHECK_EVERY
+    assert sent[0]["messages"] == model.get_message_count()
+
+    metrics.retry(WasteModel(**small_config("Fusion And Research With Communication", 1)), stall_reason="stuck")
+    metrics.job_done()
+    metrics.job_skipped()
+    last = sent[-1]
+    assert (last["retries"], last["stalls"], last["jobs_done"]) == (1, 1, 1)
+    # The messages of the replaced model are kept
+    assert last["messages"] >= model.get_message_count()
+    assert metrics.jobs_skipped == 1
+
+
+def test_without_server_nothing_is_sent():
+    assert telemetry.current_sink() is None
+    metrics = telemetry.worker_metrics()
+    metrics.job_done()
+    assert metrics.sink is None and metrics.jobs_done == 1
+
+
+def test_rates_and_rendering():
+    server = TelemetryServer(port=0)
+    try:
+        server.update(snapshot(100.0, 0))
+        server.update(snapshot(100.5, 400, messages=10))
+        # Under MIN_RATE_WINDOW seconds the rates are not computed yet
+        assert server.workers["w0"]["steps_rate"] == 0.0
+        server.update(snapshot(102.0, 1000, messages=40))
+        assert server.workers["w0"]["steps_rate"] == 500.0
+        assert server.workers["w0"]["messages_rate"] == 20.0
+        assert server.workers["w0"]["jobs_remaining"] == 2
+
+        lines = server.render().splitlines()
+        assert len(lines) == 3 * len(METRICS)
+        assert "# TYPE robot_mission_steps_total counter" in lines
+        assert 'robot_mission_steps_total{worker="w0"} 1000' in lines
+        assert 'robot_mission_steps_per_second{worker="w0"} 500.0' in lines
+
+        # A worker done with its jobs no longer simulates
+        server.update(snapshot(103.5, 1200, messages=50, jobs_done=2))
+        assert 'robot_mission_steps_per_second{worker="w0"} 0.0' in server.render().splitlines()
+        assert 'robot_mission_jobs_remaining{worker="w0"} 0' in server.render().splitlines()
+    finally:
+        server.httpd.server_close()
+
+
+def test_labels_are_escaped():
+    assert label('pid "1"\\\n') == 'pid \\"1\\"\\\\\\n'
+
+
+def test_the_server_serves_the_published_metrics():
+    with TelemetryServer(port=0) as server:
+        metrics = telemetry.worker_metrics(worker="w0", jobs=1)
+        assert metrics.sink is server.queue
+        metrics.job_done()
+        # The collector thread folds the snapshot on its own
+        for _ in range(500):
+            if "w0" in server.workers:
+                break
+            server.collector.join(0.01)
+        with urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            body = response.read().decode()
+        assert 'robot_mission_jobs_done_total{worker="w0"} 1' in body
+        with pytest.raises(HTTPError):
+            urlopen(f"http://127.0.0.1:{server.port}/other")
+    assert telemetry.current_sink() is None
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from conftest import small_config
+from objects import WasteAgent
+from strategy import Action
+from vector_env import (
+    CELL_FEATURES,
+    CELL_OFFSETS,
+    OBSERVATION_SIZE,
+    ROBOT_FEATURES,
+    Observer,
+    PolicyModel,
+    VectorWasteEnv,
+    merge_infos,
+)
+
+CONFIG = small_config("Random", 0)
+ROBOT_COLUMN = len(CELL_OFFSETS) * len(CELL_FEATURES)
+
+
+def test_merge_infos_masks_the_missing_keys():
+    merged = merge_infos([
+        {"steps": 3, "wastes": np.array([1, 2, 0, 0])},
+        {"steps": 5, "wastes": np.array([0, 0, 1, 0]), "stall_reason": "stuck"},
+    ])
+    assert merged["steps"].tolist() == [3, 5] and merged["_steps"].all()
+    assert merged["wastes"].shape == (2, 4)
+    assert merged["stall_reason"].tolist() == [None, "stuck"]
+    assert merged["_stall_reason"].tolist() == [False, True]
+
+
+def test_fusions_are_rewarded_to_the_robot_fusing():
+    model = PolicyModel(fusion_reward=2.5, **dict(CONFIG, update_mode="synchronous"))
+    robot = model.robots[0]
+    wastes = [waste for waste in model.agents if isinstance(waste, WasteAgent) and waste.color == robot.color][:2]
+    for waste in wastes:
+        model.grid.remove_agent(waste)
+    robot.knowledge["carrying"] = wastes
+    model.actions = [Action.FUSION] + [Action.DO_NOTHING] * (len(model.robots) - 1)
+    model.step()
+    assert model.rewards == [2.5] + [0.0] * (len(model.robots) - 1)
+
+
+def test_observations_describe_the_robots():
+    model = PolicyModel(**dict(CONFIG, update_mode="synchronous"))
+    observations = np.zeros((len(model.robots), OBSERVATION_SIZE), dtype=np.float32)
+    Observer(model).observe(observations)
+    robot_features = observations[:, ROBOT_COLUMN:]
+    x, y = ROBOT_FEATURES.index("x"), ROBOT_FEATURES.index("y")
+    assert robot_features[:, ROBOT_FEATURES.index("color")].tolist() == [robot.color for robot in model.robots]
+    assert [tuple(row) for row in robot_features[:, [x, y]].astype(int).tolist()] == [robot.pos for robot in model.robots]
+
+
+@pytest.fixture
+def env():
+    env = VectorWasteEnv(CONFIG, num_envs=2, max_episode_steps=3)
+    yield env
+    env.close()
+
+
+def test_reset_and_step_shapes(env):
+    observations, infos = env.reset(seed=7)
+    assert observations.shape == env.observation_shape == (2, 6, OBSERVATION_SIZE)
+    assert infos["steps"].tolist() == [0, 0]
+    assert infos["wastes"].tolist() == [[8, 4, 2, 0]] * 2
+
+    actions = np.full((2, 6), Action.DO_NOTHING.value)
+    for step in (1, 2):
+        observations, rewards, terminated, truncated, infos = env.step(actions)
+        assert observations.shape == (2, 6, OBSERVATION_SIZE) and rewards.shape == (2, 6)
+        assert not terminated.any() and not truncated.any()
+        assert infos["steps"].tolist() == [step, step]
+
+    # max_episode_steps ends both episodes, the models are replaced at once
+    observations, rewards, terminated, truncated, infos = env.step(actions)
+    assert truncated.all() and not terminated.any()
+    assert infos["_final_observation"].all() and infos["final_observation"].shape == (2, 6, OBSERVATION_SIZE)
+
+
+def test_seeded_resets_give_the_same_worlds(env):
+    first, _ = env.reset(seed=7)
+    env.step([[Action.MOVE_UP] * 6] * 2)
+    again, _ = env.reset(seed=7)
+    assert np.array_equal(first, again)
+    # Each environment has its own seed
+    assert not np.array_equal(first[0], first[1])
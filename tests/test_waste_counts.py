@@ -0,0 +1,42 @@
+import pytest
+
+from conftest import small_config
+from model import WasteModel
+from objects import WasteAgent
+from strategy import Action
+
+
+def scanned_counts(model):
+    counts = [0, 0, 0, 0]
+    for agent in model.agents:
+        if isinstance(agent, WasteAgent):
+            counts[agent.color] += 1
+    return counts
+
+
+@pytest.mark.parametrize("strategy", ["Random", "Fusion And Research With Contract Net"])
+def test_counters_match_a_scan_of_the_wastes(strategy):
+    with WasteModel(**small_config(strategy, 1)) as model:
+        for _ in range(300):
+            model.step()
+            assert model.waste_counts == scanned_counts(model)
+        assert model.datacollector.model_vars["Wastes"][-1] == sum(model.waste_counts)
+
+
+def test_fusion_recycles_the_first_carried_waste():
+    model = WasteModel(**small_config("Random", 0))
+    robot = next(robot for robot in model.robots if robot.color == 0)
+    first, second = [waste for waste in model.agents if isinstance(waste, WasteAgent) and waste.color == 0][:2]
+    for waste in (first, second):
+        model.grid.remove_agent(waste)
+    robot.knowledge["carrying"] = [first, second]
+    count = len(model.agents)
+    old_id = first.unique_id
+
+    model.do(robot, Action.FUSION)
+
+    assert robot.knowledge["carrying"] == [first]
+    assert first.color == 1 and first.unique_id > old_id
+    assert first in model.agents and second not in model.agents
+    assert len(model.agents) == count - 1
+    assert model.waste_counts == scanned_counts(model)